@@ -0,0 +1,244 @@
+#! python3
+"""
+    Oudini benchmark suite.
+
+    Times the main processing stages on a synthetic document (see SyntheticSpec), and stores the results as JSON so
+    that they can be compared with a previous run:
+
+        python bench.py --preset medium --output results.json
+        python bench.py --preset medium --compare results.json
+"""
+import  argparse
+import  io
+import  json
+import  logging
+import  platform
+import  statistics
+import  sys
+import  tempfile
+import  time
+import  tracemalloc
+import  xml.etree.ElementTree   as ETree
+from    datetime                import datetime
+from    pathlib                 import Path
+from    typing                  import Callable
+from    typing                  import Optional
+
+# Note: if OuDini is installed as a package, sys.path doesn't need to be modified
+sys.path.append(str(Path(__file__).parent.parent.joinpath('oudini')))
+
+from    document                import Document
+from    latex.latex_generator   import LatexGenerator
+from    impact_analysis         import LinkGraph
+from    lazy_document           import LazyDocument
+from    link_validation         import LinkTable
+from    link_validation         import LinkValidator
+from    synthetic               import SyntheticSpec
+
+
+RESULTS_FORMAT_VERSION = 1
+
+PRESETS = {
+    "small"  : dict(i_num_reqs = 500,   i_num_links = 2, i_section_depth = 2, i_glossary_size = 20,  i_text_length = 40),
+    "medium" : dict(i_num_reqs = 5000,  i_num_links = 3, i_section_depth = 3, i_glossary_size = 200, i_text_length = 60),
+    "large"  : dict(i_num_reqs = 50000, i_num_links = 3, i_section_depth = 4, i_glossary_size = 500, i_text_length = 80),
+}
+
+
+def report(i_msg : str) -> None:
+    print(i_msg, flush = True)
+
+
+class Stage:
+    """
+        Benchmarked stage.
+    """
+    def __init__(self,
+                 i_name : str,
+                 i_run  : Callable):
+        self.name = i_name
+        self.run  = i_run
+
+
+def measure(i_stage   : Stage,
+            i_repeat  : int,
+            i_memory  : bool) -> dict:
+    """
+        Run i_stage i_repeat times, and once more under tracemalloc (if i_memory) to get its peak memory.
+    :return: Results of the stage
+    """
+    times = []
+    for _ in range(i_repeat):
+        start = time.perf_counter()
+        i_stage.run()
+        times.append(time.perf_counter() - start)
+
+    result = {"times"  : times,
+              "min"    : min(times),
+              "median" : statistics.median(times),
+              "mean"   : statistics.fmean(times)}
+
+    if i_memory:
+        # Separate run: tracemalloc slows the code down
+        tracemalloc.start()
+        try:
+            i_stage.run()
+            result["peak_memory"] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    report(f"{i_stage.name:<20} min {result['min']*1000:10.1f} ms   median {result['median']*1000:10.1f} ms"
+           + (f"   peak {result['peak_memory'] / 2**20:8.1f} MiB" if i_memory else ""))
+    return result
+
+
+def run(i_spec   : SyntheticSpec,
+        i_repeat : int  = 3,
+        i_memory : bool = True) -> dict:
+    """
+        Run the benchmark stages on the synthetic document of i_spec.
+    :return: Results, as stored in the JSON file
+    """
+    with tempfile.TemporaryDirectory(prefix = "oudini-bench-") as tmp_dir:
+        tmp_dir  = Path(tmp_dir)
+        xml_file = tmp_dir.joinpath("synthetic.xml")
+        out_dir  = tmp_dir.joinpath("snip")
+
+        start = time.perf_counter()
+        i_spec.write(xml_file)
+        report(f"Synthetic document: {xml_file.stat().st_size / 2**20:.1f} MiB "
+               f"(generated in {time.perf_counter() - start:.2f} s)")
+
+        doc       = Document.from_xml(ETree.parse(xml_file))
+        generator = LatexGenerator(i_project_root_dir = tmp_dir)
+
+        def render():
+            # LaTeX rendering only (no file written)
+            for req in doc.reqs.reqs.values():
+                generator._generate_requirement(i_req = req)
+            generator._generate_constants(i_common = doc.common)
+            generator._generate_glossary(i_glossary = doc.glossary)
+
+        def validate_links():
+            # Against a stand-in upstream document defining the IDs the synthetic links point to
+            validator = LinkValidator.from_documents([doc])
+            validator.add(LinkTable(i_name     = SyntheticSpec.UPSTREAM_NAME,
+                                    i_ids      = frozenset(f"{SyntheticSpec.UPSTREAM_NAME}-REQ-{i:05d}"
+                                                           for i in range(max(i_spec.num_reqs, 1))),
+                                    i_declared = None,
+                                    i_links    = []))
+            validator.validate()
+
+        def impact():
+            # Graph construction and closure of 100 changed upstream requirements
+            graph = LinkGraph.from_documents([doc])
+            graph.impact((SyntheticSpec.UPSTREAM_NAME, f"{SyntheticSpec.UPSTREAM_NAME}-REQ-{i:05d}")
+                         for i in range(0, max(i_spec.num_reqs, 1), max(1, i_spec.num_reqs // 100)))
+
+        def lazy_lookup():
+            # Offset index persisted by the first run: open the document and read 10 requirements
+            lazy = LazyDocument.open(xml_file)
+            for req_id in list(lazy.reqs.reqs)[::max(1, len(lazy.reqs) // 10)][:10]:
+                lazy.reqs.reqs[req_id]
+
+        stages = [Stage("from_xml",          lambda: Document.from_xml(ETree.parse(xml_file))),
+                  Stage("to_xml",            lambda: doc.to_xml()),
+                  Stage("write_xml",         lambda: doc.write_xml(io.BytesIO())),
+                  Stage("generate_document", lambda: generator.generate_document(i_document    = doc,
+                                                                                 i_root_folder = out_dir)),
+                  Stage("latex_render",      render),
+                  Stage("link_validation",   validate_links),
+                  Stage("impact_analysis",   impact),
+                  Stage("lazy_lookup",       lazy_lookup)]
+
+        results = {stage.name: measure(stage, i_repeat, i_memory) for stage in stages}
+
+    return {"version"   : RESULTS_FORMAT_VERSION,
+            "date"      : datetime.now().isoformat(timespec = 'seconds'),
+            "python"    : platform.python_version(),
+            "platform"  : platform.platform(),
+            "repeat"    : i_repeat,
+            "spec"      : i_spec.to_dict(),
+            "stages"    : results}
+
+
+def compare(i_results   : dict,
+            i_baseline  : dict,
+            i_threshold : float) -> bool:
+    """
+        Compare i_results with i_baseline (minimum times, and peak memory if available).
+    :param i_threshold: Relative increase above which a stage is reported as a regression (i.e. 0.1 for +10%)
+    :return           : True if no stage regressed
+    """
+    if i_results["spec"] != i_baseline.get("spec"):
+        report("Synthetic document parameters differ from the baseline: comparison is not meaningful")
+
+    ok = True
+    for name, result in i_results["stages"].items():
+        if (base := i_baseline.get("stages", {}).get(name)) is None:
+            report(f"{name:<20} not in baseline")
+            continue
+
+        for key in ("min", "peak_memory"):
+            if key not in result or key not in base or not base[key]:
+                continue
+            ratio = result[key] / base[key]
+            flag  = ""
+            if ratio > 1 + i_threshold:
+                flag = "  <-- REGRESSION"
+                ok   = False
+            report(f"{name:<20} {key:<12} {ratio:6.2f}x baseline{flag}")
+    return ok
+
+
+def main(i_args : Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description = "Oudini benchmark suite (synthetic document)")
+    parser.add_argument("--preset",         choices = sorted(PRESETS), default = "small",
+                        help = "Synthetic document size (overridden by the options below)")
+    parser.add_argument("--reqs",           type = int, help = "Number of requirements")
+    parser.add_argument("--links",          type = int, help = "Number of links per requirement")
+    parser.add_argument("--depth",          type = int, help = "Depth of the section tree")
+    parser.add_argument("--glossary",       type = int, help = "Number of glossary entries")
+    parser.add_argument("--text-length",    type = int, help = "Number of words per requirement text")
+    parser.add_argument("--seed",           type = int, default = 0)
+    parser.add_argument("--repeat",         type = int, default = 3, help = "Number of measurements per stage")
+    parser.add_argument("--no-memory",      action = "store_true", help = "Do not measure peak memory")
+    parser.add_argument("--output",         type = Path, help = "JSON file to store the results into")
+    parser.add_argument("--compare",        type = Path, help = "JSON results to compare with")
+    parser.add_argument("--threshold",      type = float, default = 0.10,
+                        help = "Relative slowdown reported as a regression (default: 0.10)")
+    args = parser.parse_args(i_args)
+
+    # Oudini warnings (i.e. ignored XML tags) would flood the output
+    logging.basicConfig(level = logging.ERROR)
+
+    params = dict(PRESETS[args.preset])
+    for key, value in (("i_num_reqs",      args.reqs),
+                       ("i_num_links",     args.links),
+                       ("i_section_depth", args.depth),
+                       ("i_glossary_size", args.glossary),
+                       ("i_text_length",   args.text_length)):
+        if value is not None:
+            params[key] = value
+
+    spec    = SyntheticSpec(i_seed = args.seed, **params)
+    results = run(i_spec   = spec,
+                  i_repeat = args.repeat,
+                  i_memory = not args.no_memory)
+
+    if args.output is not None:
+        with open(args.output, mode = 'w') as file:
+            json.dump(results, file, indent = 4)
+        report(f"Results written into '{args.output}'")
+
+    if args.compare is not None:
+        with open(args.compare, mode = 'r') as file:
+            baseline = json.load(file)
+        if not compare(results, baseline, args.threshold):
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,196 @@
+#! python3
+"""
+    Oudini compilation orchestration benchmark.
+
+    Runs the LaTeX generation and compilation (MiktexCompiler) of synthetic documents with a stand-in TeX toolchain
+    (see FakeTexToolchain), so that only the orchestration is measured:
+        - Overhead: compilation time minus the simulated TeX time, per build and per pass
+        - Pass scheduling: timeline of the passes of a build
+        - Throughput: builds per second, sequentially and with parallel worker processes
+
+        python bench_compile.py --builds 8 --workers 4 --output results.json
+"""
+import  argparse
+import  json
+import  logging
+import  platform
+import  shutil
+import  statistics
+import  sys
+import  tempfile
+import  time
+from    concurrent.futures      import ProcessPoolExecutor
+from    datetime                import datetime
+from    pathlib                 import Path
+from    typing                  import Optional
+
+# Note: if OuDini is installed as a package, sys.path doesn't need to be modified
+sys.path.append(str(Path(__file__).parent.parent.joinpath('oudini')))
+
+from    document                import Document
+from    latex.latex_generator   import LatexGenerator
+from    utils.metrics           import Metrics
+from    fake_tex                import FakeTexToolchain
+from    synthetic               import SyntheticSpec
+from    bench                   import PRESETS
+from    bench                   import report
+
+
+RESULTS_FORMAT_VERSION = 1
+
+MAIN_TEX_TEMPLATE =\
+r"""\documentclass{{report}}
+\input{{snip/constants}}
+\input{{snip/glossary}}
+\begin{{document}}
+{inputs}
+\end{{document}}
+"""
+
+
+def setup_project(i_spec    : SyntheticSpec,
+                  i_root    : Path) -> tuple[Path, Document]:
+    """
+        Create a LaTeX project for the synthetic document of i_spec in i_root (main.tex includes every requirement).
+    :return: Project root folder, and document
+    """
+    i_root.mkdir(parents = True, exist_ok = True)
+    xml_file = i_root.joinpath("synthetic.xml")
+    i_spec.write(xml_file)
+    doc = Document.from_file(xml_file)
+
+    latex_dir = i_root.joinpath("latex")
+    latex_dir.mkdir(parents = True, exist_ok = True)
+    inputs = "\n".join(f"\\input{{snip/{r.get_snippet_filename().stem}}}" for r in doc.reqs.reqs.values())
+    latex_dir.joinpath("main.tex").write_text(MAIN_TEX_TEMPLATE.format(inputs = inputs))
+    return i_root, doc
+
+
+def build(i_project  : Path,
+          i_document : Document,
+          i_out_dir  : Path,
+          i_toolchain: FakeTexToolchain) -> Metrics:
+    """
+        Generate and compile i_document once.
+    :return: Metrics of the build
+    """
+    generator = LatexGenerator(i_project_root_dir = i_project,
+                               i_compiler         = i_toolchain.compiler())
+    with Metrics() as m:
+        generator.generate_and_compile(i_document = i_document,
+                                       i_out_dir  = i_out_dir)
+    return m
+
+
+def _worker_build(i_args : tuple) -> float:
+    """
+        Worker process: build a private copy of the project.
+    :return: Duration of the build
+    """
+    project, out_dir, toolchain = i_args
+    doc   = Document.from_file(project.joinpath("synthetic.xml"))
+    start = time.perf_counter()
+    build(project, doc, out_dir, toolchain)
+    return time.perf_counter() - start
+
+
+def run(i_spec     : SyntheticSpec,
+        i_builds   : int,
+        i_workers  : int,
+        i_latency  : float) -> dict:
+    with tempfile.TemporaryDirectory(prefix = "oudini-bench-compile-") as tmp_dir:
+        tmp_dir = Path(tmp_dir)
+        project, doc = setup_project(i_spec, tmp_dir.joinpath("project"))
+
+        toolchain = FakeTexToolchain(i_bin_dir            = tmp_dir.joinpath("bin"),
+                                     i_pdflatex_latency   = i_latency,
+                                     i_glossaries_latency = i_latency)
+        toolchain.install()
+
+        # Sequential builds: overhead and pass scheduling
+        builds = []
+        for n in range(i_builds):
+            m = build(project, doc, tmp_dir.joinpath(f"out-{n}"), toolchain)
+
+            compile_span = next(s for s in m.spans if s.path == "compile")
+            passes       = sorted((s for s in m.spans if s.path.startswith("compile/")), key = lambda s: s.start)
+            num_passes   = m.counters.get("pdflatex_passes", 0) + m.counters.get("makeglossaries_passes", 0)
+            builds.append({"total"     : m.totals()["generate_document"] + compile_span.duration,
+                           "generate"  : m.totals()["generate_document"],
+                           "compile"   : compile_span.duration,
+                           "overhead"  : compile_span.duration - num_passes * i_latency,
+                           "passes"    : [{"name"     : s.name,
+                                           "start"    : s.start - compile_span.start,
+                                           "duration" : s.duration,
+                                           "overhead" : s.duration - i_latency} for s in passes]})
+
+        pass_overheads = [p["overhead"] for b in builds for p in b["passes"]]
+        report(f"Sequential builds    : {i_builds}, median {statistics.median(b['total'] for b in builds) * 1000:8.1f} ms "
+               f"(generation {statistics.median(b['generate'] for b in builds) * 1000:.1f} ms, "
+               f"compilation {statistics.median(b['compile'] for b in builds) * 1000:.1f} ms)")
+        report(f"Orchestration        : median overhead {statistics.median(b['overhead'] for b in builds) * 1000:8.1f} ms per build, "
+               f"{statistics.median(pass_overheads) * 1000:.1f} ms per pass")
+        report("Pass schedule        : " + ", ".join(f"{p['name']}@{p['start'] * 1000:.0f}ms" for p in builds[-1]["passes"]))
+
+        # Parallel builds: throughput (worker processes - the compiler changes the working directory)
+        copies = []
+        for n in range(i_builds):
+            copy = tmp_dir.joinpath(f"project-{n}")
+            shutil.copytree(project, copy)
+            copies.append((copy, tmp_dir.joinpath(f"par-out-{n}"), toolchain))
+
+        # Same work (parse and build) as each worker, for a fair comparison
+        start      = time.perf_counter()
+        for project_copy, out_dir, _ in copies:
+            _worker_build((project_copy, out_dir.with_name(out_dir.name + "-seq"), toolchain))
+        sequential = time.perf_counter() - start
+
+        with ProcessPoolExecutor(max_workers = i_workers) as pool:
+            list(pool.map(_worker_build, copies[:i_workers])) # Warm-up (process start, imports)
+            start     = time.perf_counter()
+            durations = list(pool.map(_worker_build, copies))
+            elapsed   = time.perf_counter() - start
+
+        report(f"Throughput           : {i_builds / sequential:6.2f} builds/s sequential, "
+               f"{i_builds / elapsed:6.2f} builds/s with {i_workers} workers")
+
+    return {"version"   : RESULTS_FORMAT_VERSION,
+            "date"      : datetime.now().isoformat(timespec = 'seconds'),
+            "python"    : platform.python_version(),
+            "platform"  : platform.platform(),
+            "spec"      : i_spec.to_dict(),
+            "latency"   : i_latency,
+            "builds"    : builds,
+            "parallel"  : {"workers"             : i_workers,
+                           "elapsed"             : elapsed,
+                           "durations"           : durations,
+                           "builds_per_s"        : i_builds / elapsed,
+                           "sequential_per_s"    : i_builds / sequential}}
+
+
+def main(i_args : Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description = "Oudini compilation orchestration benchmark (fake TeX toolchain)")
+    parser.add_argument("--reqs",       type = int,   default = 200,  help = "Number of requirements per document")
+    parser.add_argument("--builds",     type = int,   default = 4,    help = "Number of builds")
+    parser.add_argument("--workers",    type = int,   default = 2,    help = "Number of parallel worker processes")
+    parser.add_argument("--latency",    type = float, default = 0.0,  help = "Simulated duration of each TeX pass (s)")
+    parser.add_argument("--output",     type = Path,                  help = "JSON file to store the results into")
+    args = parser.parse_args(i_args)
+
+    logging.basicConfig(level = logging.ERROR)
+
+    results = run(i_spec    = SyntheticSpec(**dict(PRESETS["small"], i_num_reqs = args.reqs)),
+                  i_builds  = args.builds,
+                  i_workers = args.workers,
+                  i_latency = args.latency)
+
+    if args.output is not None:
+        with open(args.output, mode = 'w') as file:
+            json.dump(results, file, indent = 4)
+        report(f"Results written into '{args.output}'")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+#! python3
+"""
+    Oudini command-line startup benchmark.
+
+    Runs 'python oudini <command>' in fresh processes and checks the median wall time against a budget, so that
+    commands meant for hooks (i.e. 'oudini validate doc.xml' in a pre-commit hook) stay fast:
+        - Wall time of the bare interpreter (reference), and of each measured command
+        - Import time of the command (python -X importtime), and its most expensive imports
+        - Modules that must not be imported by the command (backends, subprocess...)
+
+        python bench_startup.py --budget 100
+"""
+import  argparse
+import  json
+import  re
+import  statistics
+import  subprocess
+import  sys
+import  tempfile
+import  time
+from    pathlib                 import Path
+from    typing                  import Optional
+
+sys.path.append(str(Path(__file__).parent.parent.joinpath('oudini')))
+
+from    synthetic               import SyntheticSpec
+from    bench                   import report
+
+
+OUDINI_DIR = Path(__file__).parent.parent.joinpath('oudini')
+
+# Modules the parsing-only commands must not import (lazy loading of the backends and heavy modules)
+FORBIDDEN_MODULES = ("latex.latex_generator", "latex.miktex_compiler", "web.html_generator", "generator",
+                     "subprocess", "tarfile", "zipfile", "inspect")
+
+_IMPORT_TIME_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)$")
+
+
+def wall_time(i_args   : list[str],
+              i_repeat : int) -> list[float]:
+    """
+    :return: Wall times (s) of i_repeat runs of command i_args
+    """
+    times = []
+    for _ in range(i_repeat):
+        start = time.perf_counter()
+        subprocess.run(i_args, stdout = subprocess.DEVNULL, stderr = subprocess.DEVNULL, check = False)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def import_times(i_args : list[str]) -> dict[str, int]:
+    """
+    :return: Cumulative import time (us) of the modules imported by command i_args, by module name
+    """
+    proc = subprocess.run([sys.executable, "-X", "importtime"] + i_args, capture_output = True, text = True)
+    times = {}
+    for line in proc.stderr.splitlines():
+        if (m := _IMPORT_TIME_RE.match(line)) is not None:
+            times[m.group(4)] = int(m.group(2))
+    return times
+
+
+def run(i_commands : dict[str, list[str]],
+        i_repeat   : int,
+        i_budget   : float) -> dict:
+    results = {}
+
+    reference = statistics.median(wall_time([sys.executable, "-c", "pass"], i_repeat))
+    report(f"{'python -c pass':<20} median {reference * 1000:7.1f} ms (interpreter startup, reference)")
+
+    for name, args in i_commands.items():
+        cmd     = [sys.executable, str(OUDINI_DIR)] + args
+        times   = wall_time(cmd, i_repeat)
+        imports = import_times([str(OUDINI_DIR)] + args)
+
+        # Top-level imports only (cumulative times), the most expensive first
+        median    = statistics.median(times)
+        top       = sorted(((t, m) for m, t in imports.items() if "." not in m), reverse = True)[:5]
+        forbidden = [m for m in FORBIDDEN_MODULES if m in imports]
+
+        results[name] = {"times"      : times,
+                         "median"     : median,
+                         "overhead"   : median - reference,
+                         "imports"    : imports,
+                         "forbidden"  : forbidden}
+
+        report(f"{name:<20} median {median * 1000:7.1f} ms ({(median - reference) * 1000:+.1f} ms over the interpreter)"
+               + ("" if median <= i_budget else f"  <-- OVER BUDGET ({i_budget * 1000:.0f} ms)"))
+        report(f"{'':<20} slowest imports: " + ", ".join(f"{m} {t / 1000:.1f} ms" for t, m in top))
+        if forbidden:
+            report(f"{'':<20} unexpected imports: {', '.join(forbidden)}")
+
+    return {"reference" : reference,
+            "budget"    : i_budget,
+            "commands"  : results}
+
+
+def main(i_args : Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description = "Oudini command-line startup benchmark")
+    parser.add_argument("--reqs",   type = int,   default = 50,    help = "Number of requirements of the validated document")
+    parser.add_argument("--repeat", type = int,   default = 10,    help = "Number of runs per command")
+    parser.add_argument("--budget", type = float, default = 100.0, help = "Startup budget of the commands (ms)")
+    parser.add_argument("--output", type = Path,                   help = "JSON file to store the results into")
+    args = parser.parse_args(i_args)
+
+    with tempfile.TemporaryDirectory(prefix = "oudini-bench-startup-") as tmp_dir:
+        doc = Path(tmp_dir).joinpath("synthetic.xml")
+        SyntheticSpec(i_num_reqs      = args.reqs,
+                      i_num_links     = 2,
+                      i_section_depth = 2,
+                      i_glossary_size = 10,
+                      i_text_length   = 40).write(doc)
+
+        results = run(i_commands = {"--help"   : ["--help"],
+                                    "validate" : ["validate", str(doc)],
+                                    "stats"    : ["stats", str(doc)]},
+                      i_repeat   = args.repeat,
+                      i_budget   = args.budget / 1000)
+
+    if args.output is not None:
+        with open(args.output, mode = 'w') as file:
+            json.dump(results, file, indent = 4)
+        report(f"Results written into '{args.output}'")
+
+    failed = [name for name, r in results["commands"].items() if r["median"] > results["budget"] or r["forbidden"]]
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
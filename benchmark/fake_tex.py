@@ -0,0 +1,105 @@
+#! python3
+import  json
+import  os
+import  stat
+import  sys
+from    pathlib                 import Path
+from    typing                  import Iterable
+from    typing                  import Optional
+from    typing                  import Union
+
+from    utils.logobj            import LogObj
+from    latex.miktex_compiler   import MiktexCompiler
+
+
+class FakeTexToolchain (LogObj):
+    """
+        Stand-in TeX toolchain, to test and benchmark the compilation orchestration without a TeX distribution.
+
+        install() writes 'pdflatex' and 'makeglossaries-lite' executables (shell or .cmd wrappers around
+        fake_tex_tool.py) into a folder. They accept the same arguments as the real tools, as used by MiktexCompiler,
+        and write plausible artifacts (.aux, .log, .pdf, glossary files) after a configurable latency. Failures can be
+        injected on given runs of each tool (runs are counted per output directory, from 1).
+
+        Usage:
+            toolchain = FakeTexToolchain(i_bin_dir = tmp_dir, i_pdflatex_latency = 0.5, i_fail_runs = {"pdflatex": [3]})
+            toolchain.install()
+            generator = LatexGenerator(i_project_root_dir = ..., i_compiler = toolchain.compiler())
+    """
+    TOOL_SCRIPT = Path(__file__).parent.joinpath("fake_tex_tool.py")
+    CONFIG_FILE = "fake-tex.json"
+
+    PDFLATEX_TOOL   = "pdflatex"
+    GLOSSARIES_TOOL = "makeglossaries"
+
+    def __init__(self,
+                 i_bin_dir            : Union[str, Path],
+                 i_pdflatex_latency   : float = 0.0,
+                 i_glossaries_latency : float = 0.0,
+                 i_fail_runs          : Optional[dict[str, Iterable[int]]] = None):
+        """
+            Constructor.
+        :param i_bin_dir           : Folder where the stand-in executables are installed
+        :param i_pdflatex_latency  : Duration of each pdflatex run, in seconds
+        :param i_glossaries_latency: Duration of each makeglossaries run, in seconds
+        :param i_fail_runs         : Runs (numbered from 1, per output directory) that must fail, by tool
+                                     (i.e. {"pdflatex": [2]} for the second pdflatex pass)
+        """
+        assert isinstance(i_bin_dir,            (str, Path)),         f"type(i_bin_dir) is {type(i_bin_dir)}"
+        assert isinstance(i_pdflatex_latency,   (int, float)),        f"type(i_pdflatex_latency) is {type(i_pdflatex_latency)}"
+        assert isinstance(i_glossaries_latency, (int, float)),        f"type(i_glossaries_latency) is {type(i_glossaries_latency)}"
+        assert isinstance(i_fail_runs,          (dict, type(None))),  f"type(i_fail_runs) is {type(i_fail_runs)}"
+        LogObj.__init__(self)
+
+        for tool in (i_fail_runs or {}):
+            if tool not in (self.PDFLATEX_TOOL, self.GLOSSARIES_TOOL):
+                raise Exception(f"Unknown tool '{tool}'")
+
+        self.bin_dir            = Path(i_bin_dir).resolve()
+        self.pdflatex_latency   = float(i_pdflatex_latency)
+        self.glossaries_latency = float(i_glossaries_latency)
+        self.fail_runs          = {k: sorted(v) for k, v in (i_fail_runs or {}).items()}
+
+    @property
+    def _suffix(self) -> str:
+        return ".cmd" if os.name == "nt" else ""
+
+    @property
+    def pdflatex_bin(self) -> Path:
+        return self.bin_dir.joinpath(MiktexCompiler.DEFAULT_PDFLATEX_BIN + self._suffix)
+
+    @property
+    def glossaries_bin(self) -> Path:
+        return self.bin_dir.joinpath(MiktexCompiler.DEFAULT_GLOSSARIES_BIN + self._suffix)
+
+    def install(self) -> None:
+        """
+            Write the configuration and the stand-in executables into the bin folder.
+            Can be called again after the latency or failures were modified.
+        """
+        self.bin_dir.mkdir(parents = True, exist_ok = True)
+
+        config = self.bin_dir.joinpath(self.CONFIG_FILE)
+        config.write_text(json.dumps({"latency"   : {self.PDFLATEX_TOOL   : self.pdflatex_latency,
+                                                     self.GLOSSARIES_TOOL : self.glossaries_latency},
+                                      "fail_runs" : self.fail_runs}, indent = 4))
+
+        for path, tool in ((self.pdflatex_bin,   self.PDFLATEX_TOOL),
+                           (self.glossaries_bin, self.GLOSSARIES_TOOL)):
+            if os.name == "nt":
+                path.write_text(f'@"{sys.executable}" "{self.TOOL_SCRIPT}" "{config}" {tool} %*\r\n')
+            else:
+                path.write_text(f'#!/bin/sh\nexec "{sys.executable}" "{self.TOOL_SCRIPT}" "{config}" {tool} "$@"\n')
+                path.chmod(path.stat().st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+
+        self._i(f"Installed fake TeX toolchain into '{self.bin_dir}'")
+
+    def compiler(self) -> MiktexCompiler:
+        """
+        :return: Compiler running the stand-in executables
+        """
+        if not self.pdflatex_bin.exists():
+            self.install()
+
+        return MiktexCompiler(i_pdflatex_bin   = str(self.pdflatex_bin),
+                              i_glossaries_bin = str(self.glossaries_bin))
@@ -0,0 +1,282 @@
+#! python3
+"""
+    Stand-in for the pdflatex and makeglossaries(-lite) executables (see fake_tex.FakeTexToolchain).
+
+    Usage (normally through the wrapper scripts installed by FakeTexToolchain):
+        python fake_tex_tool.py <config.json> pdflatex       [pdflatex arguments]
+        python fake_tex_tool.py <config.json> makeglossaries [makeglossaries arguments]
+
+    No TeX is involved: the tools honor the arguments used by MiktexCompiler (-output-directory, -halt-on-error,
+    -interaction, -jobname for pdflatex; the document name and -t transcript for makeglossaries), follow the
+    \\input / \\include tree of the document, and write plausible .aux, .log, .glo/.acn, .gls/.acr and .pdf files.
+    As with TeX, each \\include'd file has its own .aux file, and the files left out by \\includeonly are not read:
+    their .aux files are kept from the previous runs.
+    Latency and failures are injected as configured.
+
+    This file must only depend on the standard library: it is run as a standalone script.
+"""
+import  json
+import  re
+import  sys
+import  time
+from    pathlib     import Path
+
+
+STATE_FILE_SUFFIX = ".fake-tex.json" # Number of runs of each tool, in the output directory
+
+_INPUT_RE    = re.compile(r"(?<!\\)\\(input|include)\s*\{([^}]*)\}")
+_ONLY_RE     = re.compile(r"(?<!\\)\\includeonly\s*\{([^}]*)\}")
+_LABEL_RE    = re.compile(r"(?<!\\)\\label\s*\{([^}]*)\}")
+_GLS_RE      = re.compile(r"(?<!\\)\\(gls|Gls|glspl|acrshort|acrlong|acrfull)\s*\{([^}]*)\}")
+_COMMENT_RE  = re.compile(r"(?<!\\)%[^\n]*")
+_GLOSSARY_RE = re.compile(r"\\@newglossary\{([^}]*)\}\{([^}]*)\}\{([^}]*)\}\{([^}]*)\}")
+
+CHARS_PER_PAGE = 3000
+
+
+def _next_run(i_out_dir : Path,
+              i_job     : str,
+              i_tool    : str) -> int:
+    """
+        Count the runs of i_tool for job i_job (the count is kept in the output directory, so that it restarts with
+        each clean build).
+    :return: Number of the current run (1 for the first one)
+    """
+    state_file = i_out_dir.joinpath(i_job + STATE_FILE_SUFFIX)
+    try:
+        state = json.loads(state_file.read_text())
+    except (OSError, ValueError):
+        state = {}
+    state[i_tool] = state.get(i_tool, 0) + 1
+    state_file.write_text(json.dumps(state))
+    return state[i_tool]
+
+
+def _simulate(i_config : dict,
+              i_tool   : str,
+              i_run    : int) -> bool:
+    """
+        Wait for the configured latency of i_tool.
+    :return: False if run i_run of i_tool must fail
+    """
+    latency = i_config.get("latency", {}).get(i_tool, 0.0)
+    if latency:
+        time.sleep(latency)
+    return i_run not in i_config.get("fail_runs", {}).get(i_tool, ())
+
+
+def _pdf(i_pages : int) -> bytes:
+    """
+    :return: Minimal PDF document with i_pages blank A4 pages
+    """
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>",
+               b"<< /Type /Pages /Kids [" + b" ".join(b"%d 0 R" % (3 + n) for n in range(i_pages)) + b"] /Count %d >>" % i_pages]
+    objects += [b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] >>"] * i_pages
+
+    data    = b"%PDF-1.4\n"
+    offsets = []
+    for n, obj in enumerate(objects):
+        offsets.append(len(data))
+        data += b"%d 0 obj\n" % (n + 1) + obj + b"\nendobj\n"
+
+    xref  = len(data)
+    data += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    data += b"".join(b"%010d 00000 n \n" % o for o in offsets)
+    data += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return data
+
+
+def pdflatex(i_config : dict,
+             i_args   : list[str]) -> int:
+    out_dir  = Path(".")
+    halt     = False
+    job      = None
+    tex_file = None
+
+    for arg in i_args:
+        if arg.startswith("-"):
+            name, _, value = arg.lstrip("-").partition("=")
+            if   name == "output-directory":
+                out_dir = Path(value)
+            elif name == "halt-on-error":
+                halt = True
+            elif name == "jobname":
+                job = value
+            # Other options (-interaction, -disable-installer...) have no effect
+        else:
+            tex_file = arg
+
+    if tex_file is None:
+        print("! No input file given.")
+        return 1
+
+    tex_file = Path(tex_file if tex_file.endswith(".tex") else tex_file + ".tex")
+    job      = job or tex_file.stem
+    out_dir.mkdir(parents = True, exist_ok = True)
+
+    run = _next_run(out_dir, job, "pdflatex")
+    log = [f"This is pdfTeX, Version 3.141592653 (FakeTeX) (run {run})",
+           f"entering extended mode",
+           f"**{tex_file}"]
+
+    def finish(i_code : int) -> int:
+        out_dir.joinpath(f"{job}.log").write_text("\n".join(log) + "\n")
+        print("\n".join(log))
+        return i_code
+
+    if not _simulate(i_config, "pdflatex", run):
+        log.append("! Emergency stop (injected failure).")
+        return finish(1)
+
+    # Follow the \input / \include tree (depth-first, as TeX reads it)
+    errors = 0
+    chars  = 0
+    labels = {None: []} # Part (\include'd file, None for the main document) -> labels
+    parts  = []         # \include'd files, in order
+    only   = None       # \includeonly files
+    refs   = {"main": [], "acronym": []}
+    glossaries = False
+    stack  = [(tex_file, None)]
+    while stack:
+        file, part = stack.pop()
+        if not file.exists() and file.suffix != ".tex":
+            file = file.with_name(file.name + ".tex")
+        try:
+            text = _COMMENT_RE.sub("", file.read_text(encoding = "utf8", errors = "replace"))
+        except OSError:
+            log.append(f"! LaTeX Error: File `{file}' not found.")
+            errors += 1
+            if halt:
+                log.append("!  ==> Fatal error occurred, no output PDF file produced!")
+                return finish(1)
+            continue
+
+        log.append(f"({file})")
+        chars      += len(text)
+        glossaries |= "\\makeglossaries" in text
+        labels[part] += [lbl for lbl in _LABEL_RE.findall(text) if "#" not in lbl] # Not in macro definitions
+        for cmd, uid in _GLS_RE.findall(text):
+            refs["acronym" if cmd.startswith("acr") else "main"].append(uid)
+        for names in _ONLY_RE.findall(text):
+            only = {n.strip() for n in names.split(",")}
+
+        children = []
+        for cmd, name in _INPUT_RE.findall(text):
+            name = name.strip()
+            if cmd == "input":
+                children.append((Path(name), part))
+                continue
+            name = name[:-len(".tex")] if name.endswith(".tex") else name
+            parts.append(name)
+            if only is None or name in only:
+                labels[name] = []
+                children.append((Path(name), name))
+            elif out_dir.joinpath(f"{name}.aux").exists():
+                log.append(f"({out_dir.joinpath(name)}.aux)") # Left out: its .aux file is read instead
+            else:
+                log.append(f"No file {name}.aux.")
+        stack.extend(reversed(children))
+
+    pages = 1 + chars // CHARS_PER_PAGE
+
+    aux = ["\\relax"]
+    if glossaries:
+        aux += ["\\providecommand\\@newglossary[4]{}",
+                f"\\@newglossary{{main}}{{glg}}{{gls}}{{glo}}",
+                f"\\@newglossary{{acronym}}{{alg}}{{acr}}{{acn}}",
+                f"\\@istfilename{{{job}.ist}}"]
+        for name, ext in (("main", "glo"), ("acronym", "acn")):
+            out_dir.joinpath(f"{job}.{ext}").write_text("".join(f"\\glossaryentry{{{uid}}}\n" for uid in refs[name]))
+            if out_dir.joinpath(f"{job}.{'gls' if name == 'main' else 'acr'}").exists():
+                log.append(f"({out_dir.joinpath(job)}.{'gls' if name == 'main' else 'acr'})")
+    def newlabels(i_labels : list[str]) -> list[str]:
+        return [f"\\newlabel{{{lbl}}}{{{{{n + 1}}}{{{1 + n * pages // max(len(i_labels), 1)}}}}}" for n, lbl in enumerate(i_labels)]
+
+    aux += newlabels(labels.pop(None))
+    aux += [f"\\@input{{{name}.aux}}" for name in parts]
+    aux.append(f"\\gdef \\@abspage@last{{{pages}}}")
+    out_dir.joinpath(f"{job}.aux").write_text("\n".join(aux) + "\n")
+    for name, part_labels in labels.items():
+        part_aux = out_dir.joinpath(f"{name}.aux")
+        part_aux.parent.mkdir(parents = True, exist_ok = True)
+        part_aux.write_text("\n".join(["\\relax"] + newlabels(part_labels)) + "\n")
+
+    if errors:
+        log.append(f"{errors} error(s).")
+        return finish(1)
+
+    pdf = _pdf(pages)
+    out_dir.joinpath(f"{job}.pdf").write_bytes(pdf)
+    log.append(f"Output written on {out_dir.joinpath(job)}.pdf ({pages} pages, {len(pdf)} bytes).")
+    return finish(0)
+
+
+def makeglossaries(i_config : dict,
+                   i_args   : list[str]) -> int:
+    job        = None
+    transcript = None
+
+    args = iter(i_args)
+    for arg in args:
+        if arg == "-t":
+            transcript = next(args, None)
+        elif arg in ("-o", "-s", "-L", "-x", "-c"):
+            next(args, None) # Options with a value, without effect
+        elif not arg.startswith("-"):
+            job = arg[:-len(".aux")] if arg.endswith(".aux") else arg
+
+    if job is None:
+        print("Syntax: makeglossaries [options] <filename>")
+        return 1
+
+    run = _next_run(Path("."), job, "makeglossaries")
+    log = [f"makeglossaries (FakeTeX) (run {run})"]
+
+    def finish(i_code : int) -> int:
+        if transcript:
+            Path(transcript).write_text("\n".join(log) + "\n")
+        print("\n".join(log))
+        return i_code
+
+    if not _simulate(i_config, "makeglossaries", run):
+        log.append("Fatal error (injected failure).")
+        return finish(1)
+
+    try:
+        aux = Path(f"{job}.aux").read_text()
+    except OSError:
+        log.append(f"Fatal error: Unable to open '{job}.aux'")
+        return finish(1)
+
+    glossaries = _GLOSSARY_RE.findall(aux)
+    if not glossaries:
+        log.append(f"No \\@newglossary commands found in aux file '{job}.aux'")
+        return finish(1)
+
+    for name, _, out_ext, in_ext in glossaries:
+        in_file = Path(f"{job}.{in_ext}")
+        if not in_file.exists():
+            log.append(f"Warning: File '{in_file}' doesn't exist.")
+            continue
+        entries = sorted(set(in_file.read_text().splitlines()))
+        Path(f"{job}.{out_ext}").write_text("\n".join(entries) + "\n")
+        log.append(f"Glossary '{name}': {len(entries)} entries written into '{job}.{out_ext}'")
+
+    return finish(0)
+
+
+TOOLS = {"pdflatex"       : pdflatex,
+         "makeglossaries" : makeglossaries}
+
+
+def main(i_argv : list[str]) -> int:
+    if len(i_argv) < 2 or i_argv[1] not in TOOLS:
+        print(f"Usage: {Path(__file__).name} <config.json> ({'|'.join(TOOLS)}) [arguments]")
+        return 2
+
+    config = json.loads(Path(i_argv[0]).read_text())
+    return TOOLS[i_argv[1]](config, i_argv[2:])
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,197 @@
+#! python3
+import  io
+import  random
+from    pathlib                 import Path
+from    typing                  import IO
+from    typing                  import Union
+
+from    utils.xml_stream_writer import XmlStreamWriter
+from    requirement             import Requirement
+
+
+class SyntheticSpec:
+    """
+        Deterministic generator of synthetic Oudini documents, for benchmarking.
+
+        The same parameters (seed included) always give byte-identical XML. Requirements are spread in contiguous
+        blocks over the leaf sections of a section tree of depth 'section_depth' (each section having up to
+        'section_fanout' sub-sections). Each requirement has 'num_links' links to an upstream document, and a text of
+        'text_length' words with glossary references, inline math and a few LaTeX commands.
+    """
+    UPSTREAM_NAME = "SYN-UP"
+
+    WORDS = ("the", "component", "shall", "send", "receive", "command", "response", "within", "after", "before",
+             "status", "message", "field", "value", "check", "format", "log", "event", "when", "each", "valid",
+             "invalid", "mode", "state", "report", "error", "frame", "timeout", "request", "data", "configuration",
+             "interface", "version", "counter", "register", "buffer", "sequence", "and", "or", "not", "of", "to")
+
+    def __init__(self,
+                 i_num_reqs       : int = 1000,
+                 i_num_links      : int = 2,
+                 i_section_depth  : int = 2,
+                 i_glossary_size  : int = 50,
+                 i_text_length    : int = 60,
+                 i_section_fanout : int = 4,
+                 i_seed           : int = 0):
+        """
+            Constructor.
+        :param i_num_reqs      : Number of requirements
+        :param i_num_links     : Number of links (<satisfies>) per requirement
+        :param i_section_depth : Depth of the section tree (0: no section)
+        :param i_glossary_size : Number of glossary entries (half definitions, half acronyms)
+        :param i_text_length   : Number of words of each requirement text
+        :param i_section_fanout: Maximum number of sub-sections per section
+        :param i_seed          : Random seed
+        """
+        for name, value in (("i_num_reqs",       i_num_reqs),
+                            ("i_num_links",      i_num_links),
+                            ("i_section_depth",  i_section_depth),
+                            ("i_glossary_size",  i_glossary_size),
+                            ("i_text_length",    i_text_length),
+                            ("i_section_fanout", i_section_fanout),
+                            ("i_seed",           i_seed)):
+            assert isinstance(value, int) and value >= 0, f"{name} is {value!r}"
+        assert i_section_fanout >= 1, f"i_section_fanout is {i_section_fanout}"
+
+        self.num_reqs       = i_num_reqs
+        self.num_links      = i_num_links
+        self.section_depth  = i_section_depth
+        self.glossary_size  = i_glossary_size
+        self.text_length    = i_text_length
+        self.section_fanout = i_section_fanout
+        self.seed           = i_seed
+
+    def to_dict(self) -> dict:
+        """
+        :return: Parameters of the generator (i.e. to be stored along with benchmark results)
+        """
+        return {"num_reqs"       : self.num_reqs,
+                "num_links"      : self.num_links,
+                "section_depth"  : self.section_depth,
+                "glossary_size"  : self.glossary_size,
+                "text_length"    : self.text_length,
+                "section_fanout" : self.section_fanout,
+                "seed"           : self.seed}
+
+    @staticmethod
+    def glossary_uid(i_index : int) -> str:
+        return f"term{i_index:05d}"
+
+    def _text(self,
+              i_rng : random.Random) -> str:
+        words = []
+        for n in range(self.text_length):
+            roll = i_rng.random()
+            if self.glossary_size and roll < 0.05:
+                uid = self.glossary_uid(i_rng.randrange(self.glossary_size))
+                words.append(f"\\gls{{{uid}}}" if i_rng.random() < 0.5 else f"\\acrshort{{{uid}}}")
+            elif roll < 0.07:
+                words.append(f"$x_{{{n}}} \\leq {i_rng.randrange(1000)}$")
+            elif roll < 0.09:
+                words.append(f"\\textbf{{{i_rng.choice(self.WORDS)}}}")
+            else:
+                words.append(i_rng.choice(self.WORDS))
+        return " ".join(words)
+
+    def _leaf_paths(self) -> tuple[int, list[list[str]]]:
+        """
+            Internal method.
+        :return: Number of requirements per leaf section, and path of each leaf section (in document order)
+        """
+        if self.section_depth == 0 or self.num_reqs == 0:
+            return max(self.num_reqs, 1), [[]]
+
+        num_leaves = min(self.section_fanout ** self.section_depth, self.num_reqs)
+        per_leaf   = -(-self.num_reqs // num_leaves)
+        num_leaves = -(-self.num_reqs // per_leaf)
+
+        paths = []
+        for leaf in range(num_leaves):
+            digits = []
+            for _ in range(self.section_depth):
+                leaf, d = divmod(leaf, self.section_fanout)
+                digits.append(d)
+            paths.append([f"s{d}" for d in reversed(digits)])
+        return per_leaf, paths
+
+    def write(self,
+              i_file : Union[str, Path, IO]) -> None:
+        """
+            Write the synthetic document as XML into i_file (streamed: the document is never built in memory).
+        :param i_file: File name, or binary file object
+        """
+        rng = random.Random(self.seed)
+
+        with XmlStreamWriter.open(i_file) as w:
+            w.start("document")
+
+            w.start("general")
+            w.start("project", {"internal": "SYN", "pretty": "Synthetic project"})
+            w.end()
+            w.start("title", {"internal": "SYN-SRD", "pretty": "Synthetic SRD"})
+            w.end()
+            w.start("reqDisplayFormat", i_text = "SYN-REQ-{id:05d}")
+            w.end()
+            w.start("reqFileFormat", i_text = "SYN-REQ-{id:05d}.tex")
+            w.end()
+            w.end()
+
+            w.start("links")
+            w.start("document", {"internal": self.UPSTREAM_NAME, "source": self.UPSTREAM_NAME})
+            w.end()
+            w.end()
+
+            w.start("glossary", i_text = " ")
+            for n in range(self.glossary_size):
+                uid = self.glossary_uid(n)
+                if n % 2:
+                    w.start("acronym", {"uid": uid, "shorthand": f"T{n}"}, i_text = f"Synthetic acronym number {n}")
+                else:
+                    w.start("definition", {"uid": uid}, i_text = f"Synthetic definition number {n}")
+                w.end()
+            w.end()
+
+            w.start("requirements")
+            per_leaf, paths = self._leaf_paths()
+            current = []
+            req_id  = 1
+            for path in paths:
+                # Close the sections that are not shared with the previous leaf, then open the new ones
+                common = 0
+                while common < len(current) and current[common] == path[common]:
+                    common += 1
+                for _ in range(len(current) - common):
+                    w.end()
+                for name in path[common:]:
+                    w.start("sec", {"name": name})
+                current = path
+
+                for _ in range(min(per_leaf, self.num_reqs - req_id + 1)):
+                    w.start(Requirement.TAG_STR, {Requirement.ATTR_ID_STR        : f"{req_id:05d}",
+                                                  Requirement.ATTR_SHORT_DESC_STR: f"Synthetic requirement {req_id}"})
+                    w.start(Requirement.TEXT_TAG_STR, i_text = self._text(rng))
+                    w.end()
+                    if rng.random() < 0.8:
+                        w.start(Requirement.VALIDATION_TAG_STR,
+                                i_text = rng.choice(list(Requirement.ValidationStrategy)).value)
+                        w.end()
+                    for _ in range(self.num_links):
+                        w.start(Requirement.LinkRef.TAG_STR,
+                                {Requirement.LinkRef.ATTR_ID_STR    : f"{self.UPSTREAM_NAME}-REQ-{rng.randrange(max(self.num_reqs, 1)):05d}",
+                                 Requirement.LinkRef.ATTR_SOURCE_STR: self.UPSTREAM_NAME})
+                        w.end()
+                    w.end()
+                    req_id += 1
+            for _ in current:
+                w.end()
+            w.end()
+
+            w.end()
+
+    def to_bytes(self) -> bytes:
+        """
+        :return: Synthetic document as XML
+        """
+        buffer = io.BytesIO()
+        self.write(buffer)
+        return buffer.getvalue()
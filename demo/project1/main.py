@@ -16,6 +16,7 @@ from    latex.latex_generator   import LatexGenerator
 from    latex.miktex_compiler   import MiktexCompiler
 
 import  utils.logobj            as LogUtils
+from    utils.metrics           import Metrics, LogSink, JsonSink
 
 
 PROJECT_ROOT_DIR = Path(__file__).parent.resolve()
@@ -42,19 +43,24 @@ logging.getLogger("envutils").setLevel(logging.WARNING)
 logger = logging.getLogger(__name__)
 logger.warning(f"{'*'*5} Running script: {Path(__file__).parent.resolve()} {'*'*5}")
 
-doc = Document.from_xml(ElementTree.parse(os.path.join(PROJECT_ROOT_DIR, "SP-SRD-COMP1.xml")))
+# Per-stage timings and counters are logged, and written into logs/metrics.json (even if the build fails)
+with Metrics(i_sinks = [LogSink(),
+                        JsonSink(LOG_DIR.joinpath("metrics.json"))]):
 
-compiler = MiktexCompiler(i_miktex_bin_dir = Path("E:/miktex-portable/texmfs/install/miktex/bin/x64"))
+    doc = Document.from_xml(ElementTree.parse(os.path.join(PROJECT_ROOT_DIR, "SP-SRD-COMP1.xml")))
 
-latex_generator = LatexGenerator(i_project_root_dir = PROJECT_ROOT_DIR,
-                                 i_compiler         = compiler)
+    compiler = MiktexCompiler(i_miktex_bin_dir = Path("E:/miktex-portable/texmfs/install/miktex/bin/x64"))
 
+    latex_generator = LatexGenerator(i_project_root_dir      = PROJECT_ROOT_DIR,
+                                     i_compiler              = compiler,
+                                     i_traceability_matrices = True)
 
-start_time = timer()
 
-latex_generator.generate_and_compile(i_document = doc,
-                                     i_out_dir  = OUT_DIR)
+    start_time = timer()
 
-end_time = timer()
+    latex_generator.generate_and_compile(i_document = doc,
+                                         i_out_dir  = OUT_DIR)
+
+    end_time = timer()
 
 logger.info("Elapsed time: %f s" % (end_time - start_time))
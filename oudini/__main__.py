@@ -0,0 +1,8 @@
+#! python3
+"""
+    Entry point of 'python oudini <command>' (see cli.py).
+"""
+import  sys
+from    cli     import main
+
+sys.exit(main())
@@ -0,0 +1,169 @@
+#! python3
+import  io
+import  os
+import  time
+import  utils.metrics       as metrics
+from    pathlib             import Path
+from    pathlib             import PurePosixPath
+from    typing              import BinaryIO
+from    typing              import Iterator
+from    typing              import Optional
+from    typing              import Union
+
+from    utils.logobj        import LogObj
+
+
+class Bundle (LogObj):
+    """
+        In-memory set of generated files: relative path (i.e. 'matrix_to_SP-PIDS.tex') -> text content, in generation
+        order. See Generator.render_document.
+
+        A bundle can be iterated as (path, text) pairs, or written in one go into a folder (i.e. the working directory of
+        a compiler), a tar archive or a zip archive.
+    """
+    ENCODING = 'utf8'
+
+    # Note: tarfile and zipfile are only imported when an archive is written
+    TAR_MODES = {None  : "w",
+                 "gz"  : "w:gz",
+                 "bz2" : "w:bz2",
+                 "xz"  : "w:xz"}
+
+    def __init__(self):
+        LogObj.__init__(self)
+
+        self.files = {} # Posix relative path -> text
+        self.mtime = time.time() # Modification time of the archived files
+
+    @staticmethod
+    def normalize_path(i_path : Union[str, Path]) -> str:
+        """
+        :return: i_path as a posix relative path (i.e. 'snip/00001.tex')
+        """
+        assert isinstance(i_path, (str, Path)), f"type(i_path) is {type(i_path)}"
+
+        path = PurePosixPath(Path(i_path).as_posix())
+        if path.is_absolute() or Path(i_path).anchor or ".." in path.parts or not path.parts:
+            raise Exception(f"Invalid bundle path '{i_path}' (must be relative, inside the bundle)")
+        return str(path)
+
+    def add(self,
+            i_path : Union[str, Path],
+            i_text : str) -> None:
+        """
+            Add file i_path (relative path) with content i_text. An already present file is replaced.
+        """
+        assert isinstance(i_text, str), f"type(i_text) is {type(i_text)}"
+        self.files[self.normalize_path(i_path)] = i_text
+
+    def __getitem__(self, i_path : Union[str, Path]) -> str:
+        return self.files[self.normalize_path(i_path)]
+
+    def __contains__(self, i_path : Union[str, Path]) -> bool:
+        return self.normalize_path(i_path) in self.files
+
+    def __iter__(self) -> Iterator[tuple[str, str]]:
+        return iter(self.files.items())
+
+    def __len__(self) -> int:
+        return len(self.files)
+
+    def _iter_data(self) -> Iterator[tuple[str, bytes]]:
+        for path, text in self.files.items():
+            yield path, text.encode(self.ENCODING)
+
+    def write_dir(self,
+                  i_folder : Union[str, Path]) -> None:
+        """
+            Write all the files into folder i_folder (created if needed). Other files of the folder are left untouched.
+        """
+        assert isinstance(i_folder, (str, Path)), f"type(i_folder) is {type(i_folder)}"
+        folder = Path(i_folder)
+
+        self._d(f"Writing {len(self.files)} files into '{folder}'")
+        created = set()
+        size    = 0
+        for path, data in self._iter_data():
+            filename = folder.joinpath(path)
+            if filename.parent not in created:
+                os.makedirs(filename.parent, exist_ok = True)
+                created.add(filename.parent)
+            with open(filename, mode = 'wb') as file:
+                file.write(data)
+            size += len(data)
+
+        metrics.count("files_written", len(self.files))
+        metrics.count("bytes_written", size)
+
+    def write_tar(self,
+                  i_file        : Union[str, Path, BinaryIO],
+                  i_compression : Optional[str] = "gz",
+                  i_prefix      : str = "") -> None:
+        """
+            Write all the files into a tar archive.
+        :param i_file       : Archive file name, or binary file object
+        :param i_compression: None, 'gz', 'bz2' or 'xz'
+        :param i_prefix     : Folder of the files in the archive (i.e. 'snip')
+        """
+        import tarfile
+
+        assert isinstance(i_prefix, str), f"type(i_prefix) is {type(i_prefix)}"
+        if i_compression not in self.TAR_MODES:
+            raise Exception(f"Unknown tar compression '{i_compression}'")
+
+        if isinstance(i_file, (str, Path)):
+            archive = tarfile.open(name = i_file, mode = self.TAR_MODES[i_compression])
+        else:
+            archive = tarfile.open(fileobj = i_file, mode = self.TAR_MODES[i_compression])
+
+        with archive:
+            for path, data in self._iter_data():
+                info       = tarfile.TarInfo(name = str(PurePosixPath(i_prefix, path)))
+                info.size  = len(data)
+                info.mtime = self.mtime
+                archive.addfile(info, io.BytesIO(data))
+
+    def write_zip(self,
+                  i_file   : Union[str, Path, BinaryIO],
+                  i_prefix : str = "") -> None:
+        """
+            Write all the files into a (deflated) zip archive.
+        :param i_file  : Archive file name, or binary file object
+        :param i_prefix: Folder of the files in the archive (i.e. 'snip')
+        """
+        import zipfile
+
+        assert isinstance(i_prefix, str), f"type(i_prefix) is {type(i_prefix)}"
+
+        date_time = time.localtime(self.mtime)[:6]
+        with zipfile.ZipFile(i_file, mode = 'w', compression = zipfile.ZIP_DEFLATED) as archive:
+            for path, data in self._iter_data():
+                archive.writestr(zipfile.ZipInfo(filename  = str(PurePosixPath(i_prefix, path)),
+                                                 date_time = date_time),
+                                 data,
+                                 compress_type = zipfile.ZIP_DEFLATED)
+
+    def write(self,
+              i_target : Union[str, Path]) -> None:
+        """
+            Write the bundle according to the name of i_target: tar archive ('.tar', '.tar.gz', '.tgz', '.tar.bz2',
+            '.tar.xz'), zip archive ('.zip'), or folder otherwise.
+        """
+        assert isinstance(i_target, (str, Path)), f"type(i_target) is {type(i_target)}"
+        name = Path(i_target).name.lower()
+
+        if   name.endswith(".zip"):
+            self.write_zip(i_target)
+        elif name.endswith((".tar.gz", ".tgz")):
+            self.write_tar(i_target, "gz")
+        elif name.endswith(".tar.bz2"):
+            self.write_tar(i_target, "bz2")
+        elif name.endswith(".tar.xz"):
+            self.write_tar(i_target, "xz")
+        elif name.endswith(".tar"):
+            self.write_tar(i_target, None)
+        else:
+            self.write_dir(i_target)
+
+    def __repr__(self):
+        return f"<bundle of {len(self.files)} files, {sum(len(t) for t in self.files.values())} characters>"
@@ -0,0 +1,699 @@
+#! python3
+"""
+    OuDini command-line interface.
+
+        python oudini <command> [options]          (runs oudini/__main__.py)
+        python oudini/cli.py <command> [options]
+
+    Commands:
+        validate (parse)    Parse documents and report errors (and undefined glossary references)
+        generate            Generate the snippets of a document (LaTeX and/or HTML backends), into folders or archives
+        compile             Generate the LaTeX snippets of a document and compile it (or only some parts of it: --draft)
+        diff                Compare two versions of a document
+        merge               Three-way merge of concurrently edited versions of a document (usable as a git merge driver)
+        stats               Print statistics about a document
+        query               List the requirements of a document matching criteria
+        search              Full-text search of the requirements of documents (index kept next to each file)
+        links               Check the links between documents (dangling, duplicate, undeclared, uncovered)
+        export              Export the requirements or the links of documents as CSV or JSON lines
+        impact              List the requirements and documents affected by changed requirements, through the links
+        history             Record baselines of a document and query its history (see history.py)
+        daemon              Run the resident daemon (see daemon.py), or query / stop it
+
+    With --daemon, the command is run by the resident daemon if one is running (documents already parsed, see
+    daemon.py), and locally otherwise.
+
+    Startup time matters (i.e. 'validate' in a pre-commit hook): only argparse is imported up front. Each command
+    imports what it needs when it runs, and the generator backends are only imported when selected (see BACKENDS).
+    See benchmark/bench_startup.py for the startup budget.
+"""
+import  argparse
+import  sys
+
+
+# Backend name -> (module, class), imported on first use
+BACKENDS = {"latex" : ("latex.latex_generator", "LatexGenerator"),
+            "html"  : ("web.html_generator",    "HtmlGenerator")}
+
+EXIT_OK      = 0
+EXIT_FAILURE = 1 # Invalid document, differences found, error, etc. (argparse exits with 2 on usage errors)
+
+
+def load_backend(i_name : str) -> type:
+    """
+    :return: Generator class of backend i_name (its module is imported on first use)
+    """
+    import importlib
+
+    if i_name not in BACKENDS:
+        raise Exception(f"Unknown backend '{i_name}' (available: {', '.join(BACKENDS)})")
+    module, cls = BACKENDS[i_name]
+    return getattr(importlib.import_module(module), cls)
+
+
+# Workspace the documents are loaded from when run by the daemon (see set_workspace)
+_workspace = None
+
+
+def set_workspace(i_workspace) -> None:
+    """
+        Load the documents from workspace i_workspace (kept in memory between commands) instead of parsing them.
+    """
+    global _workspace
+    _workspace = i_workspace
+
+
+def _load(i_file : str):
+    """
+    :return: Document parsed from file i_file
+    """
+    if _workspace is not None:
+        return _workspace.get(i_file)
+
+    from document import Document
+    return Document.from_file(i_file)
+
+
+def _load_linked(i_files : list[str]) -> dict:
+    """
+    :return: Documents parsed from i_files, by name (internal title, as referenced by the links)
+    """
+    docs = {}
+    for file in i_files or ():
+        doc = _load(file)
+        docs[str(doc.common.title)] = doc
+    return docs
+
+
+def _generator_options(i_args : argparse.Namespace) -> dict:
+    from glossary_linker import GlossaryLinker
+
+    return {"i_prune_glossary"        : i_args.prune_glossary,
+            "i_link_glossary"         : GlossaryLinker.Mode(i_args.link_glossary) if i_args.link_glossary else None,
+            "i_section_snippets"      : i_args.sections,
+            "i_requirement_snippets"  : not i_args.no_requirements,
+            "i_traceability_matrices" : i_args.matrices or bool(i_args.linked)}
+
+
+def cmd_validate(i_args : argparse.Namespace) -> int:
+    status = EXIT_OK
+    for file in i_args.files:
+        try:
+            doc = _load(file)
+        except Exception as e:
+            print(f"{file}: error: {e}")
+            status = EXIT_FAILURE
+            continue
+
+        warnings = []
+        if doc.glossary is not None:
+            usage = doc.glossary.analyze_usage((req.format_id(), req.parsed_text) for req in doc.reqs.reqs.values())
+            for uid, where in usage.undefined.items():
+                warnings.append(f"undefined glossary entry '{uid}' referenced in {', '.join(where)}")
+
+        for w in warnings:
+            print(f"{file}: warning: {w}")
+        if warnings and i_args.strict:
+            status = EXIT_FAILURE
+        elif not i_args.quiet:
+            print(f"{file}: OK ({len(doc.reqs)} requirements)")
+    return status
+
+
+def cmd_generate(i_args : argparse.Namespace) -> int:
+    from pathlib import Path
+    from generator import Generator
+
+    doc     = _load(i_args.file)
+    outputs = {i_args.backend : i_args.out}
+    for also in i_args.also or ():
+        backend, sep, out = also.partition("=")
+        if not sep or not out or backend not in BACKENDS:
+            raise Exception(f"Invalid --also '{also}': expected BACKEND=OUT, with BACKEND in {', '.join(sorted(BACKENDS))}")
+        if backend in outputs:
+            raise Exception(f"Backend '{backend}' given several times")
+        outputs[backend] = out
+
+    # All the backends are rendered in a single pass over the document (see Generator.render_fanout)
+    generators = [load_backend(b)(i_project_root_dir = Path(i_args.project), **_generator_options(i_args)) for b in outputs]
+    bundles    = Generator.render_fanout(i_generators       = generators,
+                                         i_document         = doc,
+                                         i_linked_documents = _load_linked(i_args.linked))
+    for bundle, out in zip(bundles, outputs.values()):
+        bundle.write(out)
+        if not i_args.quiet:
+            print(f"{len(bundle)} files written into '{out}'")
+    return EXIT_OK
+
+
+def cmd_compile(i_args : argparse.Namespace) -> int:
+    from pathlib                import Path
+    from latex.latex_generator  import LatexGenerator
+    from latex.miktex_compiler  import MiktexCompiler
+
+    doc       = _load(i_args.file)
+    compiler  = MiktexCompiler(i_miktex_bin_dir = i_args.miktex_bin_dir,
+                               i_pdflatex_bin   = i_args.pdflatex_bin,
+                               i_glossaries_bin = i_args.glossaries_bin)
+    generator = LatexGenerator(i_project_root_dir = Path(i_args.project),
+                               i_compiler         = compiler,
+                               **_generator_options(i_args))
+    if i_args.draft:
+        parts = generator.generate_and_compile_draft(i_document         = doc,
+                                                     i_out_dir          = Path(i_args.out).resolve(),
+                                                     i_selection        = i_args.draft,
+                                                     i_linked_documents = _load_linked(i_args.linked))
+        if not i_args.quiet:
+            print(f"Draft of {len(parts)} parts: {', '.join(parts)}")
+        return EXIT_OK
+
+    generator.generate_and_compile(i_document         = doc,
+                                   i_out_dir          = Path(i_args.out).resolve(),
+                                   i_clean_before_run = not i_args.no_clean,
+                                   i_linked_documents = _load_linked(i_args.linked))
+    return EXIT_OK
+
+
+def cmd_diff(i_args : argparse.Namespace) -> int:
+    from document_diff import DocumentDiff
+
+    diff = DocumentDiff.from_documents(i_old = _load(i_args.old),
+                                       i_new = _load(i_args.new))
+    for change in diff.changes:
+        print(repr(change))
+    for kind, uids in (("added", diff.glossary_added), ("removed", diff.glossary_removed), ("modified", diff.glossary_changed)):
+        for uid in uids:
+            print(f"{kind} glossary entry '{uid}'")
+    if not i_args.quiet:
+        print(repr(diff))
+    return EXIT_FAILURE if diff else EXIT_OK
+
+
+def cmd_merge(i_args : argparse.Namespace) -> int:
+    import shutil
+    from pathlib import Path
+    from document import Document
+    from document_merge import DocumentMerge
+
+    # Our file (or a copy of it) is patched with the merged requirements (see DocumentMerge.apply): the rest of the file
+    # is kept as is. Not loaded through the workspace: the document is modified.
+    output = Path(i_args.output or i_args.ours)
+    if output.resolve() != Path(i_args.ours).resolve():
+        shutil.copy2(i_args.ours, output)
+    ours  = Document.from_file(output)
+    merge = DocumentMerge.from_documents(i_base   = _load(i_args.base),
+                                         i_ours   = ours,
+                                         i_theirs = _load(i_args.theirs))
+
+    patched = merge.apply(ours) and ours.save()
+    if not patched:
+        merge.document.write_xml(output, i_includes = bool(ours.reqs.parts))
+        merge.document.reqs.write_parts(output.parent)
+        print(f"warning: '{output}' written whole: its comments and the elements not kept by the model are lost")
+
+    for conflict in merge.conflicts:
+        print(f"conflict: {conflict!r}")
+    if not i_args.quiet:
+        print(repr(merge))
+    return EXIT_FAILURE if merge.conflicts or not patched else EXIT_OK
+
+
+def cmd_stats(i_args : argparse.Namespace) -> int:
+    doc  = _load(i_args.file)
+    reqs = doc.reqs
+
+    strategies = {}
+    for req in reqs.reqs.values():
+        name = req.validation_strategy.name if req.validation_strategy is not None else "None"
+        strategies[name] = strategies.get(name, 0) + 1
+
+    sections = [s for s in reqs.sections.walk() if s.name is not None]
+    stats = {"requirements"   : len(reqs),
+             "sections"       : len(sections),
+             "section_depth"  : max((s.depth for s in sections), default = 0),
+             "links"          : sum(len(r.links) for r in reqs.reqs.values()),
+             "links_by_source": {src: len(reqs.by_link_source(src)) for src in reqs.link_sources()},
+             "without_links"  : len(reqs.without_links()),
+             "validation"     : strategies,
+             "text_chars"     : sum(len(r.text or "") for r in reqs.reqs.values())}
+
+    if doc.glossary is not None:
+        usage = doc.glossary.analyze_usage((req.format_id(), req.parsed_text) for req in reqs.reqs.values())
+        stats["glossary"] = {"entries"   : len(doc.glossary),
+                             "unused"    : len(usage.unused),
+                             "undefined" : len(usage.undefined)}
+
+    if i_args.json:
+        import json
+        print(json.dumps(stats, indent = 4))
+    else:
+        for k, v in stats.items():
+            if isinstance(v, dict):
+                v = ", ".join(f"{kk}: {vv}" for kk, vv in v.items()) or "-"
+            print(f"{k:<16} {v}")
+    return EXIT_OK
+
+
+def cmd_query(i_args : argparse.Namespace) -> int:
+    from requirement import Requirement
+
+    kwargs = {"i_link_source" : i_args.source,
+              "i_id_min"      : i_args.min,
+              "i_id_max"      : i_args.max,
+              "i_has_links"   : i_args.links}
+    if i_args.validation is not None:
+        kwargs["i_validation"] = None if i_args.validation == "none" else \
+                                 {s.name.lower(): s for s in Requirement.ValidationStrategy}[i_args.validation]
+
+    if i_args.ids and _workspace is None and all(v is None for v in kwargs.values()) and "i_validation" not in kwargs:
+        # Lookup by ID only: only the requested requirements are parsed (see LazyDocument)
+        from lazy_document import LazyDocument
+        try:
+            doc = LazyDocument.open(i_args.file)
+        except Exception:
+            doc = _load(i_args.file) # Split document (see LazyDocument.open)
+        reqs  = doc.reqs
+        found = [reqs.reqs[i] for i in sorted(set(i_args.ids)) if i in reqs.reqs]
+    else:
+        doc   = _load(i_args.file)
+        reqs  = doc.reqs
+        found = reqs.query(**kwargs)
+        if i_args.ids:
+            ids   = set(i_args.ids)
+            found = [req for req in found if req.id in ids]
+
+    rows = [{"id"         : req.id,
+             "name"       : req.format_id(),
+             "desc"       : req.desc,
+             "section"    : reqs.section_of(req).full_name(),
+             "validation" : req.validation_strategy.name if req.validation_strategy is not None else None,
+             "links"      : [f"{lnk.source}:{lnk.id}" for lnk in req.links],
+             "text"       : (req.text or "").strip()} for req in found]
+
+    if i_args.json:
+        import json
+        print(json.dumps(rows, indent = 4))
+    else:
+        for row in rows:
+            print(f"{row['name']:<16} {row['desc']}" + (f"  [{', '.join(row['links'])}]" if row["links"] else ""))
+        if not i_args.quiet:
+            print(f"{len(rows)} requirements")
+    return EXIT_OK
+
+
+def cmd_search(i_args : argparse.Namespace) -> int:
+    from search_index import SearchIndex
+
+    # One index per file (documents of different files may have the same name)
+    hits = [] # (hit, file, document)
+    for f in i_args.files:
+        if _workspace is not None:
+            doc, index = _workspace.get_indexed(f) # Indexed by the workspace as the documents are parsed
+        else:
+            doc   = _load(f)
+            index = SearchIndex.for_document_file(i_xml_filename = f,
+                                                  i_document     = doc) # Stored next to the file, updated if it changed
+        hits += [(hit, f, doc) for hit in index.search(i_args.query)]
+    hits.sort(key = lambda h: -h[0].score)
+    if i_args.limit is not None:
+        hits = hits[:i_args.limit]
+
+    rows = []
+    for hit, file, doc in hits:
+        req = doc.reqs.reqs[hit.req_id]
+        rows.append({"document" : hit.document,
+                     "file"     : file,
+                     "id"       : req.id,
+                     "name"     : req.format_id(),
+                     "desc"     : req.desc,
+                     "score"    : round(hit.score, 3)})
+
+    if i_args.json:
+        import json
+        print(json.dumps(rows, indent = 4))
+    else:
+        for row in rows:
+            print(f"{row['score']:7.3f}  {row['name']:<16} {row['desc']}" + (f"  ({row['file']})" if len(i_args.files) > 1 else ""))
+        if not i_args.quiet:
+            print(f"{len(rows)} requirements")
+    return EXIT_OK if rows else EXIT_FAILURE
+
+
+def cmd_links(i_args : argparse.Namespace) -> int:
+    from link_validation import LinkValidator
+
+    if _workspace is not None:
+        validator = LinkValidator.from_documents(_load(f) for f in i_args.files)
+    else:
+        validator = LinkValidator.from_files(i_args.files, i_workers = i_args.workers)
+    report = validator.validate()
+
+    if i_args.json:
+        import json
+        print(json.dumps([issue.to_dict() for issue in report.issues], indent = 4))
+    else:
+        for issue in report.issues:
+            if issue.is_error or not i_args.quiet:
+                print(f"{'error' if issue.is_error else 'warning'}: {issue!r}")
+        if not i_args.quiet:
+            print(repr(report))
+
+    return EXIT_FAILURE if report.errors or (i_args.strict and report.warnings) else EXIT_OK
+
+
+def cmd_export(i_args : argparse.Namespace) -> int:
+    from export import TableExport
+
+    if i_args.files:
+        docs = [_load(f) for f in i_args.files]
+    elif _workspace is not None:
+        # Whole workspace: every document held by the daemon
+        docs = [_workspace.get(f) for f in list(_workspace.documents)]
+    else:
+        raise Exception("No document to export (documents must be given when not run by the daemon)")
+
+    export = TableExport(docs)
+    if i_args.output:
+        num_rows = export.write(i_args.output, i_args.table, i_args.format)
+    else:
+        num_rows = export.write(sys.stdout, i_args.table, i_args.format)
+    if i_args.output and not i_args.quiet:
+        print(f"{num_rows} {i_args.table} rows written into '{i_args.output}'")
+    return EXIT_OK
+
+
+def cmd_impact(i_args : argparse.Namespace) -> int:
+    from impact_analysis import LinkGraph
+
+    if _workspace is not None:
+        graph = LinkGraph.from_documents(_load(f) for f in i_args.files)
+    else:
+        graph = LinkGraph.from_files(i_args.files, i_workers = i_args.workers)
+
+    changed = []
+    for item in i_args.changed or ():
+        doc, sep, req = item.partition(":")
+        if not sep:
+            raise Exception(f"Invalid changed requirement '{item}' (expected <document>:<requirement>)")
+        changed.append((doc, req))
+
+    if i_args.diff:
+        from document_diff import DocumentDiff
+
+        new  = _load(i_args.diff[1])
+        name = str(new.common.title)
+        if name not in graph.tables:
+            graph.add_document(new)
+        changed.extend((name, change.name) for change in DocumentDiff.from_documents(i_old = _load(i_args.diff[0]),
+                                                                                     i_new = new).changes)
+
+    report = graph.impact(changed, i_max_depth = i_args.depth)
+
+    if i_args.json:
+        import json
+        print(json.dumps(report.to_dict(), indent = 4))
+    else:
+        for item in report.unknown:
+            print(f"warning: unknown requirement {item[0]}:{item[1]}")
+        for cycle in report.cycles:
+            print(f"warning: cycle of links {' -> '.join(f'{d}:{r}' for d, r in cycle)}")
+        tests = set(report.tests)
+        for item, via in report.affected.items():
+            print(f"{item[0]}:{item[1]:<24} <- {via[0]}:{via[1]}" + ("  [test]" if item in tests else ""))
+        if not i_args.quiet:
+            print(f"documents to regenerate: {', '.join(report.documents) or '-'}")
+            print(repr(report))
+    return EXIT_OK
+
+
+def cmd_history(i_args : argparse.Namespace) -> int:
+    from pathlib import Path
+    from history import HistoryStore
+
+    store_file = Path(i_args.store) if i_args.store else Path(i_args.file).parent / HistoryStore.DEFAULT_FILENAME
+
+    if i_args.action == "record":
+        doc = _load(i_args.file)
+    elif _workspace is not None:
+        doc = _load(i_args.file)
+    else:
+        # Only the common section is needed (document name)
+        from lazy_document import LazyDocument
+        try:
+            doc = LazyDocument.open(i_args.file)
+        except Exception:
+            doc = _load(i_args.file)
+    name = str(doc.common.title)
+
+    with HistoryStore(store_file) as store:
+        if i_args.action == "record":
+            baseline = store.record(doc, i_args.baseline, i_parent = i_args.parent)
+            if not i_args.quiet:
+                print(repr(baseline))
+
+        elif i_args.action == "list":
+            for b in store.baselines(name):
+                print(f"{b!r}  {len(store.snapshot(name, b.name))} requirements")
+
+        elif i_args.action == "log":
+            previous = None
+            for baseline, digest, section in store.history(name, i_args.id, i_args.baseline):
+                if digest is None:
+                    state = "removed"
+                elif previous is None:
+                    state = "added"
+                else:
+                    fields = [f for f, v in store.fields(digest, section).items() if previous[f] != v]
+                    state  = f"modified ({', '.join(fields)})" if fields else "reformatted"
+                previous = store.fields(digest, section) if digest is not None else None
+                print(f"{baseline.name:<16} {baseline.format_id(i_args.id):<16} {state}")
+
+        elif i_args.action == "show":
+            baseline = store.baseline(name, i_args.baseline)
+            entry    = store.snapshot(name, baseline.name).get(i_args.id)
+            if entry is None:
+                raise Exception(f"No requirement {i_args.id} in baseline '{baseline.name}'")
+            print(store.data(entry[0]).decode("utf-8"))
+
+        else:
+            diff = store.changes(name, i_args.old, i_args.new)
+            for change in diff.changes:
+                print(repr(change))
+            if not i_args.quiet:
+                print(f"{len(diff.changes)} requirement changes")
+            return EXIT_FAILURE if diff else EXIT_OK
+    return EXIT_OK
+
+
+def cmd_daemon(i_args : argparse.Namespace) -> int:
+    from daemon import Daemon
+    from daemon import DaemonClient
+
+    if _workspace is not None:
+        raise Exception("Daemon commands can not be run by the daemon")
+
+    if i_args.status or i_args.stop:
+        client = DaemonClient(i_args.state_file)
+        if not client.available():
+            print("No daemon running")
+            return EXIT_FAILURE
+        if i_args.stop:
+            client.shutdown()
+        else:
+            import json
+            print(json.dumps(client.status(), indent = 4))
+        return EXIT_OK
+
+    Daemon(i_state_file    = i_args.state_file,
+           i_port          = i_args.port,
+           i_poll_interval = i_args.poll).serve(i_preload = i_args.preload)
+    return EXIT_OK
+
+
+def _forward_to_daemon(i_args : argparse.Namespace,
+                       i_argv : list[str]) -> int:
+    """
+        Run the command in the daemon.
+    :return: Exit code of the command, or None if no daemon is running
+    """
+    from daemon import DaemonClient
+
+    client = DaemonClient(i_args.state_file)
+    if not client.available():
+        return None
+
+    result = client.run(i_argv)
+    sys.stdout.write(result["stdout"])
+    sys.stderr.write(result["stderr"])
+    return result["status"]
+
+
+def _add_generator_arguments(i_parser : argparse.ArgumentParser) -> None:
+    i_parser.add_argument("file",                                       help = "Document (XML)")
+    i_parser.add_argument("--project",          default = ".",          help = "Project root folder (templates)")
+    i_parser.add_argument("--linked",           action = "append",      help = "Linked document (XML), for the traceability matrices (repeatable)")
+    i_parser.add_argument("--sections",         action = "store_true",  help = "Generate one snippet per section")
+    i_parser.add_argument("--matrices",         action = "store_true",  help = "Generate the traceability matrices")
+    i_parser.add_argument("--no-requirements",  action = "store_true",  help = "Do not write the individual requirement snippets")
+    i_parser.add_argument("--prune-glossary",   action = "store_true",  help = "Only generate the referenced glossary entries")
+    i_parser.add_argument("--link-glossary",    choices = ("first", "all"), help = "Link the glossary terms found in the texts")
+
+
+def make_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog = "oudini", description = "OuDini requirements management")
+    parser.add_argument("-v", "--verbose", action = "count", default = 0,    help = "Show the log (-vv for debug)")
+    parser.add_argument("-q", "--quiet",   action = "store_true",            help = "Only report problems")
+    parser.add_argument("--timing",        action = "store_true",            help = "Print the duration of the processing stages")
+    parser.add_argument("--daemon",        action = "store_true",            help = "Run the command in the daemon, if running")
+    parser.add_argument("--state-file",                                      help = "State file of the daemon (default: ~/.oudini-daemon.json)")
+    commands = parser.add_subparsers(dest = "command", metavar = "command", required = True)
+
+    p = commands.add_parser("validate", aliases = ["parse"], help = "Parse documents and report errors")
+    p.add_argument("files", nargs = "+",                        help = "Documents (XML)")
+    p.add_argument("--strict", action = "store_true",           help = "Warnings are errors")
+    p.set_defaults(func = cmd_validate)
+
+    p = commands.add_parser("generate", help = "Generate the snippets of a document")
+    _add_generator_arguments(p)
+    p.add_argument("--backend", choices = sorted(BACKENDS), default = "latex")
+    p.add_argument("--out", required = True,                    help = "Output folder, or archive (.zip, .tar, .tar.gz...)")
+    p.add_argument("--also", action = "append", metavar = "BACKEND=OUT",
+                                                                help = "Also generate with another backend, in the same pass (repeatable)")
+    p.set_defaults(func = cmd_generate)
+
+    p = commands.add_parser("compile", help = "Generate the LaTeX snippets of a document and compile it")
+    _add_generator_arguments(p)
+    p.add_argument("--out", required = True,                    help = "Output folder (PDF)")
+    p.add_argument("--no-clean", action = "store_true",         help = "Do not delete the output folder first")
+    p.add_argument("--draft", action = "append", metavar = "SECTION|REQ",
+                                                                help = "Only compile the \\include'd parts holding these sections or requirements, "
+                                                                       "reusing the last full compilation into --out (repeatable)")
+    p.add_argument("--miktex-bin-dir",                          help = "Folder of the TeX executables (if not in PATH)")
+    p.add_argument("--pdflatex-bin",   default = "pdflatex")
+    p.add_argument("--glossaries-bin", default = "makeglossaries-lite")
+    p.set_defaults(func = cmd_compile)
+
+    p = commands.add_parser("diff", help = "Compare two versions of a document (exit code 1 if they differ)")
+    p.add_argument("old")
+    p.add_argument("new")
+    p.set_defaults(func = cmd_diff)
+
+    p = commands.add_parser("merge", help = "Three-way merge of a document (exit code 1 on conflicts, or if the result is not a patch of ours)")
+    p.add_argument("base",                                      help = "Common ancestor (XML)")
+    p.add_argument("ours",                                      help = "Our version (XML), overwritten by the result unless --output is given")
+    p.add_argument("theirs",                                    help = "Their version (XML)")
+    p.add_argument("-o", "--output",                            help = "Output file")
+    p.set_defaults(func = cmd_merge)
+
+    p = commands.add_parser("stats", help = "Print statistics about a document")
+    p.add_argument("file")
+    p.add_argument("--json", action = "store_true")
+    p.set_defaults(func = cmd_stats)
+
+    p = commands.add_parser("query", help = "List the requirements of a document matching criteria")
+    p.add_argument("file")
+    p.add_argument("ids", nargs = "*", type = int,              help = "Requirement IDs (all if none)")
+    p.add_argument("--min", type = int,                         help = "Lowest ID")
+    p.add_argument("--max", type = int,                         help = "Highest ID")
+    p.add_argument("--source",                                  help = "Linked document (i.e. SP-PIDS)")
+    p.add_argument("--validation", choices = ("inspection", "analysis", "demonstration", "test", "none"))
+    p.add_argument("--links",    dest = "links", action = "store_const", const = True,  help = "Only requirements with links")
+    p.add_argument("--no-links", dest = "links", action = "store_const", const = False, help = "Only requirements without links")
+    p.add_argument("--json", action = "store_true")
+    p.set_defaults(func = cmd_query)
+
+    p = commands.add_parser("search", help = "Full-text search of requirements (exit code 1 if none found)")
+    p.add_argument("query",                                     help = 'Terms, "phrases", prefix* and glossary references (all must match)')
+    p.add_argument("files", nargs = "+",                        help = "Documents (XML)")
+    p.add_argument("--limit", type = int,                       help = "Maximum number of results")
+    p.add_argument("--json", action = "store_true")
+    p.set_defaults(func = cmd_search)
+
+    p = commands.add_parser("links", help = "Check the links between documents (exit code 1 on errors)")
+    p.add_argument("files", nargs = "+",                        help = "Documents (XML): the linked documents must be given too")
+    p.add_argument("--workers", type = int,                     help = "Number of parsing processes (default: one per CPU)")
+    p.add_argument("--strict", action = "store_true",           help = "Warnings (uncovered requirements...) are errors")
+    p.add_argument("--json", action = "store_true")
+    p.set_defaults(func = cmd_links)
+
+    p = commands.add_parser("export", help = "Export the requirements or the links of documents (CSV, JSON lines)")
+    p.add_argument("files",    nargs = "*",                     help = "Documents (XML), all the documents of the daemon if none")
+    p.add_argument("--table",  choices = ("requirements", "links"), default = "requirements", help = "Exported table")
+    p.add_argument("--format", choices = ("csv", "jsonl"),      default = "csv", help = "Output format")
+    p.add_argument("-o", "--output",                            help = "Output file (default: standard output)")
+    p.set_defaults(func = cmd_export)
+
+    p = commands.add_parser("impact", help = "List what depends on changed requirements, through the links")
+    p.add_argument("files",    nargs = "+",                     help = "Documents (XML)")
+    p.add_argument("-c", "--changed", action = "append",        help = "Changed requirement, as <document>:<requirement> (i.e. SP-PIDS:SP-PIDS-REQ-20000, repeatable)")
+    p.add_argument("--diff",   nargs = 2, metavar = ("OLD", "NEW"), help = "Changed requirements: differences between two versions of a document")
+    p.add_argument("--depth",  type = int,                      help = "Maximum number of links followed")
+    p.add_argument("--workers", type = int,                     help = "Number of parsing processes (default: one per CPU)")
+    p.add_argument("--json",   action = "store_true",           help = "JSON output")
+    p.set_defaults(func = cmd_impact)
+
+    p = commands.add_parser("history", help = "Record baselines of a document and query its history")
+    p.add_argument("--store",                                   help = "History store (default: .oudini-history.db next to the document)")
+    actions = p.add_subparsers(dest = "action", metavar = "action", required = True)
+    a = actions.add_parser("record", help = "Record the current state of the document as a baseline")
+    a.add_argument("file",                                      help = "Document (XML)")
+    a.add_argument("baseline",                                  help = "Name of the baseline (i.e. A-pr1)")
+    a.add_argument("--parent",                                  help = "Baseline the changes are recorded from (default: latest)")
+    a = actions.add_parser("list",   help = "List the baselines of the document")
+    a.add_argument("file",                                      help = "Document (XML)")
+    a = actions.add_parser("log",    help = "List the changes of a requirement along the baselines")
+    a.add_argument("file",                                      help = "Document (XML)")
+    a.add_argument("id",       type = int,                      help = "Requirement ID")
+    a.add_argument("--baseline",                                help = "Last baseline (default: latest)")
+    a = actions.add_parser("show",   help = "Print a requirement as recorded in a baseline")
+    a.add_argument("file",                                      help = "Document (XML)")
+    a.add_argument("id",       type = int,                      help = "Requirement ID")
+    a.add_argument("--baseline",                                help = "Baseline (default: latest)")
+    a = actions.add_parser("diff",   help = "Compare two baselines (exit code 1 if they differ)")
+    a.add_argument("file",                                      help = "Document (XML)")
+    a.add_argument("old",                                       help = "Reference baseline")
+    a.add_argument("new",      nargs = "?",                     help = "New baseline (default: latest)")
+    p.set_defaults(func = cmd_history)
+
+    p = commands.add_parser("daemon", help = "Run the resident daemon (foreground)")
+    p.add_argument("--port",   type = int,   default = 0,       help = "Port (127.0.0.1), any free port by default")
+    p.add_argument("--poll",   type = float, default = 1.0,     help = "Period of the source files check (s), 0 to disable")
+    p.add_argument("--preload", nargs = "*",                    help = "Documents to parse on startup")
+    p.add_argument("--status", action = "store_true",           help = "Print the status of the running daemon")
+    p.add_argument("--stop",   action = "store_true",           help = "Stop the running daemon")
+    p.set_defaults(func = cmd_daemon)
+
+    return parser
+
+
+def main(i_argv : list[str] = None) -> int:
+    args = make_parser().parse_args(i_argv)
+
+    import logging
+    logging.basicConfig(level  = {0: logging.ERROR, 1: logging.INFO}.get(args.verbose, logging.DEBUG),
+                        format = "[%(levelname)-8s][%(name)s] %(message)s")
+
+    try:
+        if args.daemon and args.command != "daemon" and _workspace is None:
+            status = _forward_to_daemon(args, [a for a in (i_argv if i_argv is not None else sys.argv[1:]) if a != "--daemon"])
+            if status is not None:
+                return status
+
+        if not args.timing:
+            return args.func(args)
+
+        from utils.metrics import Metrics
+        with Metrics() as m:
+            status = args.func(args)
+        for path, duration in m.totals().items():
+            print(f"{path:<40} {duration * 1000:10.1f} ms", file = sys.stderr)
+        return status
+    except Exception as e:
+        if args.verbose:
+            raise
+        print(f"oudini {args.command}: error: {e}", file = sys.stderr)
+        return EXIT_FAILURE
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,6 +3,7 @@ from    utils.logobj    import LogObj
 from    document        import Document
 
 from    pathlib         import Path
+from    typing          import Iterable
 from    typing          import Optional
 from    typing          import Union
 
@@ -28,3 +29,18 @@ class Compiler (LogObj):
         :param i_document       : TODO
         """
         raise NotImplementedError()
+
+    def run_draft(self,
+                  i_doc_root_dir  : Union[str, Path],
+                  i_output_dir    : Union[str, Path],
+                  i_document      : Optional[Document],
+                  i_include_only  : Iterable[str]) -> None:
+        """
+            Compile only some parts of the document (\\includeonly), reusing the auxiliary files of the last full
+            compilation (see run) into i_output_dir for the other parts.
+        :param i_doc_root_dir   : Folder of the LaTeX project (see run)
+        :param i_output_dir     : Output folder of the last full compilation
+        :param i_document       : Compiled document
+        :param i_include_only   : Parts to compile: names of files \\include'd by the document (i.e. 'snip/sec-input-commands')
+        """
+        raise NotImplementedError()
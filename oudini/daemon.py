@@ -0,0 +1,305 @@
+#! python3
+"""
+    OuDini resident daemon: keeps the parsed documents in memory between requests (see workspace.py), so that editor
+    integrations and CI steps can make repeated requests without paying for the interpreter startup, the imports and
+    the XML parsing each time.
+
+        python oudini daemon [--port 0] [--poll 1.0] [--preload doc.xml...]    (runs in the foreground)
+        python oudini --daemon validate doc.xml                                (forwarded to the daemon if running)
+        python oudini daemon --status | --stop
+
+    Protocol: HTTP on 127.0.0.1, JSON bodies. The port and an access token are written into the state file
+    (DaemonClient.DEFAULT_STATE_FILE, only readable by the user); each request carries the token in the TOKEN_HEADER
+    header.
+        GET  /status            -> {"pid", "uptime", "requests", "workspace": {...}}
+        POST /run               {"argv": [...], "cwd": "..."} -> {"status", "stdout", "stderr"}
+        POST /shutdown          -> {}
+
+    /run executes any command of cli.py, as from the command line in folder cwd, with the documents served from the
+    workspace. Requests are handled one at a time (the compilation changes the working directory of the process).
+
+    The client side (DaemonClient) does not import the document model: the server side imports are done by Daemon.
+"""
+import  json
+import  os
+from    pathlib                 import Path
+from    typing                  import Optional
+from    typing                  import Union
+
+from    utils.logobj            import LogObj
+
+
+TOKEN_HEADER = "X-Oudini-Token"
+
+
+class DaemonClient:
+    """
+        Client of a running daemon, located through its state file.
+    """
+    DEFAULT_STATE_FILE = Path.home().joinpath(".oudini-daemon.json")
+
+    def __init__(self,
+                 i_state_file : Optional[Union[str, Path]] = None,
+                 i_timeout    : Optional[float]            = None):
+        """
+        :param i_state_file: State file written by the daemon (DEFAULT_STATE_FILE if None)
+        :param i_timeout   : Timeout of the requests (s), None for no timeout (compilations can be long)
+        """
+        assert isinstance(i_state_file, (str, Path, type(None))), f"type(i_state_file) is {type(i_state_file)}"
+
+        self.state_file = Path(i_state_file) if i_state_file is not None else self.DEFAULT_STATE_FILE
+        self.timeout    = i_timeout
+        self.state      = None
+
+    def _read_state(self) -> Optional[dict]:
+        try:
+            with open(self.state_file, mode = 'r') as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+
+    def _request(self,
+                 i_method : str,
+                 i_path   : str,
+                 i_body   : Optional[dict] = None) -> dict:
+        import http.client
+
+        if self.state is None:
+            self.state = self._read_state()
+            if self.state is None:
+                raise ConnectionRefusedError(f"No daemon state file '{self.state_file}'")
+
+        data = json.dumps(i_body).encode('utf8') if i_body is not None else None
+        conn = http.client.HTTPConnection("127.0.0.1", self.state["port"], timeout = self.timeout)
+        try:
+            conn.request(i_method, i_path, body = data, headers = {TOKEN_HEADER   : self.state["token"],
+                                                                   "Content-Type" : "application/json"})
+            response = conn.getresponse()
+            reply    = json.loads(response.read() or b"{}")
+        finally:
+            conn.close()
+
+        if response.status != 200:
+            raise Exception(f"Daemon error {response.status}: {reply.get('error', response.reason)}")
+        return reply
+
+    def available(self) -> bool:
+        """
+        :return: True if a daemon answers
+        """
+        try:
+            self.status()
+            return True
+        except Exception:
+            self.state = None
+            return False
+
+    def status(self) -> dict:
+        return self._request("GET", "/status")
+
+    def run(self,
+            i_argv : list[str],
+            i_cwd  : Optional[Union[str, Path]] = None) -> dict:
+        """
+            Run a command of the command-line interface in the daemon.
+        :param i_argv: Command-line arguments (i.e. ["validate", "doc.xml"])
+        :param i_cwd : Folder the relative paths of i_argv are relative to (current folder if None)
+        :return      : {"status": exit code, "stdout": output, "stderr": error output}
+        """
+        assert isinstance(i_argv, list), f"type(i_argv) is {type(i_argv)}"
+        return self._request("POST", "/run", {"argv" : i_argv,
+                                              "cwd"  : str(i_cwd if i_cwd is not None else os.getcwd())})
+
+    def shutdown(self) -> None:
+        self._request("POST", "/shutdown")
+
+
+class Daemon (LogObj):
+    """
+        HTTP server answering the DaemonClient requests (see module documentation).
+    """
+
+    def __init__(self,
+                 i_state_file    : Optional[Union[str, Path]] = None,
+                 i_port          : int                        = 0,
+                 i_poll_interval : float                      = 1.0):
+        """
+        :param i_state_file   : State file to write the port and the token into (DaemonClient.DEFAULT_STATE_FILE if None)
+        :param i_port         : Port to listen on (127.0.0.1 only), 0 for any free port
+        :param i_poll_interval: Period (s) of the check of the source files (see Workspace.refresh), 0 to only check
+                                them when they are accessed
+        """
+        import  secrets
+        import  time
+        import  cli
+        from    workspace       import Workspace
+
+        assert isinstance(i_state_file,    (str, Path, type(None))), f"type(i_state_file) is {type(i_state_file)}"
+        assert isinstance(i_port,          int),                     f"type(i_port) is {type(i_port)}"
+        assert isinstance(i_poll_interval, (int, float)),            f"type(i_poll_interval) is {type(i_poll_interval)}"
+
+        LogObj.__init__(self)
+
+        self.state_file    = Path(i_state_file) if i_state_file is not None else DaemonClient.DEFAULT_STATE_FILE
+        self.port          = i_port
+        self.poll_interval = i_poll_interval
+        self.token         = secrets.token_hex(16)
+        self.workspace     = Workspace()
+        self.requests      = 0
+        self.started       = time.time()
+        self.server        = None
+
+        # The documents of the commands are served from the workspace
+        cli.set_workspace(self.workspace)
+
+    def run(self,
+            i_argv : list[str],
+            i_cwd  : str) -> dict:
+        """
+            Run a command of the command-line interface, from folder i_cwd.
+        :return: {"status": exit code, "stdout": output, "stderr": error output}
+        """
+        import  contextlib
+        import  io
+        import  cli
+
+        assert isinstance(i_argv, list) and all(isinstance(a, str) for a in i_argv), "i_argv must be a list of str"
+        i_argv = [a for a in i_argv if a != "--daemon"]
+
+        stdout = io.StringIO()
+        stderr = io.StringIO()
+        cwd    = os.getcwd()
+        try:
+            os.chdir(i_cwd)
+            with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+                try:
+                    status = cli.main(i_argv)
+                except SystemExit as e:    # argparse usage error, --help
+                    status = e.code if isinstance(e.code, int) else cli.EXIT_FAILURE
+        finally:
+            os.chdir(cwd)
+
+        self.requests += 1
+        return {"status" : status,
+                "stdout" : stdout.getvalue(),
+                "stderr" : stderr.getvalue()}
+
+    def status(self) -> dict:
+        import time
+
+        return {"pid"       : os.getpid(),
+                "uptime"    : time.time() - self.started,
+                "requests"  : self.requests,
+                "workspace" : self.workspace.status()}
+
+    def _watch(self) -> None:
+        import time
+
+        while True:
+            time.sleep(self.poll_interval)
+            for filename in self.workspace.refresh():
+                self._i(f"Parsed '{filename}' again")
+
+    def _make_handler(self) -> type:
+        import  hmac
+        from    http.server     import BaseHTTPRequestHandler
+
+        daemon = self
+
+        class Handler (BaseHTTPRequestHandler):
+            def _reply(self,
+                       i_code : int,
+                       i_body : dict) -> None:
+                data = json.dumps(i_body).encode('utf8')
+                self.send_response(i_code)
+                self.send_header("Content-Type",   "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _authorized(self) -> bool:
+                if hmac.compare_digest(self.headers.get(TOKEN_HEADER, ""), daemon.token):
+                    return True
+                self._reply(403, {"error" : "invalid token"})
+                return False
+
+            def do_GET(self):
+                if not self._authorized():
+                    return
+                if self.path == "/status":
+                    self._reply(200, daemon.status())
+                else:
+                    self._reply(404, {"error" : f"unknown request '{self.path}'"})
+
+            def do_POST(self):
+                if not self._authorized():
+                    return
+                try:
+                    length = int(self.headers.get("Content-Length", 0))
+                    body   = json.loads(self.rfile.read(length) or b"{}")
+                    if self.path == "/run":
+                        self._reply(200, daemon.run(body["argv"], body.get("cwd", os.getcwd())))
+                    elif self.path == "/shutdown":
+                        self._reply(200, {})
+                        daemon.shutdown()
+                    else:
+                        self._reply(404, {"error" : f"unknown request '{self.path}'"})
+                except Exception as e:
+                    self._reply(500, {"error" : str(e)})
+
+            def log_message(self, i_format, *i_args):
+                daemon._d(i_format % i_args)
+
+        return Handler
+
+    def _write_state(self) -> None:
+        state = {"port"  : self.server.server_address[1],
+                 "token" : self.token,
+                 "pid"   : os.getpid()}
+        fd = os.open(self.state_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, mode = 'w') as file:
+            json.dump(state, file)
+
+    def _remove_state(self) -> None:
+        # Only if it was not overwritten by another daemon
+        try:
+            with open(self.state_file, mode = 'r') as file:
+                if json.load(file).get("token") != self.token:
+                    return
+            os.remove(self.state_file)
+        except (OSError, ValueError):
+            pass
+
+    def serve(self,
+              i_preload : Optional[list[Union[str, Path]]] = None) -> None:
+        """
+            Serve the requests until shutdown() (or a /shutdown request, or KeyboardInterrupt).
+        :param i_preload: Documents to parse before accepting requests
+        """
+        import  threading
+        from    http.server     import HTTPServer
+
+        for filename in i_preload or ():
+            self.workspace.get(filename)
+
+        self.server = HTTPServer(("127.0.0.1", self.port), self._make_handler())
+        self._write_state()
+        if self.poll_interval > 0:
+            threading.Thread(target = self._watch, name = "oudini-watcher", daemon = True).start()
+
+        self._w(f"Listening on 127.0.0.1:{self.server.server_address[1]} (state file '{self.state_file}')")
+        try:
+            self.server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.server.server_close()
+            self._remove_state()
+            self._w(f"Stopped after {self.requests} requests, {self.workspace!r}")
+
+    def shutdown(self) -> None:
+        import threading
+
+        # serve_forever must be stopped from another thread
+        if self.server is not None:
+            threading.Thread(target = self.server.shutdown).start()
@@ -1,8 +1,21 @@
 #! python3
 from    utils.logobj            import LogObj
+from    utils.xml_stream_writer import XmlStreamWriter
+import  utils.metrics           as metrics
 import  xml.etree.ElementTree   as ETree
+from    pathlib                 import Path
+import  os
+import  shutil
+from    typing                  import Callable
+from    typing                  import IO
+from    typing                  import Optional
+from    typing                  import Union
+from    requirement             import Requirement
 from    requirements_set        import RequirementsSet
+from    section                 import Section
+from    requirement_offsets     import RequirementOffsetIndex
 from    common_section          import CommonSection
+from    links_section           import LinksSection
 from    glossary                import Glossary
 
 
@@ -11,18 +24,27 @@ class Document (LogObj):
     def __init__(self,
                  i_glossary_class       : Glossary        = Glossary,
                  i_common_section_class : CommonSection   = CommonSection,
-                 i_req_set_class        : RequirementsSet = RequirementsSet):
+                 i_req_set_class        : RequirementsSet = RequirementsSet,
+                 i_links_section_class  : LinksSection    = LinksSection):
         LogObj.__init__(self)
 
         self.root_name  = "document"
 
         self.common     = None
+        self.links      = None # Optional
         self.reqs       = None
         self.glossary   = None
 
         self._glossary_class        = i_glossary_class
         self._common_section_class  = i_common_section_class
         self._req_set_class         = i_req_set_class
+        self._links_section_class   = i_links_section_class
+
+        # Source file (see from_file / save)
+        self.filename               = None
+        self._source_stat           = None # (size, mtime) of the file when it was last loaded or saved
+        self._req_offsets           = None # RequirementOffsetIndex of the file, built on first incremental save
+        self._part_offsets          = {}   # Included file -> RequirementOffsetIndex, built on first incremental save
 
     def to_xml(self) -> ETree.ElementTree:
         self._i(f"Generating XML for document {repr(self.common.title)}")
@@ -35,6 +57,10 @@ class Document (LogObj):
         self._d("Generating XML for common section")
         root.append(self.common.to_xml())
 
+        if self.links is not None:
+            self._d("Generating XML for links section")
+            root.append(self.links.to_xml())
+
         if self.glossary is not None:
             self._d("Generating XML for glossary section")
             root.append(self.glossary.to_xml())
@@ -45,6 +71,414 @@ class Document (LogObj):
         ETree.indent(root, space = ' '*4)
         return ETree.ElementTree(root)
 
+    def write_xml(self,
+                  i_file            : Union[str, Path, IO],
+                  i_encoding        : str  = "UTF-8",
+                  i_xml_declaration : bool = True,
+                  i_includes        : bool = False) -> None:
+        """
+            Write the document as XML into i_file, element by element.
+            The output is identical to the one of to_xml().write(...), without building the whole XML tree in memory.
+
+        :param i_file           : File name, or file object, to write into
+        :param i_encoding       : Output encoding ("unicode" to write into a text file object)
+        :param i_xml_declaration: If True (default), an XML declaration is written first
+        :param i_includes       : If True, the sections stored in files of their own are written as <include> elements
+                                  (see RequirementsSet.write_parts). The whole document is written otherwise.
+        """
+        self._i(f"Writing XML for document {repr(self.common.title)}")
+
+        assert (self.common is not None)
+        assert (self.reqs   is not None)
+
+        with XmlStreamWriter.open(i_file            = i_file,
+                                  i_encoding        = i_encoding,
+                                  i_xml_declaration = i_xml_declaration) as writer:
+            writer.start(self.root_name)
+
+            self._d("Writing XML for common section")
+            writer.element(self.common.to_xml())
+
+            if self.links is not None:
+                self._d("Writing XML for links section")
+                writer.element(self.links.to_xml())
+
+            if self.glossary is not None:
+                self._d("Writing XML for glossary section")
+                self.glossary.write_xml(writer)
+
+            self._d("Writing XML for requirements section")
+            self.reqs.write_xml(writer, i_includes = i_includes)
+
+            writer.end()
+
+    @classmethod
+    def from_file(cls,
+                  i_filename : Union[str, Path],
+                  i_workers  : Optional[int] = None):
+        """
+            Load a Document from an XML file. The file is remembered, so that the document can be saved back
+            incrementally (see save).
+
+            The sections stored in files of their own (<include>, see RequirementsSet) are loaded too. When the main
+            file includes several files, they are parsed in parallel in worker processes - by default only if they are
+            large enough to make up for the start of the processes (see PARALLEL_MIN_BYTES).
+
+        :param i_filename: Oudini XML file
+        :param i_workers : Number of processes parsing the included files (None: one per CPU if worth it, 1: none)
+        :return          : Created Document object
+        """
+        assert isinstance(i_filename, (str, Path)),        f"type(i_filename) is {type(i_filename)}"
+        assert isinstance(i_workers,  (int, type(None))),  f"type(i_workers) is {type(i_workers)}"
+
+        filename = Path(i_filename)
+        stat     = os.stat(filename)
+
+        with metrics.span("parse_xml", file = filename.name):
+            tree = ETree.parse(filename)
+            metrics.count("bytes_read", stat.st_size)
+
+        with metrics.span("from_xml"):
+            obj = cls._from_xml(tree.getroot(),
+                                i_base_dir = filename.parent,
+                                i_workers  = i_workers,
+                                i_chain    = (filename.resolve(),))
+        obj.filename     = filename
+        obj._source_stat = (stat.st_size, stat.st_mtime_ns)
+        return obj
+
+    # Minimum total size of the included files to parse them in worker processes (see from_file)
+    PARALLEL_MIN_BYTES = 4 * 2**20
+
+    @classmethod
+    def _parse_part(cls,
+                    i_filename      : Path,
+                    i_common        : CommonSection,
+                    i_req_set_class : type,
+                    i_chain         : tuple) -> RequirementsSet:
+        """
+            Internal method (run in the worker processes).
+            Parse included file i_filename (and the files it includes).
+        :param i_chain: Including files, from the main file, to detect inclusion cycles
+        :return       : Requirements set of the file, to merge into the including set (see RequirementsSet.merge_part)
+        """
+        stat = os.stat(i_filename)
+        with metrics.span("parse_part", file = i_filename.name):
+            root = ETree.parse(i_filename).getroot()
+            metrics.count("bytes_read", stat.st_size)
+
+        Document._normalize_tags(root)
+        Document._normalize_attr(root)
+        if root.tag != Section.TAG_STR:
+            raise Exception(f"Included file '{i_filename}' must have a <{Section.TAG_STR}> root element, not <{root.tag}>")
+
+        wrapper = ETree.Element(i_req_set_class.TAG_STR)
+        wrapper.append(root)
+        part = i_req_set_class.from_xml_element(i_elt         = wrapper,
+                                                i_common      = i_common,
+                                                i_part_loader = cls._part_loader(i_base_dir      = i_filename.parent,
+                                                                                 i_common        = i_common,
+                                                                                 i_req_set_class = i_req_set_class,
+                                                                                 i_chain         = i_chain + (i_filename,)))
+        part.parts[i_filename] = (stat.st_size, stat.st_mtime_ns)
+        return part
+
+    @classmethod
+    def _part_loader(cls,
+                     i_base_dir      : Path,
+                     i_common        : CommonSection,
+                     i_req_set_class : type,
+                     i_chain         : tuple,
+                     i_futures       : Optional[dict] = None) -> Callable[[str], RequirementsSet]:
+        """
+            Internal method.
+        :param i_futures: Parts already being parsed by worker processes, by file name
+        :return         : Function loading the included file of a given href (relative to i_base_dir)
+        """
+        def load(i_href : str) -> RequirementsSet:
+            filename = i_base_dir.joinpath(i_href).resolve()
+            if filename in i_chain:
+                raise Exception(f"Inclusion cycle: '{i_href}' includes itself (through {' -> '.join(p.name for p in i_chain)})")
+            if i_futures is not None and filename in i_futures:
+                return i_futures.pop(filename).result()
+            return cls._parse_part(filename, i_common, i_req_set_class, i_chain)
+        return load
+
+    def save(self,
+             i_filename    : Optional[Union[str, Path]] = None,
+             i_incremental : bool                       = True) -> bool:
+        """
+            Save the document as XML.
+
+            In incremental mode, when saving back into the file the document was loaded from, only the <req> elements
+            of the modified, added and removed requirements are rewritten. Everything else (comments, sections,
+            formatting...) is preserved. The whole document is written (see write_xml) otherwise.
+
+            Note: modifications of the common section and of the glossary are not tracked - use i_incremental = False.
+
+            The sections stored in files of their own are saved back into their files (relative to the folder of
+            i_filename). In incremental mode, only the files holding modified, added or removed requirements are
+            patched, the same way.
+
+        :param i_filename   : File to save into (defaults to the file the document was loaded from)
+        :param i_incremental: If True (default), only patch the modified requirements when possible
+        :return             : True if the file(s) were patched, False if the whole document was written
+        """
+        assert isinstance(i_filename,    (str, Path, type(None))), f"type(i_filename) is {type(i_filename)}"
+        assert isinstance(i_incremental, bool),                    f"type(i_incremental) is {type(i_incremental)}"
+
+        if i_filename is None:
+            if self.filename is None:
+                raise Exception("No file to save the document into")
+            i_filename = self.filename
+        i_filename = Path(i_filename)
+
+        patched = (i_incremental and self.filename is not None and i_filename.resolve() == self.filename.resolve()
+                   and i_filename.exists() and self._save_files_incremental(i_filename))
+        if not patched:
+            if self.reqs.parts:
+                self.write_xml(i_filename, i_includes = True)
+                self.reqs.parts = {}
+                for part in self.reqs.write_parts(i_filename.parent):
+                    stat = os.stat(part)
+                    self.reqs.parts[part.resolve()] = (stat.st_size, stat.st_mtime_ns)
+            else:
+                self.write_xml(i_filename)
+            self._req_offsets  = None
+            self._part_offsets = {}
+
+        for r in self.reqs.modified():
+            r.dirty = False
+        self.reqs.removed_ids.clear()
+
+        stat = os.stat(i_filename)
+        self.filename     = i_filename
+        self._source_stat = (stat.st_size, stat.st_mtime_ns)
+        return patched
+
+    def _save_files_incremental(self,
+                                i_filename : Path) -> bool:
+        """
+            Internal method.
+            Patch main file i_filename and the included files holding modified, added or removed requirements (see
+            _save_incremental). The other files are left untouched.
+        :return: True if the files were patched, False if an incremental save is not possible
+        """
+        files = [(i_filename, self.reqs.sections)] + self.reqs.part_files(i_filename.parent)
+        if not all(filename.exists() for filename, _ in files):
+            return False # New included file
+
+        # A section is stored in the file of its closest included ancestor (or in the main file)
+        file_of = {id(section): n for n, (_, section) in enumerate(files)}
+        def file_index(i_section : Section) -> int:
+            while id(i_section) not in file_of:
+                i_section = i_section.parent
+            return file_of[id(i_section)]
+
+        reqs = [[] for _ in files] # Modified and added requirements, by file
+        for r in self.reqs.modified():
+            reqs[file_index(self.reqs.section_of(r.id))].append(r)
+
+        removed = [[] for _ in files] # Removed requirements, by file
+        if self.reqs.removed_ids or any(r.id not in self._offset_index(files[n][0]).offsets
+                                        for n, file_reqs in enumerate(reqs) for r in file_reqs):
+            # Requirements added or removed: find out which files the requirements are in
+            where = {}
+            for n, (filename, _) in enumerate(files):
+                where.update(dict.fromkeys(self._offset_index(filename).offsets, n))
+            if any(where.get(r.id, n) != n for n, file_reqs in enumerate(reqs) for r in file_reqs):
+                return False # Requirement moved into another file
+            for req_id in self.reqs.removed_ids:
+                if req_id in where:
+                    removed[where[req_id]].append(req_id)
+
+        for (filename, root), file_reqs, file_removed in zip(files, reqs, removed):
+            if (file_reqs or file_removed) and not self._save_incremental(i_filename    = filename,
+                                                                          i_root        = root,
+                                                                          i_reqs        = file_reqs,
+                                                                          i_removed_ids = file_removed):
+                return False
+        return True
+
+    def _offset_index(self,
+                      i_filename : Path) -> RequirementOffsetIndex:
+        """
+            Internal method.
+        :param i_filename: Main file of the document, or included file
+        :return          : Offset index of file i_filename, scanned again if the file changed since it was loaded / saved
+        """
+        key   = i_filename.resolve()
+        main  = key == self.filename.resolve()
+        index = self._req_offsets if main else self._part_offsets.get(key)
+        known = self._source_stat if main else self.reqs.parts.get(key)
+        stat  = os.stat(i_filename)
+        if index is None or known != (stat.st_size, stat.st_mtime_ns):
+            # The file changed since it was loaded / saved (or was never scanned): index it again
+            self._d(f"Scanning '{i_filename.name}' for requirement offsets")
+            with open(i_filename, mode = 'rb') as file:
+                index = RequirementOffsetIndex.scan(file.read())
+            self._set_file_stat(i_filename)
+            if main:
+                self._req_offsets = index
+            else:
+                self._part_offsets[key] = index
+        return index
+
+    def _set_file_stat(self,
+                       i_filename : Path) -> None:
+        """
+            Internal method.
+            Remember the current size and modification time of file i_filename (main file or included file).
+        """
+        stat = os.stat(i_filename)
+        if i_filename.resolve() == self.filename.resolve():
+            self._source_stat = (stat.st_size, stat.st_mtime_ns)
+        else:
+            self.reqs.parts[i_filename.resolve()] = (stat.st_size, stat.st_mtime_ns)
+
+    def _save_incremental(self,
+                          i_filename    : Path,
+                          i_root        : Section,
+                          i_reqs        : list[Requirement],
+                          i_removed_ids : list[int],
+                          i_space       : str = ' '*4) -> bool:
+        """
+            Internal method.
+            Patch the <req> elements of the given modified, added and removed requirements in file i_filename.
+        :param i_root       : Section stored in i_filename (root section for the main file)
+        :param i_reqs       : Modified and added requirements of the sections stored in i_filename
+        :param i_removed_ids: Removed requirements stored in i_filename
+        :return             : True if the file was patched, False if an incremental save is not possible
+        """
+        offsets  = self._offset_index(i_filename)
+        encoding = offsets.encoding or 'utf-8' # Encoding of the file (XML declaration)
+        patches  = [] # (start, end, new bytes)
+        rewrite  = None # New content of the file, if it is not patched in place
+
+        with open(i_filename, mode = 'r+b') as file:
+            def line_prefix(i_offset : int) -> bytes:
+                # Whitespace between the start of the line and i_offset (empty if there is something else)
+                file.seek(max(0, i_offset - 256))
+                head   = file.read(i_offset - max(0, i_offset - 256))
+                prefix = head[head.rfind(b'\n') + 1:]
+                return prefix if (not prefix.strip() and b'\n' in head) else None
+
+            # Section of a requirement, relative to i_root (see RequirementOffsetIndex.section_ends)
+            def section_path(i_req : Requirement) -> tuple:
+                return tuple(self.reqs.section_of(i_req.id).path[len(i_root.path):])
+
+            # Modified and added requirements (a requirement moved to another section is removed, then added)
+            added = []
+            moved = []
+            paths = offsets.section_paths() if i_reqs else {}
+            for r in i_reqs:
+                if (rng := offsets.get(r.id)) is None or paths.get(r.id) != section_path(r):
+                    added.append(r)
+                    if rng is not None:
+                        moved.append(r.id)
+                    continue
+
+                indent = line_prefix(rng[0]) or b''
+                xml    = XmlStreamWriter.fragment(r.to_xml(),
+                                                  i_space       = i_space,
+                                                  i_base_indent = indent.decode(encoding))
+                patches.append((rng[0], rng[1], xml.encode(encoding, errors = 'xmlcharrefreplace'), ()))
+
+            # Removed requirements: the element is removed along with its line
+            removed = []
+            for req_id in list(i_removed_ids) + moved:
+                if (rng := offsets.get(req_id)) is None:
+                    continue
+                removed.append(req_id)
+                start  = rng[0]
+                prefix = line_prefix(start)
+                if prefix is not None:
+                    start -= len(prefix) + 1
+                patches.append((start, rng[1], b'', ()))
+                del offsets.offsets[req_id]
+
+            # New requirements are appended at the end of their section (as in the section tree)
+            by_closing_tag = {}
+            for r in added:
+                path    = section_path(r)
+                closing = offsets.reqs_end if not path else offsets.section_ends.get(path)
+                if closing is None:
+                    return False # Section not in the file (yet)
+                by_closing_tag.setdefault(closing, []).append(r)
+
+            for closing, reqs in by_closing_tag.items():
+                file.seek(closing)
+                if file.read(2) != b'</':
+                    return False # Empty element (<sec ... />)
+
+                prefix = line_prefix(closing)
+                if prefix is None:
+                    return False
+
+                pos    = closing - len(prefix) - 1
+                indent = prefix.decode(encoding) + i_space
+                data   = b""
+                ranges = [] # (requirement ID, start, end), relative to the inserted data
+                for r in reqs:
+                    data += ("\n" + indent).encode(encoding)
+                    xml   = XmlStreamWriter.fragment(r.to_xml(),
+                                                     i_space       = i_space,
+                                                     i_base_indent = indent).encode(encoding, errors = 'xmlcharrefreplace')
+                    ranges.append((r.id, len(data), len(data) + len(xml)))
+                    data += xml
+                patches.append((pos, pos, data, ranges))
+
+            if not patches:
+                self._i(f"No modification to save into '{i_filename.name}'")
+                return True
+
+            patches.sort(key = lambda p: p[0])
+
+            if all(len(p[2]) == p[1] - p[0] for p in patches):
+                # Same sizes: overwrite in place
+                for start, _, data, _ in patches:
+                    file.seek(start)
+                    file.write(data)
+            else:
+                # Rewrite the file from the first patch onwards (into a new file, see below)
+                first = patches[0][0]
+                file.seek(0)
+                head  = file.read(first)
+                tail  = file.read()
+
+                chunks  = []
+                pos     = first
+                out_pos = first
+                new_offsets = {}
+                for start, end, data, ranges in patches:
+                    chunk    = tail[pos - first:start - first]
+                    out_pos += len(chunk)
+                    for req_id, r_start, r_end in ranges:
+                        new_offsets[req_id] = [out_pos + r_start, out_pos + r_end]
+                    out_pos += len(data)
+                    chunks.append(chunk)
+                    chunks.append(data)
+                    pos = end
+                chunks.append(tail[pos - first:])
+                rewrite = head + b"".join(chunks)
+
+        if rewrite is not None:
+            # Written into a temporary file, which then replaces the original: an interrupted save leaves it untouched
+            tmp_file = i_filename.with_name(i_filename.name + ".tmp")
+            with open(tmp_file, mode = 'wb') as file:
+                file.write(rewrite)
+            shutil.copymode(i_filename, tmp_file)
+            os.replace(tmp_file, i_filename)
+
+        offsets.rebase([(start, end, len(data)) for start, end, data, _ in patches])
+        if added:
+            offsets.offsets.update(new_offsets)
+        offsets.update_layout(removed, [(section_path(r), r.id) for reqs in by_closing_tag.values() for r in reqs])
+        self._set_file_stat(i_filename)
+
+        self._i(f"Saved {len(patches)} modification(s) into '{i_filename.name}'")
+        return True
+
     @classmethod
     def from_xml(cls,
                  i_tree : ETree.ElementTree):
@@ -56,11 +490,28 @@ class Document (LogObj):
         """
         assert isinstance(i_tree, ETree.ElementTree), f"type(i_tree) is {type(i_tree)}"
 
-        root = i_tree.getroot()
+        with metrics.span("from_xml"):
+            return cls._from_xml(i_tree.getroot())
+
+    @classmethod
+    def _from_xml(cls,
+                  i_root     : ETree.Element,
+                  i_base_dir : Optional[Path] = None,
+                  i_workers  : Optional[int]  = 1,
+                  i_chain    : tuple          = ()):
+        """
+            Internal method.
+            Generates a Document object from the root element of an XML structure (see from_xml).
+        :param i_base_dir: Folder the included files are relative to (None if files can not be included)
+        :param i_workers : Number of processes parsing the included files (see from_file)
+        :param i_chain   : File the XML structure comes from, if any (see _parse_part)
+        """
+        root = i_root
 
         # Normalize (lowercase) the XML file tags and attributes
-        Document._normalize_tags(root)
-        Document._normalize_attr(root)
+        with metrics.span("normalize"):
+            Document._normalize_tags(root)
+            Document._normalize_attr(root)
 
         obj = cls()
 
@@ -69,38 +520,51 @@ class Document (LogObj):
         # Read root tag name
         obj.root_name = root.tag
 
-        # Search for common section and glossary
-        for base in root:
-            if      base.tag == obj._common_section_class.TAG_STR:
-                obj._v(f"Found common section (<{base.tag}>, class '{obj._common_section_class.__name__}')")
+        # Search for common section, links section and glossary
+        with metrics.span("common_and_glossary"):
+            for base in root:
+                if      base.tag == obj._common_section_class.TAG_STR:
+                    obj._v(f"Found common section (<{base.tag}>, class '{obj._common_section_class.__name__}')")
 
-                assert obj.common is None
-                obj.common = obj._common_section_class.from_xml_element(i_elt = base)
+                    assert obj.common is None
+                    obj.common = obj._common_section_class.from_xml_element(i_elt = base)
 
-            elif    base.tag == obj._glossary_class.TAG_STR:
-                obj._v(f"Found glossary section (<{base.tag}>, class '{obj._glossary_class.__name__}')")
+                elif    base.tag == obj._glossary_class.TAG_STR:
+                    obj._v(f"Found glossary section (<{base.tag}>, class '{obj._glossary_class.__name__}')")
 
-                assert obj.glossary is None
-                obj.glossary = obj._glossary_class.from_xml_element(i_elt = base)
+                    assert obj.glossary is None
+                    obj.glossary = obj._glossary_class.from_xml_element(i_elt = base)
 
-            else:
-                pass
+                elif    base.tag == obj._links_section_class.TAG_STR:
+                    obj._v(f"Found links section (<{base.tag}>, class '{obj._links_section_class.__name__}')")
+
+                    assert obj.links is None
+                    obj.links = obj._links_section_class.from_xml_element(i_elt = base)
+
+                else:
+                    pass
 
         # Common section is not optional
         assert obj.common is not None, f"Missing mandatory section <{obj._common_section_class.TAG_STR}>"
 
-        # Glossary is optional
+        # Links section and glossary are optional
 
         # Search for requirements section
-        for base in root:
-            if      base.tag == obj._req_set_class.TAG_STR:
-                obj._d(f"Found requirements section (<{base.tag}>, class '{obj._req_set_class.__name__}')")
-                assert obj.reqs is None
-                obj.reqs = obj._req_set_class.from_xml_element(i_elt    = base,
-                                                               i_common = obj.common)
-
-            else:
-                pass
+        with metrics.span("requirements"):
+            for base in root:
+                if      base.tag == obj._req_set_class.TAG_STR:
+                    obj._d(f"Found requirements section (<{base.tag}>, class '{obj._req_set_class.__name__}')")
+                    assert obj.reqs is None
+                    obj.reqs = obj._load_requirements(i_elt      = base,
+                                                      i_base_dir = i_base_dir,
+                                                      i_workers  = i_workers,
+                                                      i_chain    = i_chain)
+
+                else:
+                    pass
+
+            if obj.reqs is not None:
+                metrics.count("requirements_parsed", len(obj.reqs))
 
         # Requirements section is not optional
         assert obj.reqs is not None, f"Missing mandatory section <{obj._req_set_class.TAG_STR}>"
@@ -112,22 +576,78 @@ class Document (LogObj):
 
         return obj
 
+    def _load_requirements(self,
+                           i_elt      : ETree.Element,
+                           i_base_dir : Optional[Path],
+                           i_workers  : Optional[int],
+                           i_chain    : tuple) -> RequirementsSet:
+        """
+            Internal method.
+            Create the requirements set from the <requirements> element, loading the included files.
+        """
+        if i_base_dir is None:
+            return self._req_set_class.from_xml_element(i_elt    = i_elt,
+                                                        i_common = self.common)
+
+        files = [i_base_dir.joinpath(e.get(RequirementsSet.ATTR_HREF_STR, "")).resolve()
+                 for e in i_elt.iter(RequirementsSet.INCLUDE_TAG_STR)]
+        parallel = i_workers != 1 and len(set(files)) >= 2
+        if parallel and i_workers is None:
+            parallel = sum(f.stat().st_size for f in set(files) if f.is_file()) >= self.PARALLEL_MIN_BYTES
+
+        if not parallel:
+            return self._req_set_class.from_xml_element(i_elt         = i_elt,
+                                                        i_common      = self.common,
+                                                        i_part_loader = self._part_loader(i_base_dir      = i_base_dir,
+                                                                                          i_common        = self.common,
+                                                                                          i_req_set_class = self._req_set_class,
+                                                                                          i_chain         = i_chain))
+
+        from concurrent.futures import ProcessPoolExecutor
+
+        self._i(f"Parsing {len(set(files))} included files in parallel")
+        with ProcessPoolExecutor(max_workers = i_workers) as pool:
+            futures = {f: pool.submit(self._parse_part, f, self.common, self._req_set_class, i_chain)
+                       for f in dict.fromkeys(files) if f not in i_chain}
+            return self._req_set_class.from_xml_element(i_elt         = i_elt,
+                                                        i_common      = self.common,
+                                                        i_part_loader = self._part_loader(i_base_dir      = i_base_dir,
+                                                                                          i_common        = self.common,
+                                                                                          i_req_set_class = self._req_set_class,
+                                                                                          i_chain         = i_chain,
+                                                                                          i_futures       = futures))
+
+    def sources_changed(self) -> bool:
+        """
+        :return: True if the file the document was loaded from, or one of the files it includes, changed since it was
+                 loaded or saved (or was deleted). False for a document not loaded from a file.
+        """
+        if self.filename is None:
+            return False
+        try:
+            for filename, stat in [(self.filename, self._source_stat)] + list(self.reqs.parts.items()):
+                s = os.stat(filename)
+                if (s.st_size, s.st_mtime_ns) != stat:
+                    return True
+        except OSError:
+            return True
+        return False
+
     @staticmethod
     def _normalize_tags(i_root):
-        i_root.tag = i_root.tag.lower()
-        for child in i_root:
-            Document._normalize_tags(child)
+        # Iterative (no recursion limit on the nesting depth)
+        for elt in i_root.iter():
+            if isinstance(elt.tag, str):
+                elt.tag = elt.tag.lower()
 
     @staticmethod
     def _normalize_attr(i_root):
-        for attr in list(i_root.attrib):
-            norm_attr = attr.lower()
-            if norm_attr != attr:
-                i_root.set(norm_attr, i_root.attrib[attr])
-                i_root.attrib.pop(attr)
-
-        for child in i_root:
-            Document._normalize_attr(child)
+        for elt in i_root.iter():
+            for attr in list(elt.attrib):
+                norm_attr = attr.lower()
+                if norm_attr != attr:
+                    elt.set(norm_attr, elt.attrib[attr])
+                    elt.attrib.pop(attr)
 
     def __str__(self):
         s = f"{self.common!s}\n{self.reqs!s}\n"
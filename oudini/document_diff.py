@@ -0,0 +1,113 @@
+#! python3
+from    typing                  import Optional
+
+from    document                import Document
+from    requirement             import Requirement
+from    requirements_set        import RequirementsSet
+
+
+class DocumentDiff:
+    """
+        Differences between two versions of a document, keyed by requirement ID and by field (see FIELDS), and by
+        glossary entry UID.
+    """
+    FIELDS = ("desc", "text", "validation_strategy", "links", "section")
+
+    class Change:
+        """
+            Requirement added, removed, or modified (fields: names of the modified fields).
+        """
+        ADDED    = "added"
+        REMOVED  = "removed"
+        MODIFIED = "modified"
+
+        def __init__(self,
+                     i_kind   : str,
+                     i_req_id : int,
+                     i_name   : str,
+                     i_fields : Optional[list[str]] = None):
+            self.kind   = i_kind
+            self.req_id = i_req_id
+            self.name   = i_name   # Formatted ID
+            self.fields = i_fields or []
+
+        def __repr__(self):
+            s = f"{self.kind} {self.name}"
+            if self.fields:
+                s += f" ({', '.join(self.fields)})"
+            return s
+
+    def __init__(self):
+        self.changes          = [] # Change, by ascending requirement ID
+        self.glossary_added   = []
+        self.glossary_removed = []
+        self.glossary_changed = []
+
+    @staticmethod
+    def fields(i_req     : Requirement,
+               i_req_set : Optional[RequirementsSet] = None,
+               i_section : Optional[str]             = None) -> dict:
+        """
+        :param i_req    : Requirement
+        :param i_req_set: Requirements set of i_req, to get its section
+        :param i_section: Full name of the section of i_req, if i_req_set is not given
+        :return         : Compared values of the fields of requirement i_req (see FIELDS)
+        """
+        if i_req_set is not None:
+            i_section = i_req_set.section_of(i_req).full_name() if i_req.id in i_req_set else None
+
+        return {"desc"                : i_req.desc,
+                "text"                : i_req.parsed_text.body, # Without the XML indentation
+                "validation_strategy" : i_req.validation_strategy,
+                "links"               : sorted((lnk.source, lnk.id) for lnk in i_req.links),
+                "section"             : i_section}
+
+    @classmethod
+    def from_documents(cls,
+                       i_old : Document,
+                       i_new : Document) -> 'DocumentDiff':
+        """
+            Compare two versions of a document.
+        :param i_old: Reference version
+        :param i_new: New version
+        :return     : Differences from i_old to i_new
+        """
+        assert isinstance(i_old, Document), f"type(i_old) is {type(i_old)}"
+        assert isinstance(i_new, Document), f"type(i_new) is {type(i_new)}"
+
+        obj = cls()
+        old = i_old.reqs.reqs
+        new = i_new.reqs.reqs
+
+        for req_id in sorted(old.keys() | new.keys()):
+            if req_id not in new:
+                obj.changes.append(cls.Change(cls.Change.REMOVED, req_id, old[req_id].format_id()))
+            elif req_id not in old:
+                obj.changes.append(cls.Change(cls.Change.ADDED, req_id, new[req_id].format_id()))
+            else:
+                old_fields = cls.fields(old[req_id], i_old.reqs)
+                new_fields = cls.fields(new[req_id], i_new.reqs)
+                modified   = [f for f in cls.FIELDS if old_fields[f] != new_fields[f]]
+                if modified:
+                    obj.changes.append(cls.Change(cls.Change.MODIFIED, req_id, new[req_id].format_id(), modified))
+
+        old_gls = {d.uid: d for d in i_old.glossary} if i_old.glossary is not None else {}
+        new_gls = {d.uid: d for d in i_new.glossary} if i_new.glossary is not None else {}
+        obj.glossary_added   = [uid for uid in new_gls if uid not in old_gls]
+        obj.glossary_removed = [uid for uid in old_gls if uid not in new_gls]
+        obj.glossary_changed = [uid for uid in new_gls if uid in old_gls
+                                and (type(new_gls[uid]), new_gls[uid].description, getattr(new_gls[uid], "shorthand", None))
+                                 != (type(old_gls[uid]), old_gls[uid].description, getattr(old_gls[uid], "shorthand", None))]
+        return obj
+
+    def of_kind(self,
+                i_kind : str) -> list[Change]:
+        return [c for c in self.changes if c.kind == i_kind]
+
+    def __bool__(self):
+        return bool(self.changes or self.glossary_added or self.glossary_removed or self.glossary_changed)
+
+    def __repr__(self):
+        return (f"<diff: {len(self.of_kind(self.Change.ADDED))} added, {len(self.of_kind(self.Change.REMOVED))} removed, "
+                f"{len(self.of_kind(self.Change.MODIFIED))} modified requirements; glossary: {len(self.glossary_added)} "
+                f"added, {len(self.glossary_removed)} removed, {len(self.glossary_changed)} modified>")
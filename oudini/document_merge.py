@@ -0,0 +1,393 @@
+#! python3
+import  copy
+import  utils.metrics           as metrics
+import  xml.etree.ElementTree   as ETree
+from    typing                  import Any
+from    typing                  import Callable
+from    typing                  import Optional
+
+from    document                import Document
+from    document_diff           import DocumentDiff
+from    glossary                import Glossary
+from    links_section           import LinksSection
+from    requirement             import Requirement
+from    requirements_set        import RequirementsSet
+from    section                 import Section
+
+
+class DocumentMerge:
+    """
+        Three-way merge of concurrently edited versions of a document, keyed by requirement ID and by field (see
+        DocumentDiff.FIELDS), instead of by line: reformatting and moves of requirements between sections are not
+        conflicts.
+
+        For each requirement, each field changed on one side only takes the value of that side; a field changed on both
+        sides to different values is a conflict (the result keeps our value). The links are merged as sets (links added
+        on either side are kept, links removed on either side are removed): they never conflict. A requirement removed
+        on one side is removed, unless the other side modified it (conflict, the modified requirement is kept).
+        The glossary entries and the linked documents declarations are merged the same way, by UID / internal name;
+        the common section as a whole.
+
+        The merge is linear in the size of the documents (hash maps by ID, one pass over each document). The result
+        keeps the section structure and the order of our version, with the sections and requirements added by the
+        other side inserted after their predecessor.
+    """
+
+    class Conflict:
+        """
+            Change made on both sides that could not be merged (the result keeps our version).
+        """
+        MODIFIED = "modified" # Field modified on both sides, to different values
+        REMOVED  = "removed"  # Removed on one side, modified on the other (the modified version is kept)
+        ADDED    = "added"    # Added on both sides, with different values
+
+        def __init__(self,
+                     i_kind   : str,
+                     i_name   : str,
+                     i_field  : Optional[str] = None,
+                     i_base   : Any           = None,
+                     i_ours   : Any           = None,
+                     i_theirs : Any           = None):
+            self.kind   = i_kind
+            self.name   = i_name   # Formatted requirement ID, glossary UID ("glossary:<uid>"), etc.
+            self.field  = i_field  # Conflicting field (see DocumentDiff.FIELDS), None for a whole entry
+            self.base   = i_base   # Values of the field in each version (None if absent)
+            self.ours   = i_ours
+            self.theirs = i_theirs
+
+        def to_dict(self) -> dict:
+            return {k: (v if isinstance(v, (str, type(None))) else repr(v)) for k, v in vars(self).items()}
+
+        def __repr__(self):
+            if self.kind == self.REMOVED:
+                return f"{self.name}: removed on one side, modified on the other"
+            return f"{self.name}: {self.field or 'entry'} {self.kind} on both sides ({self.ours!r} / {self.theirs!r})"
+
+    def __init__(self):
+        self.document  = None # Merged document
+        self.conflicts = []   # Conflict
+        self.resolved  = 0    # Number of requirements changed on one or both sides, merged without conflict
+
+    @staticmethod
+    def _pick(i_base, i_ours, i_theirs) -> Optional[bool]:
+        """
+        :return: False to take our value, True to take their value, None on conflict
+        """
+        if i_ours == i_theirs or i_base == i_theirs:
+            return False
+        if i_base == i_ours:
+            return True
+        return None
+
+    @staticmethod
+    def _copy(i_req : Requirement) -> Requirement:
+        req       = copy.copy(i_req)
+        req.links = [Requirement.LinkRef(lnk.source, lnk.id) for lnk in i_req.links]
+        return req
+
+    @staticmethod
+    def _merge_links(i_base   : Optional[Requirement],
+                     i_ours   : Requirement,
+                     i_theirs : Requirement) -> list[Requirement.LinkRef]:
+        key    = lambda lnk: (lnk.source, lnk.id)
+        base   = {key(lnk) for lnk in i_base.links} if i_base is not None else set()
+        ours   = {key(lnk) for lnk in i_ours.links}
+        theirs = {key(lnk) for lnk in i_theirs.links}
+
+        links  = [lnk for lnk in i_ours.links   if key(lnk) in theirs or key(lnk) not in base]
+        links += [lnk for lnk in i_theirs.links if key(lnk) not in ours and key(lnk) not in base]
+        return [Requirement.LinkRef(*key(lnk)) for lnk in links]
+
+    def _merge_requirement(self,
+                           i_name   : str,
+                           i_base   : Optional[tuple[Requirement, dict]],
+                           i_ours   : tuple[Requirement, dict],
+                           i_theirs : tuple[Requirement, dict]) -> tuple[Requirement, tuple]:
+        """
+            Internal method.
+            Merge the fields of a requirement present on both sides (i_base is None if it was added on both sides).
+        :return: Merged requirement (copy), merged section path
+        """
+        (ours, ours_fields), (theirs, theirs_fields) = i_ours, i_theirs
+        base, base_fields = i_base if i_base is not None else (None, dict.fromkeys(DocumentDiff.FIELDS))
+
+        req         = copy.copy(ours)
+        req.links   = self._merge_links(base, ours, theirs)
+        section     = ours_fields["section"]
+        conflicting = False
+
+        for field in DocumentDiff.FIELDS:
+            if field == "links":
+                continue
+            take_theirs = self._pick(base_fields[field], ours_fields[field], theirs_fields[field])
+            if take_theirs is None:
+                conflicting = True
+                self.conflicts.append(self.Conflict(self.Conflict.MODIFIED if base is not None else self.Conflict.ADDED,
+                                                    i_name, field, base_fields[field],
+                                                    ours_fields[field], theirs_fields[field]))
+            elif take_theirs:
+                if field == "section":
+                    section = theirs_fields["section"]
+                else:
+                    setattr(req, field, getattr(theirs, field))
+
+        if not conflicting and (ours_fields != base_fields or theirs_fields != base_fields):
+            self.resolved += 1
+        return req, section
+
+    def _merge_entries(self,
+                       i_kind   : str,
+                       i_base   : dict,
+                       i_ours   : dict,
+                       i_theirs : dict,
+                       i_value  : Callable[[Any], Any]) -> list:
+        """
+            Internal method.
+            Merge keyed entries (glossary entries, linked documents declarations) as a whole.
+        :param i_value: Compared value of an entry
+        :return       : Merged entries, in our order followed by the entries added by the other side
+        """
+        merged = []
+        for key in list(i_ours) + [k for k in i_theirs if k not in i_ours]:
+            base, ours, theirs = i_base.get(key), i_ours.get(key), i_theirs.get(key)
+            values = [i_value(e) if e is not None else None for e in (base, ours, theirs)]
+            take_theirs = self._pick(*values)
+            if take_theirs is None:
+                kind = self.Conflict.ADDED if base is None else \
+                       self.Conflict.REMOVED if ours is None or theirs is None else self.Conflict.MODIFIED
+                self.conflicts.append(self.Conflict(kind, f"{i_kind}:{key}", None, *values))
+                take_theirs = ours is None
+            entry = theirs if take_theirs else ours
+            if entry is not None:
+                merged.append(entry)
+        return merged
+
+    @staticmethod
+    def _xml(i_obj) -> bytes:
+        return ETree.tostring(i_obj.to_xml())
+
+    @staticmethod
+    def _index(i_document : Document) -> tuple[dict, list[int]]:
+        """
+        :return: Requirement ID -> (requirement, compared fields), IDs in document order
+        """
+        reqs    = i_document.reqs
+        entries = {}
+        for req_id in reqs.sections.iter_req_ids():
+            req = reqs.reqs[req_id]
+            entries[req_id] = (req, DocumentDiff.fields(req, i_section = tuple(reqs.section_of(req_id).path)))
+        return entries, list(entries)
+
+    @classmethod
+    def from_documents(cls,
+                       i_base   : Document,
+                       i_ours   : Document,
+                       i_theirs : Document) -> 'DocumentMerge':
+        """
+        :param i_base  : Common ancestor
+        :param i_ours  : Our version (its structure and its values on conflicts are kept)
+        :param i_theirs: Their version
+        :return        : Merge of i_ours and i_theirs (see document and conflicts)
+        """
+        assert isinstance(i_base,   Document), f"type(i_base) is {type(i_base)}"
+        assert isinstance(i_ours,   Document), f"type(i_ours) is {type(i_ours)}"
+        assert isinstance(i_theirs, Document), f"type(i_theirs) is {type(i_theirs)}"
+
+        obj = cls()
+        with metrics.span("merge_documents", requirements = len(i_ours.reqs)):
+            doc = obj.document = Document()
+            doc.root_name = i_ours.root_name
+
+            # Common section, as a whole
+            base, ours, theirs = (cls._xml(d.common) for d in (i_base, i_ours, i_theirs))
+            take_theirs = cls._pick(base, ours, theirs)
+            if take_theirs is None:
+                obj.conflicts.append(cls.Conflict(cls.Conflict.MODIFIED, i_ours.common.TAG_STR))
+            doc.common = copy.copy(i_theirs.common if take_theirs else i_ours.common)
+
+            # Linked documents and glossary, by entry
+            declarations = lambda d: d.links.documents if d.links is not None else {}
+            entries      = obj._merge_entries(LinksSection.TAG_STR, *(declarations(d) for d in (i_base, i_ours, i_theirs)),
+                                              i_value = cls._xml)
+            if entries or i_ours.links is not None or i_theirs.links is not None:
+                doc.links = LinksSection()
+                for e in entries:
+                    doc.links.add(e)
+
+            definitions = lambda d: d.glossary.definitions if d.glossary is not None else {}
+            entries     = obj._merge_entries(Glossary.TAG_STR, *(definitions(d) for d in (i_base, i_ours, i_theirs)),
+                                             i_value = cls._xml)
+            if entries or i_ours.glossary is not None or i_theirs.glossary is not None:
+                doc.glossary = Glossary()
+                for e in entries:
+                    doc.glossary.add(e)
+
+            doc.reqs = obj._merge_requirements(i_base, i_ours, i_theirs, doc)
+
+        metrics.count("merge_conflicts", len(obj.conflicts))
+        return obj
+
+    def _merge_requirements(self,
+                            i_base     : Document,
+                            i_ours     : Document,
+                            i_theirs   : Document,
+                            i_document : Document) -> RequirementsSet:
+        """
+            Internal method.
+        :return: Merged requirements set of i_document
+        """
+        base,   _            = self._index(i_base)
+        ours,   ours_order   = self._index(i_ours)
+        theirs, theirs_order = self._index(i_theirs)
+
+        # Merged requirements: ID -> (requirement, section path)
+        merged = {}
+        for req_id in ours_order + [i for i in theirs_order if i not in ours]:
+            b, o, t = base.get(req_id), ours.get(req_id), theirs.get(req_id)
+            name    = (o or t)[0].format_id()
+            if o is not None and t is not None:
+                merged[req_id] = self._merge_requirement(name, b, o, t)
+                continue
+
+            # Added, or removed on (at least) one side
+            side = o if o is not None else t
+            if b is None:
+                merged[req_id] = (self._copy(side[0]), side[1]["section"])
+                self.resolved += 1
+            elif side[1] != b[1]:
+                self.conflicts.append(self.Conflict(self.Conflict.REMOVED, name))
+                merged[req_id] = (self._copy(side[0]), side[1]["section"])
+            else:
+                self.resolved += 1
+
+        # Requirements added by the other side are inserted after the nearest requirement that precedes them in their
+        # version and exists in ours
+        after    = {}
+        previous = None
+        for req_id in theirs_order:
+            if req_id in ours:
+                previous = req_id
+            elif req_id in merged:
+                after.setdefault(previous, []).append(req_id)
+
+        reqs     = i_document._req_set_class(i_common = i_document.common)
+        sections = {(): reqs.sections}
+        placed   = set()
+
+        def place(i_req_id : int, i_path : tuple) -> None:
+            if i_req_id in merged and merged[i_req_id][1] == i_path:
+                sections[i_path].items.append(i_req_id)
+                placed.add(i_req_id)
+
+        # Our structure and order
+        for req_id in after.get(None, ()):
+            place(req_id, ())
+        stack = [(iter(i_ours.reqs.sections.items), ())]
+        while stack:
+            item = next(stack[-1][0], None)
+            path = stack[-1][1]
+            if item is None:
+                stack.pop()
+            elif isinstance(item, Section):
+                sec = sections[path].add_section(item.name)
+                sec.include = item.include
+                sections[path + (item.name,)] = sec
+                stack.append((iter(item.items), path + (item.name,)))
+            else:
+                place(item, path)
+                for req_id in after.get(item, ()):
+                    place(req_id, path)
+
+        # Sections added by the other side, then the requirements moved to another section
+        def section(i_path : tuple) -> Section:
+            if i_path not in sections:
+                sections[i_path] = section(i_path[:-1]).add_section(i_path[-1])
+            return sections[i_path]
+
+        for sec in i_theirs.reqs.sections.walk():
+            section(tuple(sec.path))
+        for req_id, (req, path) in merged.items():
+            if req_id not in placed:
+                section(path).items.append(req_id)
+
+        # Sections removed by one side and left empty
+        base_paths   = {tuple(s.path) for s in i_base.reqs.sections.walk()}
+        ours_paths   = {tuple(s.path) for s in i_ours.reqs.sections.walk()}
+        theirs_paths = {tuple(s.path) for s in i_theirs.reqs.sections.walk()}
+        for path in reversed(list(sections)):
+            sec = sections[path]
+            if path and not sec.items and path in base_paths and (path not in ours_paths or path not in theirs_paths):
+                sec.parent.items.remove(sec)
+
+        # Requirements, in document order
+        stack = [(iter(reqs.sections.items), reqs.sections)]
+        while stack:
+            item = next(stack[-1][0], None)
+            if item is None:
+                stack.pop()
+            elif isinstance(item, Section):
+                stack.append((iter(item.items), item))
+            else:
+                req        = merged[item][0]
+                req.common = i_document.common
+                reqs.reqs[item]        = req
+                reqs._section_of[item] = stack[-1][1]
+        reqs.reindex()
+        return reqs
+
+    def apply(self,
+              i_document : Document) -> bool:
+        """
+            Apply the merge to our version i_document (as loaded from its file): its requirements are modified, moved,
+            added and removed to be those of the merged document. Saving i_document then only patches the changed
+            requirements (see Document.save): the rest of the file (comments, formatting, elements the model does not
+            keep) is left as is. The added requirements are appended to their section.
+        :param i_document: Our version of the document, as given to from_documents
+        :return          : False if the merge changed something else than the requirements (common section, linked
+                           documents, glossary, sections): i_document is left unchanged, the merged document (see
+                           document) must be written whole
+        """
+        assert isinstance(i_document, Document), f"type(i_document) is {type(i_document)}"
+        assert self.document is not None, "No merged document"
+
+        merged = self.document
+        for name in ("common", "links", "glossary"):
+            ours, result = getattr(i_document, name), getattr(merged, name)
+            if (self._xml(ours) if ours is not None else None) != (self._xml(result) if result is not None else None):
+                return False
+
+        reqs     = i_document.reqs
+        sections = {tuple(s.path): s for s in reqs.sections.walk()}
+        if set(sections) != {tuple(s.path) for s in merged.reqs.sections.walk()}:
+            return False
+
+        for req_id in [i for i in reqs.reqs if i not in merged.reqs.reqs]:
+            reqs.remove(req_id)
+
+        for req_id, req in merged.reqs.reqs.items():
+            section = sections[tuple(merged.reqs.section_of(req_id).path)]
+            if req_id not in reqs.reqs:
+                req = self._copy(req)
+                req.mark_dirty()
+                reqs.add(i_req     = req,
+                         i_section = section)
+                continue
+
+            old        = reqs.reqs[req_id]
+            old_fields = DocumentDiff.fields(old, reqs)
+            new_fields = DocumentDiff.fields(req, merged.reqs)
+            changed    = [f for f in DocumentDiff.FIELDS if f != "section" and old_fields[f] != new_fields[f]]
+            for field in changed:
+                setattr(old, field, getattr(req, field))
+            if changed:
+                reqs.update(old)
+            if old_fields["section"] != new_fields["section"]:
+                reqs.remove(old)
+                reqs.add(i_req     = old,
+                         i_section = section)
+                old.mark_dirty()
+        return True
+
+    def __repr__(self):
+        return (f"<merge: {len(self.document.reqs) if self.document is not None else 0} requirements, "
+                f"{self.resolved} merged changes, {len(self.conflicts)} conflicts>")
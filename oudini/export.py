@@ -0,0 +1,151 @@
+#! python3
+from    utils.logobj            import LogObj
+import  csv
+import  json
+import  utils.metrics           as metrics
+from    array                   import array
+from    pathlib                 import Path
+from    typing                  import IO
+from    typing                  import Iterable
+from    typing                  import Iterator
+from    typing                  import Union
+from    document                import Document
+from    section                 import Section
+
+
+class TableExport (LogObj):
+    """
+        Bulk export of the requirements and links of one or several documents (i.e. the documents of a Workspace), as
+        tables for metrics and dashboard tools:
+            - requirements : document, id, name (formatted ID), desc, validation (strategy name), section (full name)
+            - links        : document, from (formatted ID), source (linked document), target (linked requirement)
+
+        Rows are tuples produced by generators, streamed to CSV or JSON lines: memory use does not depend on the number
+        of rows, and no object is built per row. columns() builds column arrays instead, for in-memory analysis.
+    """
+    REQUIREMENTS = "requirements"
+    LINKS        = "links"
+
+    COLUMNS = {REQUIREMENTS : ("document", "id", "name", "desc", "validation", "section"),
+               LINKS        : ("document", "from", "source", "target")}
+
+    FORMATS = ("csv", "jsonl")
+
+    def __init__(self,
+                 i_documents : Iterable[Document]):
+        """
+        :param i_documents: Exported documents (iterated once per export)
+        """
+        LogObj.__init__(self)
+
+        self.documents = list(i_documents)
+        for doc in self.documents:
+            assert isinstance(doc, Document), f"type(doc) is {type(doc)}"
+
+    def rows(self,
+             i_table : str) -> Iterator[tuple]:
+        """
+        :param i_table: REQUIREMENTS or LINKS
+        :return       : Rows of the table (see COLUMNS), in document order
+        """
+        if i_table not in self.COLUMNS:
+            raise Exception(f"Unknown table '{i_table}' (available: {', '.join(self.COLUMNS)})")
+
+        for doc in self.documents:
+            yield from (self._requirement_rows if i_table == self.REQUIREMENTS else self._link_rows)(doc)
+
+    @staticmethod
+    def _requirement_rows(i_document : Document) -> Iterator[tuple]:
+        name  = str(i_document.common.title)
+        reqs  = i_document.reqs.reqs
+        # Section tree walk: the section name is computed once per section
+        stack = [(iter(i_document.reqs.sections.items), "")]
+        while stack:
+            item = next(stack[-1][0], None)
+            if item is None:
+                stack.pop()
+            elif isinstance(item, Section):
+                stack.append((iter(item.items), item.full_name()))
+            else:
+                req        = reqs[item]
+                validation = req.validation_strategy
+                yield (name, req.id, req.format_id(), req.desc,
+                       validation.name if validation is not None else None, stack[-1][1])
+
+    @staticmethod
+    def _link_rows(i_document : Document) -> Iterator[tuple]:
+        name = str(i_document.common.title)
+        for req in i_document.reqs.reqs.values():
+            if req.links:
+                req_name = req.format_id()
+                yield from ((name, req_name, lnk.source, lnk.id) for lnk in req.links)
+
+    def write(self,
+              i_file   : Union[str, Path, IO],
+              i_table  : str,
+              i_format : str = "csv") -> int:
+        """
+            Stream a table into a file.
+        :param i_file  : File name, or text file object
+        :param i_table : REQUIREMENTS or LINKS
+        :param i_format: "csv" (with a header line) or "jsonl" (one JSON object per line)
+        :return        : Number of written rows
+        """
+        if i_format not in self.FORMATS:
+            raise Exception(f"Unknown format '{i_format}' (available: {', '.join(self.FORMATS)})")
+
+        if isinstance(i_file, (str, Path)):
+            with open(i_file, mode = 'w', newline = '', encoding = 'utf8') as file:
+                return self.write(file, i_table, i_format)
+
+        with metrics.span("export", table = i_table, format = i_format):
+            columns = self.COLUMNS.get(i_table)
+            counter = _Counter(self.rows(i_table))
+            if i_format == "csv":
+                writer = csv.writer(i_file)
+                writer.writerow(columns)
+                writer.writerows(counter)
+            else:
+                # The keys are encoded once: only the values are encoded per row
+                encode = json.JSONEncoder(ensure_ascii = False).encode
+                keys   = ['{' + encode(columns[0]) + ': '] + [', ' + encode(c) + ': ' for c in columns[1:]]
+                i_file.writelines("".join(k + encode(v) for k, v in zip(keys, row)) + "}\n" for row in counter)
+
+        metrics.count("exported_rows", counter.count)
+        self._i(f"Exported {counter.count} {i_table} rows ({i_format})")
+        return counter.count
+
+    def columns(self,
+                i_table : str) -> dict[str, Union[list, array]]:
+        """
+        :param i_table: REQUIREMENTS or LINKS
+        :return       : Column name -> values of the table (see COLUMNS); integer columns are arrays
+        """
+        names  = self.COLUMNS.get(i_table)
+        values = [array('l') if n == "id" else [] for n in (names or ())]
+        for row in self.rows(i_table):
+            for column, value in zip(values, row):
+                column.append(value)
+        return dict(zip(names, values))
+
+    def __repr__(self):
+        return f"<export of {len(self.documents)} documents>"
+
+
+class _Counter:
+    """
+        Iterator wrapper counting the items that went through.
+    """
+
+    def __init__(self,
+                 i_iterable : Iterable):
+        self._it   = iter(i_iterable)
+        self.count = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        item = next(self._it)
+        self.count += 1
+        return item
@@ -1,14 +1,22 @@
 #! python3
 from    utils.logobj        import LogObj
-import  os
+import  utils.metrics       as metrics
+import  copy
+import  io
+import  itertools
+from    typing              import Iterable
 from    typing              import Optional
 from    typing              import Union
 from    pathlib             import Path
 
+from    bundle              import Bundle
 from    compiler            import Compiler
 from    requirement         import Requirement
 from    common_section      import CommonSection
 from    glossary            import Glossary
+from    glossary_linker     import GlossaryLinker
+from    section             import Section
+from    traceability        import TraceabilityMatrix
 from    document            import Document
 
 
@@ -20,25 +28,80 @@ class Generator (LogObj):
     DEFAULT_REQ_FILE_FORMAT       = "{id:05d}.txt"
     DEFAULT_CONSTANTS_FILE_FORMAT = "constants.txt"
     DEFAULT_GLOSSARY_FILE_FORMAT  = "glossary.txt"
+    DEFAULT_SECTION_FILE_FORMAT   = "sec-{name}.txt"
+    DEFAULT_MATRIX_FILE_FORMAT    = "matrix_{direction}_{source}.txt"
+    DEFAULT_INDEX_FILE_FORMAT     = None # No index by default (see _generate_index)
+    MATRIX_CSV_FILE_FORMAT        = "matrix_{direction}_{source}.csv"
 
     def __init__(self,
-                 i_project_root_dir : Union[str,
-                                            Path] = Path(),
-                 i_compiler         : Optional[Compiler] = None):
+                 i_project_root_dir      : Union[str,
+                                                 Path] = Path(),
+                 i_compiler              : Optional[Compiler] = None,
+                 i_prune_glossary        : bool = False,
+                 i_link_glossary         : Optional[GlossaryLinker.Mode] = None,
+                 i_section_snippets      : bool = False,
+                 i_requirement_snippets  : bool = True,
+                 i_traceability_matrices : bool = False):
         """
         Constructor
 
-        :param i_project_root_dir: Root folder of the project (where to find templates, generate output files, etc.)
-        :param i_compiler        : Compiler for the final document from the templates and the snippers
+        :param i_project_root_dir     : Root folder of the project (where to find templates, generate output files, etc.)
+        :param i_compiler             : Compiler for the final document from the templates and the snippers
+        :param i_prune_glossary       : If set to True, only the glossary entries actually referenced are generated
+        :param i_link_glossary        : If set, glossary terms found in the requirement texts are automatically linked
+                                        (first or all occurrences, see GlossaryLinker)
+        :param i_section_snippets     : If set to True, one aggregated snippet is generated per section (containing all
+                                        the requirements of the section and of its sub-sections)
+        :param i_requirement_snippets : If set to False, no individual requirement snippet file is written
+        :param i_traceability_matrices: If set to True, the traceability matrices to (and from) each linked document are
+                                        generated, along with their CSV export
         """
         assert isinstance(i_project_root_dir, (str, Path)),     f"type(i_project_root_dir) is {type(i_project_root_dir)}"
         assert isinstance(i_compiler, (Compiler, type(None))),  f"type(i_compiler) is {type(i_compiler)}"
+        assert isinstance(i_prune_glossary, bool),              f"type(i_prune_glossary) is {type(i_prune_glossary)}"
+        assert isinstance(i_link_glossary, (GlossaryLinker.Mode, type(None))), f"type(i_link_glossary) is {type(i_link_glossary)}"
+        assert isinstance(i_section_snippets, bool),            f"type(i_section_snippets) is {type(i_section_snippets)}"
+        assert isinstance(i_requirement_snippets, bool),        f"type(i_requirement_snippets) is {type(i_requirement_snippets)}"
+        assert isinstance(i_traceability_matrices, bool),       f"type(i_traceability_matrices) is {type(i_traceability_matrices)}"
         LogObj.__init__(self)
 
         self.root_dir = Path(i_project_root_dir).resolve()
         # self.document = i_document # Reference, not a copy
         self.compiler = i_compiler # Reference, not a copy
 
+        self.prune_glossary = i_prune_glossary
+        self.link_glossary  = i_link_glossary
+        self.glossary_usage = None # Glossary usage report of the last generated document
+
+        self.section_snippets     = i_section_snippets
+        self.requirement_snippets = i_requirement_snippets
+
+        self.traceability_matrices = i_traceability_matrices
+        self.traceability          = {} # Linked document name -> TraceabilityMatrix, of the last generated document
+
+        self._bundle = None # Bundle being rendered (see render_document)
+
+    def _write_snippet(self,
+                       i_filename : Union[str, Path],
+                       i_text     : str) -> None:
+        """
+            Write snippet i_text into file i_filename (and count the written bytes, see utils.metrics).
+            While a document is rendered (see render_document), the snippet is added to the bundle instead: i_filename
+            is then relative to the bundle root.
+        """
+        if self._bundle is not None:
+            if i_filename in self._bundle:
+                # i.e. sections whose names give the same file name: one of the snippets would be lost
+                raise Exception(f"Snippet file '{i_filename}' generated twice")
+            self._bundle.add(i_filename, i_text)
+            return
+
+        with open(i_filename, mode = 'w') as file:
+            file.write(i_text)
+            size = file.tell()
+        metrics.count("files_written")
+        metrics.count("bytes_written", size)
+
     def _generate_requirement(self,
                               i_req      : Requirement,
                               i_filename : Optional[Union[str,
@@ -53,6 +116,15 @@ class Generator (LogObj):
         raise NotImplementedError()
 
 
+    def get_requirement_snippet_filename(self,
+                                         i_req         : Requirement,
+                                         i_root_folder : Union[str, Path] = Path()) -> Path:
+        """
+        :return: Name of the snippet file of requirement i_req (format of the document, or DEFAULT_REQ_FILE_FORMAT)
+        """
+        return i_req.get_snippet_filename(i_root_folder     = i_root_folder,
+                                          i_fallback_format = self.DEFAULT_REQ_FILE_FORMAT)
+
     def _generate_constants(self,
                             i_common   : CommonSection,
                             i_filename : Optional[Union[str,
@@ -66,6 +138,130 @@ class Generator (LogObj):
         """
         raise NotImplementedError()
 
+    def _generate_section(self,
+                          i_section  : Section,
+                          i_snippets : list[str],
+                          i_filename : Optional[Union[str,
+                                                      Path]] = None) -> str:
+        """
+            Internal virtual method.
+            Generate the aggregated snippet of section i_section and optionnaly write it in file i_filename.
+        :param i_section : Section to process
+        :param i_snippets: Snippets of the requirements of the section (sub-sections included), in document order
+        :param i_filename: Filename where to write the snippet (optionnal)
+        :return          : Generated snippet code
+        """
+        raise NotImplementedError()
+
+    def get_section_snippet_filename(self,
+                                     i_section     : Section,
+                                     i_root_folder : Union[str, Path] = Path()) -> Path:
+        """
+        :return: Name of the aggregated snippet file of section i_section (i.e. 'sec-functional.input-commands.tex')
+        """
+        return Path(i_root_folder).joinpath(self.DEFAULT_SECTION_FILE_FORMAT.format(name = i_section.file_name()))
+
+    def _generate_matrix(self,
+                         i_matrix    : TraceabilityMatrix,
+                         i_direction : TraceabilityMatrix.Direction,
+                         i_coverage  : TraceabilityMatrix.Coverage,
+                         i_filename  : Optional[Union[str,
+                                                      Path]] = None) -> str:
+        """
+            Internal virtual method.
+            Generate the snippet of traceability matrix i_matrix and optionnaly write it in file i_filename.
+        :param i_matrix   : Traceability matrix to process
+        :param i_direction: Upstream (requirement -> satisfied requirements) or downstream (requirement -> satisfying
+                            requirements) view of the matrix
+        :param i_coverage : Coverage statistics of the matrix
+        :param i_filename : Filename where to write the snippet (optionnal)
+        :return           : Generated snippet code
+        """
+        raise NotImplementedError()
+
+    def get_matrix_snippet_filename(self,
+                                    i_source      : str,
+                                    i_direction   : TraceabilityMatrix.Direction,
+                                    i_root_folder : Union[str, Path] = Path(),
+                                    i_format      : Optional[str]    = None) -> Path:
+        """
+        :return: Name of the traceability matrix snippet file to or from document i_source (i.e. 'matrix_to_SP-PIDS.tex')
+        """
+        file_format = i_format or self.DEFAULT_MATRIX_FILE_FORMAT
+        return Path(i_root_folder).joinpath(file_format.format(direction = i_direction.value,
+                                                               source    = i_source))
+
+    @staticmethod
+    def _compute_traceability(i_document         : Document,
+                              i_linked_documents : dict[str, Document]) -> dict[str, tuple[TraceabilityMatrix,
+                                                                                         TraceabilityMatrix.Coverage]]:
+        """
+            Internal method.
+            Resolve the links of i_document to every document it links to (backend independent).
+        :param i_document        : Oudini document
+        :param i_linked_documents: Linked documents, by name - the uncovered requirements of a linked document are only
+                                   known if it is given
+        :return                  : Linked document name -> (traceability matrix, coverage)
+        """
+        matrices = {}
+        for source in sorted(set(i_document.reqs.link_sources()) | set(i_linked_documents)):
+            matrix   = TraceabilityMatrix.from_document(i_document = i_document,
+                                                        i_source   = source,
+                                                        i_upstream = i_linked_documents.get(source))
+            matrices[source] = (matrix, matrix.coverage())
+        return matrices
+
+    def _generate_traceability(self,
+                               i_matrices    : dict[str, tuple[TraceabilityMatrix, TraceabilityMatrix.Coverage]],
+                               i_root_folder : Path) -> None:
+        """
+            Internal method.
+            Generate the traceability matrices (snippets and CSV) of a document to every document it links to.
+        :param i_matrices   : Traceability matrices and their coverage, by linked document (see _compute_traceability)
+        :param i_root_folder: Root folder where the files will be generated
+        """
+        self.traceability = {}
+
+        for source, (matrix, coverage) in i_matrices.items():
+            self.traceability[source] = matrix
+
+            self._i(f"Traceability to '{source}': {coverage!r}")
+            if coverage.unknown:
+                self._w(f"Links to requirements not defined in '{source}': {', '.join(coverage.unknown)}")
+
+            for direction in TraceabilityMatrix.Direction:
+                self._d(f"Generating traceability matrix {direction.value} '{source}'")
+                self._generate_matrix(i_matrix    = matrix,
+                                      i_direction = direction,
+                                      i_coverage  = coverage,
+                                      i_filename  = self.get_matrix_snippet_filename(i_source      = source,
+                                                                                     i_direction   = direction,
+                                                                                     i_root_folder = i_root_folder))
+                csv = io.StringIO(newline = '')
+                matrix.write_csv(i_file      = csv,
+                                 i_direction = direction)
+                self._write_snippet(i_filename = self.get_matrix_snippet_filename(i_source      = source,
+                                                                                  i_direction   = direction,
+                                                                                  i_root_folder = i_root_folder,
+                                                                                  i_format      = self.MATRIX_CSV_FILE_FORMAT),
+                                    i_text     = csv.getvalue())
+
+    def _generate_index(self,
+                        i_document : Document,
+                        i_reqs     : list[Requirement],
+                        i_filename : Optional[Union[str,
+                                                    Path]] = None) -> str:
+        """
+            Internal virtual method.
+            Generate the entry point of the generated files (i.e. table of contents) and optionnaly write it in file
+            i_filename. Only called if DEFAULT_INDEX_FILE_FORMAT is set.
+        :param i_document: Oudini document
+        :param i_reqs    : Requirements as generated, in document order
+        :param i_filename: Filename where to write the snippet (optionnal)
+        :return          : Generated snippet code
+        """
+        raise NotImplementedError()
+
     def _generate_glossary(self,
                            i_glossary : Glossary,
                            i_filename : Optional[Union[str,
@@ -79,18 +275,260 @@ class Generator (LogObj):
         """
         raise NotImplementedError()
 
+    def _get_template_texts(self) -> Iterable[tuple[str, str]]:
+        """
+            Internal virtual method.
+            Get the content of the templates the snippets are included into, as (name, text) pairs.
+            Used to find the glossary entries referenced outside of the requirements.
+        :return: Pairs of (template name, template text) - none by default
+        """
+        return ()
+
+    def _preprocess_requirement(self,
+                                i_req    : Requirement,
+                                i_linker : Optional[GlossaryLinker]) -> Requirement:
+        """
+            Apply the generation-time transformations (i.e. glossary linking) to requirement i_req.
+            The document itself is never modified: a (shallow) copy is returned if the requirement is altered.
+        :param i_req   : Requirement to process
+        :param i_linker: Glossary linker to apply (optional)
+        :return        : Requirement to generate
+        """
+        if i_linker is not None:
+            text = i_linker.link(i_req.text)
+            if text != i_req.text:
+                i_req      = copy.copy(i_req)
+                i_req.text = text
+        return i_req
+
+    def _analyze_glossary(self,
+                          i_document : Document,
+                          i_reqs     : Iterable[Requirement]) -> Glossary:
+        """
+            Analyze the usage of the glossary of i_document in its requirements and in the templates, and report
+            unused and undefined entries.
+        :param i_document: Oudini document (with a glossary)
+        :param i_reqs    : Requirements as generated
+        :return          : Glossary to generate (pruned from unused entries if requested)
+        """
+        texts = itertools.chain(((req.format_id(), req.parsed_text) for req in i_reqs),
+                                self._get_template_texts())
+
+        usage = self.glossary_usage = i_document.glossary.analyze_usage(texts)
+
+        if usage.unused:
+            self._i(f"{len(usage.unused)} unused glossary entries: {', '.join(usage.unused)}")
+        for uid, where in usage.undefined.items():
+            self._w(f"Undefined glossary entry '{uid}' referenced in {', '.join(where)}")
+
+        if self.prune_glossary:
+            return i_document.glossary.pruned(usage.references)
+        return i_document.glossary
+
+    def _begin_render(self,
+                      i_document : Document) -> None:
+        """
+            Internal virtual method.
+            Prepare the rendering of i_document: the snippets go into a new bundle (see _write_snippet).
+        """
+        self._bundle = Bundle()
+
+    def _end_render(self) -> Bundle:
+        """
+            Internal virtual method.
+            End the rendering started by _begin_render.
+        :return: Generated snippets
+        """
+        bundle, self._bundle = self._bundle, None
+        return bundle
+
+    def _render(self,
+                i_document         : Document,
+                i_linked_documents : Optional[dict[str, Document]]) -> Bundle:
+        """
+            Internal method.
+            Generate all the snippets of i_document into a new bundle (see render_document).
+        """
+        return Generator._render_all(i_generators       = [self],
+                                     i_document         = i_document,
+                                     i_linked_documents = i_linked_documents)[0]
+
+    @staticmethod
+    def _render_all(i_generators       : list['Generator'],
+                    i_document         : Document,
+                    i_linked_documents : Optional[dict[str, Document]],
+                    i_req_ids          : Optional[set[int]] = None) -> list[Bundle]:
+        """
+            Internal method.
+            Generate all the snippets of i_document with every generator of i_generators, each into a new bundle.
+            The document is traversed once: each requirement is preprocessed once (per glossary linking mode) and
+            dispatched to every generator, and the links are resolved once for all the traceability matrices.
+        :param i_req_ids: If given, only the snippets of these requirements, and of the sections made only of them,
+                          are generated (with the constants): the glossary (pruned and analyzed on the requirements),
+                          the traceability matrices and the index, which depend on the whole document, are not (see
+                          LatexGenerator.generate_and_compile_draft)
+        :return: Bundles, in the order of i_generators
+        """
+        for generator in i_generators:
+            generator._begin_render(i_document)
+
+        try:
+            with metrics.span("preprocess"):
+                selected = [req for req in i_document.reqs.reqs.values() if i_req_ids is None or req.id in i_req_ids]
+                by_mode  = {} # Glossary linking mode -> requirements to generate
+                for generator in i_generators:
+                    mode = generator.link_glossary if i_document.glossary is not None else None
+                    if mode not in by_mode:
+                        linker = GlossaryLinker(i_glossary = i_document.glossary,
+                                                i_mode     = mode) if mode is not None else None
+                        by_mode[mode] = [generator._preprocess_requirement(i_req    = req,
+                                                                           i_linker = linker) for req in selected]
+                reqs = [by_mode[g.link_glossary if i_document.glossary is not None else None] for g in i_generators]
+
+            # Generate the requirements
+            with metrics.span("requirements"):
+                snippets = [{} for _ in i_generators]
+                for versions in zip(*reqs):
+                    for generator, req, generated in zip(i_generators, versions, snippets):
+                        generator._d("Generating [%s]" % (str(req)))
+                        if generator.requirement_snippets:
+                            filename = generator.get_requirement_snippet_filename(i_req = req)
+                        else:
+                            filename = None
+                        generated[req.id] = generator._generate_requirement(i_req      = req,
+                                                                            i_filename = filename)
+                metrics.count("requirements_generated", len(reqs[0]) * len(i_generators))
+
+            # If requested: generate one aggregated snippet per section
+            if any(g.section_snippets for g in i_generators):
+                with metrics.span("sections"):
+                    for section in i_document.reqs.sections.walk():
+                        if section.name is None:
+                            continue # Root
+                        req_ids = list(section.iter_req_ids())
+                        if i_req_ids is not None and (not req_ids or not i_req_ids.issuperset(req_ids)):
+                            continue
+                        for generator, generated in zip(i_generators, snippets):
+                            if not generator.section_snippets:
+                                continue
+                            generator._d(f"Generating section '{section!s}'")
+                            generator._generate_section(i_section  = section,
+                                                        i_snippets = [generated[i] for i in req_ids],
+                                                        i_filename = generator.get_section_snippet_filename(i_section     = section,
+                                                                                                            i_root_folder = Path()))
+
+            # Export the document constants
+            with metrics.span("constants"):
+                for generator in i_generators:
+                    generator._d("Generating constants")
+                    generator._generate_constants(i_common   = i_document.common,
+                                                  i_filename = i_document.common.get_constants_snippet_filename(i_root_folder     = Path(),
+                                                                                                                i_fallback_format = generator.DEFAULT_CONSTANTS_FILE_FORMAT))
+
+            # If present: export the glossary
+            if i_req_ids is None and i_document.glossary is not None:
+                with metrics.span("glossary"):
+                    for generator, generated in zip(i_generators, reqs):
+                        generator._d("Generating glossary")
+                        generator._generate_glossary(i_glossary = generator._analyze_glossary(i_document, generated),
+                                                     i_filename = i_document.common.get_constants_snippet_filename(i_root_folder     = Path(),
+                                                                                                                   i_fallback_format = generator.DEFAULT_GLOSSARY_FILE_FORMAT))
+
+            # If requested: generate the traceability matrices
+            if i_req_ids is None and any(g.traceability_matrices for g in i_generators):
+                with metrics.span("traceability"):
+                    matrices = Generator._compute_traceability(i_document         = i_document,
+                                                               i_linked_documents = i_linked_documents or {})
+                    for generator in i_generators:
+                        if generator.traceability_matrices:
+                            generator._d("Generating traceability matrices")
+                            generator._generate_traceability(i_matrices    = matrices,
+                                                             i_root_folder = Path())
+
+            # If supported: generate the index
+            if i_req_ids is None and any(g.DEFAULT_INDEX_FILE_FORMAT is not None for g in i_generators):
+                with metrics.span("index"):
+                    for generator, generated in zip(i_generators, reqs):
+                        if generator.DEFAULT_INDEX_FILE_FORMAT is not None:
+                            generator._d("Generating index")
+                            generator._generate_index(i_document = i_document,
+                                                      i_reqs     = generated,
+                                                      i_filename = Path(generator.DEFAULT_INDEX_FILE_FORMAT))
+        finally:
+            bundles = [generator._end_render() for generator in i_generators]
+        return bundles
+
+    def render_document(self,
+                        i_document         : Document,
+                        i_linked_documents : Optional[dict[str, Document]] = None) -> Bundle:
+        """
+            Generate the snippets of Oudini document i_document in memory, without writing any file.
+            The returned bundle maps the snippet paths (relative to the snippet folder, as generate_document would write
+            them) to their content, and can be written later on as a folder or an archive (see Bundle).
+
+        :param i_document        : Oudini document to generate the snippets from
+        :param i_linked_documents: Documents linked by i_document, by name (optional, used for the traceability matrices)
+        :return                  : Generated snippets
+        """
+        assert isinstance(i_document,         Document),                f"type(i_document) is {type(i_document)}"
+        assert isinstance(i_linked_documents, (dict, type(None))),      f"type(i_linked_documents) is {type(i_linked_documents)}"
+
+        with metrics.span("render_document"):
+            bundle = self._render(i_document         = i_document,
+                                  i_linked_documents = i_linked_documents)
+        self._d(f"Rendered [{i_document.common.project!r}:TODO] into {bundle!r}")
+        return bundle
+
+    @staticmethod
+    def render_fanout(i_generators       : list['Generator'],
+                      i_document         : Document,
+                      i_linked_documents : Optional[dict[str, Document]] = None) -> list[Bundle]:
+        """
+            Generate the snippets of Oudini document i_document in memory with several generators (i.e. LaTeX and HTML)
+            in a single pass: the document is traversed and preprocessed once, and its links resolved once, instead of
+            once per generator (see render_document).
+
+        :param i_generators      : Generators (backends) to render i_document with
+        :param i_document        : Oudini document to generate the snippets from
+        :param i_linked_documents: Documents linked by i_document, by name (optional, used for the traceability matrices)
+        :return                  : Generated snippets, one bundle per generator (in the order of i_generators)
+        """
+        assert isinstance(i_generators,       list),                    f"type(i_generators) is {type(i_generators)}"
+        assert isinstance(i_document,         Document),                f"type(i_document) is {type(i_document)}"
+        assert isinstance(i_linked_documents, (dict, type(None))),      f"type(i_linked_documents) is {type(i_linked_documents)}"
+        for generator in i_generators:
+            assert isinstance(generator, Generator), f"type(generator) is {type(generator)}"
+        if len(set(map(id, i_generators))) != len(i_generators):
+            raise Exception("The same generator is given several times")
+
+        with metrics.span("render_document", backends = len(i_generators)):
+            bundles = Generator._render_all(i_generators       = i_generators,
+                                            i_document         = i_document,
+                                            i_linked_documents = i_linked_documents)
+        for generator, bundle in zip(i_generators, bundles):
+            generator._d(f"Rendered [{i_document.common.project!r}:TODO] into {bundle!r}")
+        return bundles
+
     def generate_document(self,
-                          i_document    : Document,
-                          i_root_folder : Union[str, Path]) -> None:
+                          i_document         : Document,
+                          i_root_folder      : Union[str, Path],
+                          i_linked_documents : Optional[dict[str, Document]] = None,
+                          i_backends         : Optional[dict['Generator', Union[str, Path]]] = None) -> None:
         """
             Generate snippets from Oudini document i_document into folder i_root_folder.
+            The snippets are rendered in memory (see render_document), then written in one go.
 
-        :param i_document   : Oudini document to generate the snippets from
-        :param i_root_folder: Root folder where the snippets files will be generated
+        :param i_document        : Oudini document to generate the snippets from
+        :param i_root_folder     : Root folder where the snippets files will be generated
+        :param i_linked_documents: Documents linked by i_document, by name (optional, used for the traceability matrices)
+        :param i_backends        : Other generators to render i_document with in the same pass, with the root folder of
+                                   each one (optional, see render_fanout)
         :return: None
         """
-        assert isinstance(i_document,    Document),     f"type(i_document) is {type(i_document)}"
-        assert isinstance(i_root_folder, (str, Path)),  f"type(i_root_folder) is {type(i_root_folder)}"
+        assert isinstance(i_document,         Document),                f"type(i_document) is {type(i_document)}"
+        assert isinstance(i_root_folder,      (str, Path)),             f"type(i_root_folder) is {type(i_root_folder)}"
+        assert isinstance(i_linked_documents, (dict, type(None))),      f"type(i_linked_documents) is {type(i_linked_documents)}"
+        assert isinstance(i_backends,         (dict, type(None))),      f"type(i_backends) is {type(i_backends)}"
 
         # Convert i_root_folder to pathutils.Path
         if isinstance(i_root_folder, str):
@@ -100,49 +538,52 @@ class Generator (LogObj):
                                                                                     doc         = "TODO",
                                                                                     root_folder = i_root_folder))
 
-        # Create the output folder, if it doesn't already exist
-        self._d("Deleting '%s'" % (i_root_folder))
-        os.makedirs(i_root_folder, exist_ok = True)
-
-        # Generate the requirements
-        for _, req in i_document.reqs.reqs.items():
-            self._d("Generating [%s]" % (str(req)))
-            self._generate_requirement(i_req      = req,
-                                       i_filename = req.get_snippet_filename(i_root_folder     = i_root_folder,
-                                                                             i_fallback_format = self.DEFAULT_REQ_FILE_FORMAT))
-
-        # Export the document constants
-        self._d("Generating constants")
-        self._generate_constants(i_common   = i_document.common,
-                                 i_filename = i_document.common.get_constants_snippet_filename(i_root_folder     = i_root_folder,
-                                                                                               i_fallback_format = self.DEFAULT_CONSTANTS_FILE_FORMAT))
-
-        # If present: export the glossary
-        if i_document.glossary is not None:
-            self._d("Generating glossary")
-            self._generate_glossary(i_glossary = i_document.glossary,
-                                    i_filename = i_document.common.get_constants_snippet_filename(i_root_folder     = i_root_folder,
-                                                                                                  i_fallback_format = self.DEFAULT_GLOSSARY_FILE_FORMAT))
+        backends = dict(i_backends or {})
+        backends.pop(self, None)
+        folders  = [i_root_folder] + [Path(f) for f in backends.values()]
+
+        with metrics.span("generate_document", backends = len(folders)):
+            if backends:
+                bundles = Generator.render_fanout(i_generators       = [self] + list(backends),
+                                                  i_document         = i_document,
+                                                  i_linked_documents = i_linked_documents)
+            else:
+                bundles = [self._render(i_document         = i_document,
+                                        i_linked_documents = i_linked_documents)]
+
+            # Write all the snippets (the output folders are created if they don't already exist)
+            with metrics.span("write"):
+                for bundle, folder in zip(bundles, folders):
+                    bundle.write_dir(folder)
 
         self._i("Done generating [{project}:{doc}]".format(project = repr(i_document.common.project),
                                                                      doc     = "TODO"))
 
     def generate_and_compile(self,
-                             i_document: Document,
-                             i_out_dir : Union[str, Path]) -> None:
+                             i_document         : Document,
+                             i_out_dir          : Union[str, Path],
+                             i_linked_documents : Optional[dict[str, Document]] = None,
+                             i_bundle           : Optional[Bundle] = None) -> None:
         """
             Generate snippets for Oudini document i_document, then run the document compiler.
 
-        :param i_document : Oudini document for the generation and compilation
-        :param i_out_dir  : Output directory
+        :param i_document        : Oudini document for the generation and compilation
+        :param i_out_dir         : Output directory
+        :param i_linked_documents: Documents linked by i_document, by name (optional, see generate_document)
+        :param i_bundle          : Snippets already rendered from i_document (optional, see render_document): they are
+                                   written as is instead of being generated again
         :return: None
         """
-        assert isinstance(i_document, Document),    f"type(i_document) is {type(i_document)}"
-        assert isinstance(i_out_dir, (str, Path)),  f"type(i_out_dir) is {type(i_out_dir)}"
-
+        assert isinstance(i_document, Document),            f"type(i_document) is {type(i_document)}"
+        assert isinstance(i_out_dir, (str, Path)),          f"type(i_out_dir) is {type(i_out_dir)}"
+        assert isinstance(i_bundle, (Bundle, type(None))),  f"type(i_bundle) is {type(i_bundle)}"
 
-        self.generate_document(i_document    = i_document,
-                               i_root_folder = self.root_dir)
+        if i_bundle is not None:
+            i_bundle.write_dir(self.root_dir)
+        else:
+            self.generate_document(i_document         = i_document,
+                                   i_root_folder      = self.root_dir,
+                                   i_linked_documents = i_linked_documents)
         self.compiler.run(i_output_dir   = i_out_dir,
                           i_document     = i_document,
                           i_doc_root_dir = self.root_dir)
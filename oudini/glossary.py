@@ -1,11 +1,24 @@
 #! python3
 from    utils.logobj            import LogObj
+from    utils.xml_stream_writer import XmlStreamWriter
+import  re
 import  xml.etree.ElementTree   as ETree
+from    collections             import OrderedDict
+from    typing                  import Iterable
+from    typing                  import Iterator
+from    typing                  import Optional
 
 
 class Glossary (LogObj):
     TAG_STR = "glossary"
 
+    # LaTeX commands (glossaries package) referencing a glossary entry by its UID
+    REFERENCE_COMMANDS = frozenset(("gls", "Gls", "GLS", "glspl", "Glspl", "GLSpl", "glstext", "glsdesc",
+                                    "acrshort", "Acrshort", "acrlong", "Acrlong", "acrfull", "Acrfull",
+                                    "acrshortpl", "acrlongpl", "acrfullpl"))
+
+    _REFERENCE_RE = re.compile(r"\\(?P<cmd>[A-Za-z]+)\*?\s*(?:\[[^\]]*\]\s*)?\{(?P<uid>[^{}]*)\}")
+
     class Definition (LogObj):
         TAG_STR        = "definition"
         ATTR_UID       = "uid"
@@ -77,20 +90,54 @@ class Glossary (LogObj):
 
     _sub_types = [ Acronym, Definition ]
 
+    class Usage:
+        """
+            Result of the usage analysis of a glossary (see Glossary.analyze_usage).
+        """
+        def __init__(self):
+            self.references = OrderedDict() # UID -> number of references, for defined entries
+            self.undefined  = OrderedDict() # UID -> list of places where the undefined entry is referenced
+            self.unused     = []            # UIDs of the entries never referenced
+
+        def __repr__(self):
+            return f"{len(self.references)} used, {len(self.unused)} unused, {len(self.undefined)} undefined"
+
     def __init__(self):
         LogObj.__init__(self)
-        self.definitions = []
+        self.definitions = OrderedDict() # UID -> Definition
+
+    def add(self,
+            i_definition : Definition) -> None:
+        """
+            Add definition (or acronym) i_definition to the glossary.
+        """
+        assert isinstance(i_definition, Glossary.Definition), f"type(i_definition) is {type(i_definition)}"
+
+        # TODO: proper exception
+        assert i_definition.uid not in self.definitions, f"Duplicate definition {i_definition.uid}"
+
+        self.definitions[i_definition.uid] = i_definition
 
     def to_xml(self) -> ETree.Element:
         root = ETree.Element(self.TAG_STR)
 
         root.text = ' ' # To prevent the generator from generating an empty tag <glossary />
 
-        for d in self.definitions:
+        for d in self.definitions.values():
             root.append(d.to_xml())
 
         return root
 
+    def write_xml(self,
+                  i_writer : XmlStreamWriter) -> None:
+        """
+            Stream the XML of the glossary into i_writer (same output as to_xml).
+        """
+        i_writer.start(self.TAG_STR, i_text = ' ')
+        for d in self.definitions.values():
+            i_writer.element(d.to_xml())
+        i_writer.end()
+
     @classmethod
     def from_xml_element(cls,
                          i_elt    : ETree.Element):
@@ -106,23 +153,88 @@ class Glossary (LogObj):
                     class_ctor = def_type
 
             if class_ctor is not None:
-                definition = class_ctor.from_xml_element(e)
-
-                # TODO: proper exception
-                assert not any(definition.uid == d.uid for d in obj.definitions), f"Duplicate definition {definition.uid}"
-
-                obj.definitions.append(definition)
+                obj.add(class_ctor.from_xml_element(e))
             else:
                 obj._w(f"Ignoring unknown section <{e.tag}>")
 
         obj._i(f"Created glossary ({len(obj.definitions)} definitions) from XML")
         return obj
 
+    @classmethod
+    def find_references(cls,
+                        i_text : Optional[str]) -> Iterator[str]:
+        """
+            Find the glossary entries referenced (\\gls{...}, \\acrshort{...}, etc.) in LaTeX text i_text.
+        :param i_text: LaTeX text to scan
+        :return      : UIDs of the referenced entries, in order of appearance
+        """
+        if not i_text:
+            return
+        for m in cls._REFERENCE_RE.finditer(i_text):
+            if m.group("cmd") in cls.REFERENCE_COMMANDS:
+                yield m.group("uid").strip()
+
+    def analyze_usage(self,
+                      i_texts : Iterable[tuple[str, str]]) -> Usage:
+        """
+            Find which glossary entries are referenced in a set of LaTeX texts, in a single pass over the texts.
+
+        :param i_texts: Pairs of (name, LaTeX text) to scan - the name is only used to report undefined references.
+                        The text may be given parsed (LatexText, i.e. Requirement.parsed_text): its references are
+                        then only scanned once.
+        :return       : Usage report
+        """
+        usage  = self.Usage()
+        counts = {}
+
+        for name, text in i_texts:
+            for uid in (self.find_references(text) if isinstance(text, (str, type(None))) else text.references):
+                if uid in self.definitions:
+                    counts[uid] = counts.get(uid, 0) + 1
+                else:
+                    where = usage.undefined.setdefault(uid, [])
+                    if not where or where[-1] != name:
+                        where.append(name)
+
+        for uid in self.definitions:
+            if uid in counts:
+                usage.references[uid] = counts[uid]
+            else:
+                usage.unused.append(uid)
+
+        self._d(f"Glossary usage: {usage!r}")
+        return usage
+
+    def pruned(self,
+               i_uids : Iterable[str]) -> 'Glossary':
+        """
+        :param i_uids: UIDs of the entries to keep
+        :return      : New glossary containing only the entries of i_uids (in the original order)
+        """
+        keep = set(i_uids)
+
+        obj = type(self)()
+        for uid, d in self.definitions.items():
+            if uid in keep:
+                obj.definitions[uid] = d
+        return obj
+
+    def __contains__(self,
+                     i_uid : str):
+        return i_uid in self.definitions
+
+    def __getitem__(self,
+                    i_uid : str) -> Definition:
+        return self.definitions[i_uid]
+
+    def __len__(self):
+        return len(self.definitions)
+
     def __str__(self):
-        return f"{self.definitions!s}"
+        return f"{list(self.definitions.values())!s}"
 
     def __repr__(self):
-        return f"{self.definitions!r}"
+        return f"{list(self.definitions.values())!r}"
 
     def __iter__(self):
-        return iter(self.definitions)
+        return iter(self.definitions.values())
@@ -0,0 +1,138 @@
+#! python3
+from    utils.logobj            import LogObj
+from    utils.aho_corasick      import AhoCorasick
+import  re
+from    bisect                  import bisect_right
+from    enum                    import Enum
+from    typing                  import Optional
+from    glossary                import Glossary
+
+
+class GlossaryLinker (LogObj):
+    """
+        Automatic linking of glossary terms in LaTeX requirement texts.
+
+        Occurrences of glossary terms in the text are wrapped into the matching LaTeX macro:
+            - Definition 'uid'                  -> \\gls{uid}
+            - Acronym 'shorthand' (or 'uid')    -> \\acrshort{uid}
+
+        All terms are searched in a single pass over the text (Aho-Corasick automaton), whatever the size of the
+        glossary. Only whole words are linked (longest match first), and the following parts of the text are left
+        untouched:
+            - Command names, and the arguments of reference commands (\\gls{...}, \\ref{...}, \\begin{...}, etc.)
+            - Math ($...$, \\(...\\), \\[...\\], math environments)
+            - Comments and \\verb
+    """
+
+    class Mode (Enum):
+        First = "first" # Only link the first occurrence of each term (per text)
+        All   = "all"   # Link every occurrence
+
+    DEFINITION_MACRO = "gls"
+    ACRONYM_MACRO    = "acrshort"
+
+    # Commands whose braced argument must never be modified
+    PROTECTED_ARG_COMMANDS = frozenset(("ref", "eqref", "pageref", "autoref", "nameref", "label", "cite", "req",
+                                        "begin", "end", "url", "href", "input", "include", "includegraphics",
+                                        "newacronym", "newglossaryentry")) | Glossary.REFERENCE_COMMANDS
+
+    _PROTECTED_RE = re.compile(r"""
+          (?<!\\)%[^\n]*                                                                # Comment
+        | (?<!\\)\$\$.*?(?<!\\)\$\$                                                     # Display math
+        | (?<!\\)\$.*?(?<!\\)\$                                                         # Inline math
+        | \\\(.*?\\\)
+        | \\\[.*?\\\]
+        | \\begin\{(?P<env>equation|align|math|displaymath|eqnarray|verbatim)(?P<star>\*?)\}.*?\\end\{(?P=env)(?P=star)\}
+        | \\verb\*?(?P<delim>[^A-Za-z\s]).*?(?P=delim)
+        | \\(?P<cmd>[A-Za-z@]+)\*?(?:\s*\[[^\]]*\])?(?:\s*\{(?P<arg>[^{}]*)\})?         # Command
+        | \\.                                                                           # Escaped character
+    """, re.VERBOSE | re.DOTALL)
+
+    def __init__(self,
+                 i_glossary : Glossary,
+                 i_mode     : Mode = Mode.First):
+        """
+            Constructor.
+        :param i_glossary: Glossary whose terms are to be linked
+        :param i_mode    : Link the first occurrence of each term, or all of them
+        """
+        assert isinstance(i_glossary, Glossary),            f"type(i_glossary) is {type(i_glossary)}"
+        assert isinstance(i_mode,     GlossaryLinker.Mode), f"type(i_mode) is {type(i_mode)}"
+        LogObj.__init__(self)
+
+        self.mode      = i_mode
+        self._matcher  = AhoCorasick()
+
+        for d in i_glossary:
+            if isinstance(d, Glossary.Acronym):
+                self._matcher.add(d.shorthand or d.uid, (d.uid, self.ACRONYM_MACRO))
+            else:
+                self._matcher.add(d.uid, (d.uid, self.DEFINITION_MACRO))
+
+        self._d(f"Created glossary linker ({len(self._matcher)} terms, mode '{i_mode.value}')")
+
+    @classmethod
+    def _protected_spans(cls,
+                         i_text : str) -> tuple[list[int], list[int]]:
+        starts = []
+        ends   = []
+        for m in cls._PROTECTED_RE.finditer(i_text):
+            if m.group("cmd") is not None and m.group("arg") is not None and m.group("cmd") not in cls.PROTECTED_ARG_COMMANDS:
+                # Regular command: protect the command name and options, but not the argument
+                end = m.start("arg")
+            else:
+                end = m.end()
+            starts.append(m.start())
+            ends.append(end)
+        return starts, ends
+
+    @staticmethod
+    def _is_word_char(i_char : str) -> bool:
+        return i_char.isalnum() or i_char in "_-"
+
+    def link(self,
+             i_text : Optional[str]) -> Optional[str]:
+        """
+            Link the glossary terms found in LaTeX text i_text.
+        :param i_text: LaTeX text
+        :return      : LaTeX text with the glossary terms wrapped into the matching macros
+        """
+        if not i_text:
+            return i_text
+
+        starts, ends = self._protected_spans(i_text)
+
+        # Keep the leftmost-longest whole-word matches that are outside of the protected spans
+        candidates = {}
+        for start, end, value in self._matcher.finditer(i_text):
+            if start > 0 and self._is_word_char(i_text[start - 1]):
+                continue
+            if end < len(i_text) and self._is_word_char(i_text[end]):
+                continue
+            i = bisect_right(starts, start) - 1
+            if i >= 0 and start < ends[i]:
+                continue
+            if i + 1 < len(starts) and starts[i + 1] < end:
+                continue
+            if start not in candidates or candidates[start][0] < end:
+                candidates[start] = (end, value)
+
+        linked = set(Glossary.find_references(i_text)) if self.mode == self.Mode.First else set()
+        pieces = []
+        pos    = 0
+        for start in sorted(candidates):
+            end, (uid, macro) = candidates[start]
+            if start < pos or uid in linked:
+                continue
+            if self.mode == self.Mode.First:
+                linked.add(uid)
+
+            pieces.append(i_text[pos:start])
+            pieces.append(f"\\{macro}{{{uid}}}")
+            pos = end
+
+        if not pieces:
+            return i_text
+
+        pieces.append(i_text[pos:])
+        return "".join(pieces)
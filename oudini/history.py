@@ -0,0 +1,323 @@
+#! python3
+import  hashlib
+import  sqlite3
+import  time
+import  zlib
+import  utils.metrics           as metrics
+import  xml.etree.ElementTree   as ETree
+from    pathlib                 import Path
+from    typing                  import Optional
+from    typing                  import Union
+
+from    utils.logobj            import LogObj
+from    common_section          import CommonSection
+from    document                import Document
+from    document_diff           import DocumentDiff
+from    requirement             import Requirement
+
+
+class Baseline:
+    """
+        Recorded version of a document (see HistoryStore.record).
+    """
+
+    def __init__(self,
+                 i_id          : int,
+                 i_document    : str,
+                 i_name        : str,
+                 i_parent      : Optional[int],
+                 i_created     : float,
+                 i_format      : Optional[str]):
+        self.id          = i_id
+        self.document    = i_document # Internal name of the document (i.e. "SP-SRD-COMP1")
+        self.name        = i_name     # Name of the baseline (i.e. "A-pr1")
+        self.parent      = i_parent   # ID of the previous baseline of the document (None for the first one)
+        self.created     = i_created  # Time of the recording (time.time())
+        self.format      = i_format   # Requirement display format of the document, when recorded
+
+    def format_id(self,
+                  i_req_id : int) -> str:
+        return self.format.format(id = i_req_id) if self.format else str(i_req_id)
+
+    def __repr__(self):
+        return f"<baseline '{self.name}' of '{self.document}' ({time.strftime('%Y-%m-%d %H:%M', time.localtime(self.created))})>"
+
+
+class HistoryStore (LogObj):
+    """
+        Local, content-addressed history of the requirements of documents.
+
+        Each requirement revision is stored once, as the compressed canonical XML of the requirement (see
+        canonical_xml), keyed by its SHA-256 hash. A baseline records the (hash, section) of every requirement of a
+        document, as the changes from the previous baseline: the storage is proportional to what changed.
+
+        The store is a single SQLite file (i.e. next to the documents, see DEFAULT_FILENAME). Queries use its indexes:
+            - history   : revisions of a requirement along the baselines
+            - snapshot  : (hash, section) of every requirement of a baseline
+            - changes   : differences between two baselines (DocumentDiff)
+    """
+    DEFAULT_FILENAME = ".oudini-history.db"
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS objects   (hash     TEXT    PRIMARY KEY,
+                                              data     BLOB    NOT NULL) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS baselines (id       INTEGER PRIMARY KEY,
+                                              document TEXT    NOT NULL,
+                                              name     TEXT    NOT NULL,
+                                              parent   INTEGER REFERENCES baselines (id),
+                                              created  REAL    NOT NULL,
+                                              format   TEXT,
+                                              UNIQUE (document, name));
+        CREATE TABLE IF NOT EXISTS changes   (baseline INTEGER NOT NULL REFERENCES baselines (id),
+                                              req_id   INTEGER NOT NULL,
+                                              hash     TEXT,   -- NULL: requirement removed
+                                              section  TEXT,
+                                              PRIMARY KEY (baseline, req_id)) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS changes_by_req ON changes (req_id);
+    """
+
+    def __init__(self,
+                 i_filename : Union[str, Path]):
+        """
+        :param i_filename: Store file (created if needed)
+        """
+        assert isinstance(i_filename, (str, Path)), f"type(i_filename) is {type(i_filename)}"
+        LogObj.__init__(self)
+
+        self.filename = Path(i_filename)
+        self._db      = sqlite3.connect(self.filename)
+        self._db.executescript(self._SCHEMA)
+
+    def close(self) -> None:
+        self._db.close()
+
+    def __enter__(self) -> 'HistoryStore':
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @staticmethod
+    def canonical_xml(i_req : Requirement) -> bytes:
+        """
+        :return: Canonical XML of requirement i_req: the XML of to_xml, without formatting, and with the text without
+                 its indentation (LatexText.body: re-indenting a document does not create new revisions)
+        """
+        elt = i_req.to_xml()
+        if (text := elt.find(Requirement.TEXT_TAG_STR)) is not None:
+            text.text = i_req.parsed_text.body
+        return ETree.tostring(elt, encoding = "utf-8")
+
+    @staticmethod
+    def digest(i_data : bytes) -> str:
+        return hashlib.sha256(i_data).hexdigest()
+
+    def _baselines(self,
+                   i_document : str) -> dict[int, Baseline]:
+        rows = self._db.execute("SELECT id, document, name, parent, created, format FROM baselines "
+                                "WHERE document = ? ORDER BY id", (i_document,))
+        return {row[0]: Baseline(*row) for row in rows}
+
+    def baselines(self,
+                  i_document : str) -> list[Baseline]:
+        """
+        :param i_document: Internal name of the document
+        :return          : Baselines of the document, oldest first
+        """
+        return list(self._baselines(i_document).values())
+
+    def baseline(self,
+                 i_document : str,
+                 i_name     : Optional[str] = None) -> Baseline:
+        """
+        :param i_name: Name of the baseline (latest baseline of the document if None)
+        :return      : Baseline i_name of document i_document
+        """
+        baselines = self.baselines(i_document)
+        if not baselines:
+            raise Exception(f"No baseline of document '{i_document}'")
+        if i_name is None:
+            return baselines[-1]
+        for b in baselines:
+            if b.name == i_name:
+                return b
+        raise Exception(f"Unknown baseline '{i_name}' of document '{i_document}'")
+
+    def _chain(self,
+               i_baseline : Baseline) -> list[int]:
+        """
+        :return: IDs of the baselines from the first one to i_baseline, through the parents
+        """
+        baselines = self._baselines(i_baseline.document)
+        chain     = [i_baseline.id]
+        while (parent := baselines[chain[-1]].parent) is not None:
+            chain.append(parent)
+        return chain[::-1]
+
+    def _snapshot(self,
+                  i_baseline : Baseline) -> dict[int, tuple[str, str]]:
+        entries = {}
+        for baseline_id in self._chain(i_baseline):
+            for req_id, digest, section in self._db.execute("SELECT req_id, hash, section FROM changes WHERE baseline = ?",
+                                                            (baseline_id,)):
+                if digest is None:
+                    entries.pop(req_id, None)
+                else:
+                    entries[req_id] = (digest, section)
+        return entries
+
+    def snapshot(self,
+                 i_document : str,
+                 i_name     : Optional[str] = None) -> dict[int, tuple[str, str]]:
+        """
+        :return: Requirement ID -> (revision hash, section full name) of baseline i_name (latest if None)
+        """
+        return self._snapshot(self.baseline(i_document, i_name))
+
+    def record(self,
+               i_document : Document,
+               i_name     : str,
+               i_parent   : Optional[str] = None) -> Baseline:
+        """
+            Record the current state of a document as a new baseline.
+        :param i_document: Document
+        :param i_name    : Name of the baseline (i.e. version of the document "A-pr1"), unique for the document
+        :param i_parent  : Baseline the changes are recorded from (latest baseline of the document if None)
+        :return          : Recorded baseline
+        """
+        assert isinstance(i_document, Document), f"type(i_document) is {type(i_document)}"
+        assert isinstance(i_name,     str),      f"type(i_name) is {type(i_name)}"
+
+        name = str(i_document.common.title)
+        if any(b.name == i_name for b in self.baselines(name)):
+            raise Exception(f"Baseline '{i_name}' of document '{name}' already recorded")
+
+        with metrics.span("record_baseline", document = name):
+            parent = self.baseline(name, i_parent) if (i_parent is not None or self.baselines(name)) else None
+            before = self._snapshot(parent) if parent is not None else {}
+
+            changes = []
+            objects = []
+            current = set()
+            for req in i_document.reqs.reqs.values():
+                data    = self.canonical_xml(req)
+                digest  = self.digest(data)
+                section = i_document.reqs.section_of(req).full_name()
+                current.add(req.id)
+                if before.get(req.id) != (digest, section):
+                    changes.append((req.id, digest, section))
+                    if before.get(req.id, (None,))[0] != digest:
+                        objects.append((digest, zlib.compress(data)))
+            changes.extend((req_id, None, None) for req_id in before.keys() - current)
+
+            with self._db:
+                cursor = self._db.execute("INSERT INTO baselines (document, name, parent, created, format) "
+                                          "VALUES (?, ?, ?, ?, ?)",
+                                          (name, i_name, parent.id if parent is not None else None, time.time(),
+                                           i_document.common.req_display_format))
+                baseline_id = cursor.lastrowid
+                self._db.executemany("INSERT OR IGNORE INTO objects (hash, data) VALUES (?, ?)", objects)
+                self._db.executemany("INSERT INTO changes (baseline, req_id, hash, section) VALUES (?, ?, ?, ?)",
+                                     ((baseline_id,) + c for c in changes))
+
+        metrics.count("baseline_changes", len(changes))
+        self._i(f"Recorded baseline '{i_name}' of '{name}' ({len(changes)} changes)")
+        return self.baseline(name, i_name)
+
+    def data(self,
+             i_hash : str) -> bytes:
+        """
+        :return: Canonical XML of revision i_hash
+        """
+        row = self._db.execute("SELECT data FROM objects WHERE hash = ?", (i_hash,)).fetchone()
+        if row is None:
+            raise Exception(f"Unknown revision {i_hash}")
+        return zlib.decompress(row[0])
+
+    def requirement(self,
+                    i_hash   : str,
+                    i_common : Optional[CommonSection] = None) -> Requirement:
+        """
+        :param i_hash  : Revision hash
+        :param i_common: Common section of the requirement (for its display format)
+        :return        : Requirement of revision i_hash
+        """
+        return Requirement.from_xml_element(i_elt    = ETree.fromstring(self.data(i_hash)),
+                                            i_common = i_common if i_common is not None else CommonSection())
+
+    def fields(self,
+               i_hash    : str,
+               i_section : Optional[str]) -> dict:
+        """
+        :return: Compared values of the fields of revision i_hash in section i_section (see DocumentDiff.fields)
+        """
+        return DocumentDiff.fields(self.requirement(i_hash), i_section = i_section)
+
+    def history(self,
+                i_document : str,
+                i_req_id   : int,
+                i_name     : Optional[str] = None) -> list[tuple[Baseline, Optional[str], Optional[str]]]:
+        """
+        :param i_document: Internal name of the document
+        :param i_req_id  : Requirement ID
+        :param i_name    : Last baseline to look at (latest if None)
+        :return          : (baseline, revision hash, section) of each change of the requirement, oldest first (hash is
+                           None when the requirement was removed)
+        """
+        last      = self.baseline(i_document, i_name)
+        baselines = self._baselines(i_document)
+        chain     = self._chain(last)
+        rows      = dict((b, (h, s)) for b, h, s in
+                         self._db.execute("SELECT baseline, hash, section FROM changes WHERE req_id = ?", (i_req_id,)))
+        return [(baselines[b],) + rows[b] for b in chain if b in rows]
+
+    def changes(self,
+                i_document : str,
+                i_old      : str,
+                i_new      : Optional[str] = None) -> DocumentDiff:
+        """
+        :param i_document: Internal name of the document
+        :param i_old     : Reference baseline
+        :param i_new     : New baseline (latest if None)
+        :return          : Differences of the requirements from baseline i_old to baseline i_new (the glossary is not
+                           recorded)
+        """
+        old = self.baseline(i_document, i_old)
+        new = self.baseline(i_document, i_new)
+
+        old_chain = self._chain(old)
+        new_chain = self._chain(new)
+        if new_chain[:len(old_chain)] == old_chain:
+            # i_new descends from i_old: only the requirements changed in between can differ
+            touched = {r for b in new_chain[len(old_chain):]
+                       for (r,) in self._db.execute("SELECT req_id FROM changes WHERE baseline = ?", (b,))}
+            old_entries = self._snapshot(old)
+            new_entries = self._snapshot(new)
+        else:
+            old_entries = self._snapshot(old)
+            new_entries = self._snapshot(new)
+            touched     = old_entries.keys() | new_entries.keys()
+
+        diff = DocumentDiff()
+        for req_id in sorted(touched):
+            before = old_entries.get(req_id)
+            after  = new_entries.get(req_id)
+            if before == after:
+                continue
+            if after is None:
+                diff.changes.append(DocumentDiff.Change(DocumentDiff.Change.REMOVED, req_id, old.format_id(req_id)))
+            elif before is None:
+                diff.changes.append(DocumentDiff.Change(DocumentDiff.Change.ADDED, req_id, new.format_id(req_id)))
+            else:
+                old_fields = self.fields(*before)
+                new_fields = self.fields(*after)
+                modified   = [f for f in DocumentDiff.FIELDS if old_fields[f] != new_fields[f]]
+                if modified:
+                    diff.changes.append(DocumentDiff.Change(DocumentDiff.Change.MODIFIED, req_id,
+                                                            new.format_id(req_id), modified))
+        return diff
+
+    def __repr__(self):
+        num_objects, = self._db.execute("SELECT COUNT(*) FROM objects").fetchone()
+        num_baselines, = self._db.execute("SELECT COUNT(*) FROM baselines").fetchone()
+        return f"<history store '{self.filename}': {num_baselines} baselines, {num_objects} revisions>"
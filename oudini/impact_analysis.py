@@ -0,0 +1,231 @@
+#! python3
+from    utils.logobj            import LogObj
+import  utils.metrics           as metrics
+from    collections             import deque
+from    pathlib                 import Path
+from    typing                  import Callable
+from    typing                  import Hashable
+from    typing                  import Iterable
+from    typing                  import Optional
+from    typing                  import Union
+
+from    document                import Document
+from    link_validation         import LinkTable
+
+
+# (document name, formatted requirement ID), i.e. ("SP-PIDS", "SP-PIDS-REQ-20000")
+Item = tuple[str, str]
+
+
+def strongly_connected(i_nodes      : Iterable[Hashable],
+                       i_successors : Callable[[Hashable], Iterable[Hashable]]) -> list[list[Hashable]]:
+    """
+        Strongly connected components of a directed graph (Tarjan's algorithm, iterative: no recursion limit).
+    :param i_nodes     : Nodes of the graph
+    :param i_successors: Function giving the successors of a node
+    :return            : Components, in reverse topological order (a component comes before the components linking to it)
+    """
+    index      = {}
+    low        = {}
+    on_stack   = set()
+    stack      = []
+    components = []
+
+    for root in i_nodes:
+        if root in index:
+            continue
+        index[root] = low[root] = len(index)
+        stack.append(root)
+        on_stack.add(root)
+        work = [(root, iter(i_successors(root)))]
+
+        while work:
+            node, successors = work[-1]
+            for succ in successors:
+                if succ not in index:
+                    index[succ] = low[succ] = len(index)
+                    stack.append(succ)
+                    on_stack.add(succ)
+                    work.append((succ, iter(i_successors(succ))))
+                    break
+                if succ in on_stack:
+                    low[node] = min(low[node], index[succ])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[node])
+                if low[node] == index[node]:
+                    component = []
+                    while True:
+                        n = stack.pop()
+                        on_stack.discard(n)
+                        component.append(n)
+                        if n == node:
+                            break
+                    components.append(component)
+    return components
+
+
+class ImpactReport:
+    """
+        Result of an impact analysis (see LinkGraph.impact).
+    """
+
+    def __init__(self,
+                 i_changed : list[Item]):
+        self.changed   = i_changed # Changed items
+        self.affected  = {}        # Affected item -> item it satisfies, through which it is affected (document order of the traversal)
+        self.depth     = {}        # Affected item -> number of links from the nearest changed item
+        self.tests     = []        # Affected items validated by test
+        self.cycles    = []        # Cycles of links among the changed and affected items (lists of items)
+        self.documents = []        # Documents to regenerate, upstream first (see LinkGraph.impact)
+        self.unknown   = []        # Changed items unknown to the graph (no requirement, no link to it)
+
+    def path(self,
+             i_item : Item) -> list[Item]:
+        """
+        :return: Chain of links from a changed item to affected item i_item
+        """
+        path = [i_item]
+        while (via := self.affected.get(path[-1])) is not None and via not in path:
+            path.append(via)
+        return path[::-1]
+
+    def to_dict(self) -> dict:
+        fmt = lambda item: f"{item[0]}:{item[1]}"
+        return {"changed"   : [fmt(i) for i in self.changed],
+                "affected"  : [{"item": fmt(i), "via": fmt(v), "depth": self.depth[i]} for i, v in self.affected.items()],
+                "tests"     : [fmt(i) for i in self.tests],
+                "cycles"    : [[fmt(i) for i in c] for c in self.cycles],
+                "documents" : self.documents,
+                "unknown"   : [fmt(i) for i in self.unknown]}
+
+    def __bool__(self):
+        return bool(self.affected)
+
+    def __repr__(self):
+        return (f"<impact of {len(self.changed)} changes: {len(self.affected)} affected requirements "
+                f"({len(self.tests)} tested), {len(self.documents)} documents, {len(self.cycles)} cycles>")
+
+
+class LinkGraph (LogObj):
+    """
+        Graph of the <satisfies> links of a set of documents, for change impact analysis.
+
+        A requirement satisfying an upstream requirement depends on it: a change of the upstream requirement affects
+        it, and transitively everything that satisfies it, across documents. The graph is built once, as adjacency
+        lists from each upstream requirement to the requirements satisfying it (from the LinkTable of each document);
+        an impact query then only visits the affected part of the graph (see impact), which keeps queries interactive
+        on graphs of hundreds of thousands of links.
+    """
+
+    def __init__(self):
+        LogObj.__init__(self)
+
+        self.tables     = {} # Document name -> LinkTable
+        self.downstream = {} # Item -> items satisfying it
+        self.num_links  = 0
+
+    def add(self,
+            i_table : LinkTable) -> None:
+        assert isinstance(i_table, LinkTable), f"type(i_table) is {type(i_table)}"
+
+        if i_table.name in self.tables:
+            raise Exception(f"Document '{i_table.name}' loaded twice")
+        self.tables[i_table.name] = i_table
+
+        name       = i_table.name
+        downstream = self.downstream
+        for req, source, target in i_table.links:
+            downstream.setdefault((source, target), []).append((name, req))
+        self.num_links += len(i_table.links)
+
+    def add_document(self,
+                     i_document : Document) -> None:
+        self.add(LinkTable.from_document(i_document))
+
+    @classmethod
+    def from_documents(cls,
+                       i_documents : Iterable[Document]) -> 'LinkGraph':
+        obj = cls()
+        for doc in i_documents:
+            obj.add_document(doc)
+        return obj
+
+    @classmethod
+    def from_files(cls,
+                   i_filenames : list[Union[str, Path]],
+                   i_workers   : Optional[int] = None) -> 'LinkGraph':
+        """
+        :param i_filenames: Documents (XML)
+        :param i_workers  : Number of worker processes (see LinkTable.from_files)
+        :return           : Link graph of the documents of i_filenames
+        """
+        obj = cls()
+        for table in LinkTable.from_files(i_filenames, i_workers):
+            obj.add(table)
+        return obj
+
+    def impact(self,
+               i_changed   : Iterable[Item],
+               i_max_depth : Optional[int] = None) -> ImpactReport:
+        """
+            Transitive closure of the requirements depending on changed requirements.
+        :param i_changed  : Changed requirements, as (document name, formatted requirement ID) (i.e. from DocumentDiff)
+        :param i_max_depth: Maximum number of links followed from a changed requirement (no limit if None)
+        :return           : Affected requirements, the cycles of links among them, and the documents to regenerate:
+                            those of the changed and affected requirements, ordered so that a document comes after the
+                            documents it links to (the documents of a cycle of links are regenerated together)
+        """
+        changed = list(dict.fromkeys(i_changed))
+        report  = ImpactReport(changed)
+
+        with metrics.span("impact_analysis", changed = len(changed)):
+            downstream = self.downstream
+            affected   = report.affected
+            depth      = report.depth
+            doc_edges  = {} # Document -> documents linking to it (among the affected ones)
+
+            for item in changed:
+                doc, req = item
+                if item not in downstream and (doc not in self.tables or req not in self.tables[doc].ids):
+                    report.unknown.append(item)
+
+            # Breadth-first traversal: depth is the shortest chain of links from a changed item
+            queue = deque((item, 0) for item in changed)
+            seen  = set(changed)
+            while queue:
+                item, d = queue.popleft()
+                if i_max_depth is not None and d >= i_max_depth:
+                    continue
+                for succ in downstream.get(item, ()):
+                    if succ[0] != item[0]:
+                        doc_edges.setdefault(item[0], set()).add(succ[0])
+                    if succ not in seen:
+                        seen.add(succ)
+                        affected[succ] = item
+                        depth[succ]    = d + 1
+                        queue.append((succ, d + 1))
+
+            report.tests = [item for item in affected if item[1] in self.tables[item[0]].tested]
+
+            # Cycles: strongly connected components of the visited sub-graph
+            for component in strongly_connected(seen, lambda n: [s for s in downstream.get(n, ()) if s in seen]):
+                if len(component) > 1 or component[0] in downstream.get(component[0], ()):
+                    report.cycles.append(component[::-1])
+
+            # Regeneration order: reverse topological order of the components of the document graph
+            documents = dict.fromkeys(item[0] for item in changed)
+            documents.update(dict.fromkeys(item[0] for item in affected))
+            for component in reversed(strongly_connected(documents, lambda d: doc_edges.get(d, ()))):
+                report.documents.extend(sorted(d for d in component if d in self.tables))
+
+        metrics.count("impact_affected", len(affected))
+        for cycle in report.cycles:
+            self._w(f"Cycle of links: {' -> '.join(f'{d}:{r}' for d, r in cycle)}")
+        self._i(f"Impact analysis: {report!r}")
+        return report
+
+    def __repr__(self):
+        return f"<link graph of {len(self.tables)} documents: {len(self.downstream)} linked requirements, {self.num_links} links>"
@@ -1,14 +1,22 @@
 #! python3
-import shutil
+import  re
+import  shutil
+import  utils.metrics   as metrics
 
 from    generator       import Generator
+from    bundle          import Bundle
 from    compiler        import Compiler
 from    requirement     import Requirement
 from    common_section  import CommonSection
 from    glossary        import Glossary
+from    glossary_linker import GlossaryLinker
+from    section         import Section
+from    traceability    import TraceabilityMatrix
 from    document        import Document
 
 from    pathlib         import Path
+from    typing          import Iterable
+from    typing          import Iterator
 from    typing          import Optional
 from    typing          import Union
 
@@ -21,6 +29,13 @@ class LatexGenerator (Generator):
     DEFAULT_REQ_FILE_FORMAT       = "{id:05d}.tex"
     DEFAULT_CONSTANTS_FILE_FORMAT = "constants.tex"
     DEFAULT_GLOSSARY_FILE_FORMAT  = "glossary.tex"
+    DEFAULT_SECTION_FILE_FORMAT   = "sec-{name}.tex"
+    DEFAULT_MATRIX_FILE_FORMAT    = "matrix_{direction}_{source}.tex"
+
+    # \include{...} of the templates (comments excluded): the parts of the document that can be compiled alone
+    # (see generate_and_compile_draft)
+    _INCLUDE_RE = re.compile(r"(?<!\\)\\include\s*\{([^}]*)\}")
+    _COMMENT_RE = re.compile(r"(?<!\\)%[^\n]*")
 
     LATEX_REQ_TEMPLATE =\
 r"""
@@ -32,6 +47,48 @@ r"""
     LATEX_VALIDATION_STRATEGY_TEMPLATE =\
 r"""
 [\textbf{{\color{{blue}} {text} }}]
+"""
+
+    LATEX_SECTION_TEMPLATE =\
+r"""
+% Section '{name}' ({num_req} requirements)
+{requirements}
+"""
+
+    LATEX_MATRIX_TEMPLATE =\
+r"""
+\begin{{longtable}}{{|p{{0.22\textwidth}}|p{{0.40\textwidth}}|p{{0.22\textwidth}}|}}
+\caption{{{caption}}}\label{{{label_name}}} \\
+\hline
+{header}
+\hline
+\endfirsthead
+\hline
+{header}
+\hline
+\endhead
+\hline
+\multicolumn{{3}}{{r}}{{\textit{{Continued on next page}}}} \\
+\endfoot
+\endlastfoot
+{rows}
+\end{{longtable}}
+{coverage}
+"""
+    LATEX_MATRIX_HEADER_TEMPLATE =\
+r"""\textbf{{{first}}} & \textbf{{Description}} & \textbf{{{second}}} \\"""
+
+    LATEX_MATRIX_ROW_TEMPLATE =\
+r"""{req_id} & {desc} & {linked} \\ \hline
+"""
+
+    LATEX_MATRIX_COVERAGE_TEMPLATE =\
+r"""
+\begin{{tabular}}{{|l|r|}}
+\hline
+{rows}
+\hline
+\end{{tabular}}
 """
 
     LATEX_CONSTANT_TEMPLATE =\
@@ -61,17 +118,35 @@ r"""
 """
 
     def __init__(self,
-                 i_project_root_dir : Union[str,
-                                            Path] = Path(),
-                 i_compiler         : Optional[Compiler] = None):
+                 i_project_root_dir      : Union[str,
+                                                 Path] = Path(),
+                 i_compiler              : Optional[Compiler] = None,
+                 i_prune_glossary        : bool = False,
+                 i_link_glossary         : Optional[GlossaryLinker.Mode] = None,
+                 i_section_snippets      : bool = False,
+                 i_requirement_snippets  : bool = True,
+                 i_traceability_matrices : bool = False):
         """
             Constructor.
-        :param i_project_root_dir: Root of the LaTeX project (i.e. where the .tex root document is)
-        :param i_compiler        : LaTeX compiler to use for document generation
+        :param i_project_root_dir     : Root of the LaTeX project (i.e. where the .tex root document is)
+        :param i_compiler             : LaTeX compiler to use for document generation
+        :param i_prune_glossary       : If set to True, only the glossary entries referenced in the requirements and in the
+                                        .tex templates are generated
+        :param i_link_glossary        : If set, glossary terms found in the requirement texts are automatically linked
+        :param i_section_snippets     : If set to True, one aggregated snippet is generated per section
+                                        (i.e. snip/sec-input-commands.tex)
+        :param i_requirement_snippets : If set to False, no individual requirement snippet file is written
+        :param i_traceability_matrices: If set to True, traceability matrices are generated for each linked document
+                                        (i.e. snip/matrix_to_SP-PIDS.tex, snip/matrix_from_SP-PIDS.tex, and .csv)
         """
 
-        super().__init__(i_project_root_dir = i_project_root_dir,
-                         i_compiler         = i_compiler)
+        super().__init__(i_project_root_dir      = i_project_root_dir,
+                         i_compiler              = i_compiler,
+                         i_prune_glossary        = i_prune_glossary,
+                         i_link_glossary         = i_link_glossary,
+                         i_section_snippets      = i_section_snippets,
+                         i_requirement_snippets  = i_requirement_snippets,
+                         i_traceability_matrices = i_traceability_matrices)
 
         self.latex_root_dir = self.root_dir.joinpath('latex')       # TODO constant / improve?
         self.snip_root_dir  = self.latex_root_dir.joinpath('snip') # TODO constant / improve?
@@ -108,11 +183,106 @@ r"""
         if i_filename is not None:
             self._d("Writing [{req}] into '{file}'".format(req  = i_req.format_id(),
                                                                       file = i_filename.name))
-            with open(i_filename, mode = 'w') as file:
-                file.write(text)
+            self._write_snippet(i_filename, text)
+
+        return text
+
+
+    def _generate_section(self,
+                          i_section  : Section,
+                          i_snippets : list[str],
+                          i_filename : Optional[Union[str,
+                                                      Path]] = None) -> str:
+        """
+            Generate a .tex file containing the LaTeX code of all the requirements of section i_section, so that a
+            whole section can be included at once into the master LaTeX document.
+
+        :param i_section : Section to process
+        :param i_snippets: LaTeX snippets of the requirements of the section, in document order
+        :param i_filename: Filename where to write the snippet (optional)
+        :return          : Generated LaTeX code
+        """
+        assert isinstance(i_section,    Section),                 f"type(i_section) is {type(i_section)}"
+        assert isinstance(i_filename,   (str, Path, type(None))), f"type(i_filename) is {type(i_filename)}"
+
+        text = LatexGenerator.LATEX_SECTION_TEMPLATE.format(name         = i_section.full_name(),
+                                                            num_req      = len(i_snippets),
+                                                            requirements = "".join(i_snippets))
+
+        if i_filename is not None:
+            self._d(f"Writing section '{i_section!s}' into '{Path(i_filename).name}'")
+            self._write_snippet(i_filename, text)
 
         return text
 
+    def _generate_matrix(self,
+                         i_matrix    : TraceabilityMatrix,
+                         i_direction : TraceabilityMatrix.Direction,
+                         i_coverage  : TraceabilityMatrix.Coverage,
+                         i_filename  : Optional[Union[str,
+                                                      Path]] = None) -> str:
+        """
+            Generate a .tex file containing the traceability matrix i_matrix, as a (multi-page) longtable with one line
+            per requirement and the list of its linked requirements, followed by the coverage statistics.
+            The requirements of the generated document are hyperlinks to their definition.
+
+        :param i_matrix   : Traceability matrix to convert to LaTeX
+        :param i_direction: Upstream ('matrix_to_...') or downstream ('matrix_from_...') view of the matrix
+        :param i_coverage : Coverage statistics of the matrix
+        :param i_filename : Filename where to write the snippet (optional)
+        :return           : Generated LaTeX code
+        """
+        assert isinstance(i_matrix,     TraceabilityMatrix),           f"type(i_matrix) is {type(i_matrix)}"
+        assert isinstance(i_direction,  TraceabilityMatrix.Direction), f"type(i_direction) is {type(i_direction)}"
+        assert isinstance(i_filename,   (str, Path, type(None))),      f"type(i_filename) is {type(i_filename)}"
+
+        def own(i_req_id : str) -> str:
+            return f"\\hyperref[{i_req_id}]{{{LatexGenerator.sanitize(i_req_id)}}}"
+
+        def other(i_req_id : str) -> str:
+            return LatexGenerator.sanitize(i_req_id)
+
+        source = LatexGenerator.sanitize(i_matrix.source)
+        if i_direction == TraceabilityMatrix.Direction.Upstream:
+            first,   second  = "Requirement", source
+            fmt_req, fmt_lnk = own, other
+            caption          = f"Traceability matrix to {source}"
+        else:
+            first,   second  = source, "Requirement"
+            fmt_req, fmt_lnk = other, own
+            caption          = f"Traceability matrix from {source}"
+
+        rows = "".join(LatexGenerator.LATEX_MATRIX_ROW_TEMPLATE.format(req_id = fmt_req(req_id),
+                                                                       desc   = desc,
+                                                                       linked = r" \newline ".join(fmt_lnk(i) for i, _ in linked) or "--")
+                       for (req_id, desc), linked in i_matrix.iter_entries(i_direction))
+
+        # Coverage statistics
+        stats = [("Requirements", i_coverage.num_reqs)]
+        if i_coverage.num_parents is not None:
+            stats.append((f"{source} items", i_coverage.num_parents))
+        stats.append((f"Links to {source}",                             i_coverage.num_links))
+        stats.append((f"Requirements not linked to {source}",           len(i_coverage.orphans)))
+        if i_coverage.num_parents is not None:
+            stats.append((f"{source} items not covered",                len(i_coverage.uncovered)))
+            stats.append((f"Links to undefined {source} items",         len(i_coverage.unknown)))
+        stats.append((f"Requirements linked to several {source} items", len(i_coverage.many_to_one)))
+        stats.append((f"{source} items linked to several requirements", len(i_coverage.one_to_many)))
+
+        coverage = LatexGenerator.LATEX_MATRIX_COVERAGE_TEMPLATE.format(rows = "\n".join(f"{k} & {v} \\\\" for k, v in stats))
+
+        text = LatexGenerator.LATEX_MATRIX_TEMPLATE.format(caption    = caption,
+                                                           label_name = f"tab:matrix_{i_direction.value}_{i_matrix.source}",
+                                                           header     = LatexGenerator.LATEX_MATRIX_HEADER_TEMPLATE.format(first  = first,
+                                                                                                                           second = second),
+                                                           rows       = rows,
+                                                           coverage   = coverage)
+
+        if i_filename is not None:
+            self._d(f"Writing traceability matrix {i_direction.value} '{i_matrix.source}' into '{Path(i_filename).name}'")
+            self._write_snippet(i_filename, text)
+
+        return text
 
     def _generate_constants(self,
                             i_common   : CommonSection,
@@ -144,8 +314,7 @@ r"""
 
         if i_filename is not None:
             self._d(f"Writing constants into '{i_filename.name}'")
-            with open(i_filename, mode = 'w') as file:
-                file.write(text)
+            self._write_snippet(i_filename, text)
 
         return text
 
@@ -159,7 +328,7 @@ r"""
 
         acronyms    = ""
         definitions = ""
-        for a in i_glossary.definitions:
+        for a in i_glossary.definitions.values():
             assert isinstance(a, Glossary.Definition), f"type(a) is {type(a)}"
 
             if isinstance(a, Glossary.Acronym):
@@ -175,27 +344,48 @@ r"""
 
         if i_filename is not None:
             self._d(f"Writing glossary into '{i_filename.name}'")
-            with open(i_filename, mode = 'w') as file:
-                file.write(text)
+            self._write_snippet(i_filename, text)
 
         return text
 
+    def _get_template_texts(self) -> Iterable[tuple[str, str]]:
+        """
+            Get the content of the .tex templates of the LaTeX project (generated snippets excluded).
+        :return: Pairs of (template file name, template text)
+        """
+        for filename in sorted(self.latex_root_dir.rglob('*.tex')):
+            if self.snip_root_dir in filename.parents:
+                continue
+            try:
+                with open(filename, mode = 'r', encoding = 'utf8') as file:
+                    yield filename.name, file.read()
+            except (OSError, UnicodeDecodeError) as e:
+                self._w(f"Could not read template '{filename}' ({e})")
+
     def generate_and_compile(self,
                              i_document         : Document,
                              i_out_dir          : Union[str, Path],
-                             i_clean_before_run : Optional[bool] = True):
-        assert isinstance(i_document,           Document),      f"type(i_document) is {type(i_document)}"
-        assert isinstance(i_out_dir,            (str, Path)),   f"type(i_document) is {type(i_out_dir)}"
-        assert isinstance(i_clean_before_run,   bool),          f"type(i_clean_before_run) is {type(i_clean_before_run)}"
+                             i_clean_before_run : Optional[bool] = True,
+                             i_linked_documents : Optional[dict[str, Document]] = None,
+                             i_bundle           : Optional[Bundle] = None):
+        assert isinstance(i_document,           Document),              f"type(i_document) is {type(i_document)}"
+        assert isinstance(i_out_dir,            (str, Path)),           f"type(i_document) is {type(i_out_dir)}"
+        assert isinstance(i_clean_before_run,   bool),                  f"type(i_clean_before_run) is {type(i_clean_before_run)}"
+        assert isinstance(i_bundle,             (Bundle, type(None))),  f"type(i_bundle) is {type(i_bundle)}"
 
         # If requested, delete the output folder first
         if i_clean_before_run:
             self._i(f"Deleting '{i_out_dir}'")
             shutil.rmtree(i_out_dir, ignore_errors = True)
 
-        # Snippet generation is done in the LaTeX / snip folder
-        self.generate_document(i_document    = i_document,
-                               i_root_folder = self.snip_root_dir)
+        # Snippet generation is done in the LaTeX / snip folder (or the snippets were already rendered, see render_document)
+        if i_bundle is not None:
+            self._i(f"Writing {i_bundle!r} into '{self.snip_root_dir}'")
+            i_bundle.write_dir(self.snip_root_dir)
+        else:
+            self.generate_document(i_document         = i_document,
+                                   i_root_folder      = self.snip_root_dir,
+                                   i_linked_documents = i_linked_documents)
 
         if self.compiler is None:
             raise Exception("No LaTeX compiler specified")
@@ -204,6 +394,124 @@ r"""
                           i_doc_root_dir = self.latex_root_dir,
                           i_output_dir   = i_out_dir)
 
+    def _iter_included_parts(self) -> Iterator[str]:
+        """
+        :return: Files \\include'd by the .tex templates of the LaTeX project, as written (i.e. 'snip/sec-input-commands')
+        """
+        for _, text in self._get_template_texts():
+            for name in self._INCLUDE_RE.findall(self._COMMENT_RE.sub("", text)):
+                name = name.strip()
+                yield name[:-len(".tex")] if name.endswith(".tex") else name
+
+    def get_draft_parts(self,
+                        i_document  : Document,
+                        i_selection : Iterable[str]) -> dict[str, list[int]]:
+        """
+            Find the parts of the document to compile for a selection of sections and requirements.
+            A part is a snippet \\include'd by the .tex templates (i.e. \\include{snip/sec-input-commands}): the snippet of
+            a section (see i_section_snippets) or of a requirement.
+
+        :param i_document : Oudini document
+        :param i_selection: Full names of sections (i.e. 'functional/input-commands') and formatted requirement IDs
+        :return           : Part name -> IDs of the requirements of the part, in document order
+        """
+        assert isinstance(i_document, Document), f"type(i_document) is {type(i_document)}"
+
+        included = set(self._iter_included_parts())
+        snip_dir = self.snip_root_dir.relative_to(self.latex_root_dir)
+        reqs     = i_document.reqs
+
+        def section_part(i_section : Section) -> str:
+            return snip_dir.joinpath(self.get_section_snippet_filename(i_section = i_section)).with_suffix("").as_posix()
+
+        def req_part(i_req : Requirement) -> str:
+            return snip_dir.joinpath(self.get_requirement_snippet_filename(i_req = i_req)).with_suffix("").as_posix()
+
+        def enclosing(i_section : Section) -> Optional[Section]:
+            # Nearest section (itself or above) which is a part
+            while i_section is not None and i_section.name is not None:
+                if section_part(i_section) in included:
+                    return i_section
+                i_section = i_section.parent
+            return None
+
+        by_name = {req.format_id(): req for req in reqs.reqs.values()}
+        parts   = {}
+        for name in i_selection:
+            found = []
+            if (section := reqs.sections.find(name)) is not None:
+                if (outer := enclosing(section)) is not None:
+                    found.append((section_part(outer), list(outer.iter_req_ids())))
+                else:
+                    # Section above the parts: all the parts within it
+                    stack = [section]
+                    while stack:
+                        sec = stack.pop()
+                        if section_part(sec) in included:
+                            found.append((section_part(sec), list(sec.iter_req_ids())))
+                            continue
+                        found += [(req_part(reqs.reqs[i]), [i]) for i in sec.req_ids if req_part(reqs.reqs[i]) in included]
+                        stack.extend(reversed(sec.children))
+            elif (req := by_name.get(name)) is not None:
+                if req_part(req) in included:
+                    found.append((req_part(req), [req.id]))
+                elif (outer := enclosing(reqs.section_of(req))) is not None:
+                    found.append((section_part(outer), list(outer.iter_req_ids())))
+            else:
+                raise Exception(f"No section or requirement '{name}' in the document")
+
+            if not found:
+                raise Exception(f"'{name}' is not in a part of the document: the LaTeX templates must \\include its snippet, "
+                                f"or the snippet of a section containing it")
+            parts.update(found)
+
+        self._d(f"Draft parts: {', '.join(parts)}")
+        return parts
+
+    def generate_and_compile_draft(self,
+                                   i_document         : Document,
+                                   i_out_dir          : Union[str, Path],
+                                   i_selection        : Iterable[str],
+                                   i_linked_documents : Optional[dict[str, Document]] = None) -> list[str]:
+        """
+            Draft of the parts of the document holding some sections or requirements (see get_draft_parts), after a
+            full compilation (see generate_and_compile) into the same output folder.
+            Only the snippets of these parts (and the constants) are generated again, and only these parts are compiled,
+            with \\includeonly: the other parts keep their page numbers, labels, and glossary entries from the full
+            compilation, and the glossary snippet is kept as is (it depends on the whole document). The duration
+            depends on the size of the parts, not on the size of the document.
+
+        :param i_document        : Oudini document (as edited since the full compilation)
+        :param i_out_dir         : Output directory of the full compilation (the draft PDF is written next to the full one)
+        :param i_selection       : Full names of sections and formatted requirement IDs
+        :param i_linked_documents: Documents linked by i_document, by name (optional, see generate_document)
+        :return                  : Compiled parts
+        """
+        assert isinstance(i_document, Document),    f"type(i_document) is {type(i_document)}"
+        assert isinstance(i_out_dir,  (str, Path)), f"type(i_out_dir) is {type(i_out_dir)}"
+
+        if self.compiler is None:
+            raise Exception("No LaTeX compiler specified")
+
+        parts   = self.get_draft_parts(i_document  = i_document,
+                                       i_selection = i_selection)
+        req_ids = {i for ids in parts.values() for i in ids}
+
+        self._i(f"Generating the snippets of {len(req_ids)} requirements into '{self.snip_root_dir}'")
+        with metrics.span("generate_document", draft = True):
+            bundle = Generator._render_all(i_generators       = [self],
+                                           i_document         = i_document,
+                                           i_linked_documents = i_linked_documents,
+                                           i_req_ids          = req_ids)[0]
+            with metrics.span("write"):
+                bundle.write_dir(self.snip_root_dir)
+
+        self.compiler.run_draft(i_document     = i_document,
+                                i_doc_root_dir = self.latex_root_dir,
+                                i_output_dir   = i_out_dir,
+                                i_include_only = list(parts))
+        return list(parts)
+
     @staticmethod
     def sanitize(i_str: str):
         """
@@ -2,11 +2,13 @@
 import  shutil
 import  subprocess
 import  envutils
+import  utils.metrics   as metrics
 
 from    compiler        import Compiler
 from    document        import Document
 
 from    pathlib         import Path
+from    typing          import Iterable
 from    typing          import Optional
 from    typing          import Union
 
@@ -18,6 +20,9 @@ class MiktexCompiler (Compiler):
     DEFAULT_PDFLATEX_BIN   = "pdflatex"
     DEFAULT_GLOSSARIES_BIN = "makeglossaries-lite"
 
+    MAIN_DOC_NAME          = "main"  # Root .tex document of the LaTeX project
+    DRAFT_SUFFIX           = "-draft" # Draft driver document and PDF (see run_draft)
+
     def __init__(self,
                  i_miktex_bin_dir : Optional[Union[str,
                                                    Path]] = None,
@@ -64,7 +69,7 @@ class MiktexCompiler (Compiler):
         self._w(f"Running document compilation for [{i_document.common.project!r}:{'TODO'}]")
 
         # TODO better system
-        LATEX_MAIN_DOC_NAME = "main"
+        LATEX_MAIN_DOC_NAME = self.MAIN_DOC_NAME
         output_filename     = f"{LATEX_MAIN_DOC_NAME}.pdf"
         output_file         = i_output_dir.joinpath(output_filename)
 
@@ -82,36 +87,100 @@ class MiktexCompiler (Compiler):
             self._e(f"Could not delete '{output_file}'")
             pass
 
-        self._i(f"[1/3] Running '{self.pdflatex_bin}'")
-        self._invoke_pdflatex(i_latex_folder = i_doc_root_dir,
-                              i_temp_folder  = output_tmp_dir,
-                              i_docname      = LATEX_MAIN_DOC_NAME)
+        with metrics.span("compile", compiler = type(self).__name__) as total:
+            self._i(f"[1/3] Running '{self.pdflatex_bin}'")
+            with metrics.span("pdflatex", pass_number = 1) as s:
+                self._invoke_pdflatex(i_latex_folder = i_doc_root_dir,
+                                      i_temp_folder  = output_tmp_dir,
+                                      i_docname      = LATEX_MAIN_DOC_NAME)
+            self._i(f"[1/3] '{self.pdflatex_bin}' done in {s.duration:.2f} s")
+
+            self._i(f"[1/1] Running '{self.glossaries_bin}'")
+            with metrics.span("makeglossaries", pass_number = 1) as s:
+                self._invoke_makeglossaries(i_temp_folder  = output_tmp_dir,
+                                            i_docname      = LATEX_MAIN_DOC_NAME)
+            self._i(f"[1/1] '{self.glossaries_bin}' done in {s.duration:.2f} s")
+
+            self._i(f"[2/3] Running '{self.pdflatex_bin}'")
+            with metrics.span("pdflatex", pass_number = 2) as s:
+                self._invoke_pdflatex(i_latex_folder = i_doc_root_dir,
+                                      i_temp_folder  = output_tmp_dir,
+                                      i_docname      = LATEX_MAIN_DOC_NAME)
+            self._i(f"[2/3] '{self.pdflatex_bin}' done in {s.duration:.2f} s")
+
+            self._i(f"[3/3] Running '{self.pdflatex_bin}'")
+            with metrics.span("pdflatex", pass_number = 3) as s:
+                self._invoke_pdflatex(i_latex_folder = i_doc_root_dir,
+                                      i_temp_folder  = output_tmp_dir,
+                                      i_docname      = LATEX_MAIN_DOC_NAME)
+            self._i(f"[3/3] '{self.pdflatex_bin}' done in {s.duration:.2f} s")
+
+            self._i(f"Copying '{output_tmp_file}' to '{output_file}'")
+            shutil.copy(output_tmp_file, output_file)
+
+        self._i(f"Compilation done in {total.duration:.2f} s")
+
+
+    def run_draft(self,
+                  i_doc_root_dir  : Union[str, Path],
+                  i_output_dir    : Union[str, Path],
+                  i_document      : Optional[Document],
+                  i_include_only  : Iterable[str]) -> None:
+        """
+            Single pdflatex pass over the selected parts: the main document is compiled through a driver document
+            setting \\includeonly, under the job name of the full compilation, so that the auxiliary files of the
+            excluded parts (labels, page numbers, table of contents) and the glossaries of the last full compilation
+            are reused as they are. The draft is copied to 'main-draft.pdf', next to the full 'main.pdf'.
+        """
+        assert isinstance(i_document,     (Document, type(None))), f"type(i_document) is {type(i_document)}"
+        assert isinstance(i_doc_root_dir, (str, Path)),            f"type(i_doc_root_dir) is {type(i_doc_root_dir)}"
+        assert isinstance(i_output_dir,   (str, Path)),            f"type(i_output_dir) is {type(i_output_dir)}"
 
-        self._i(f"[1/1] Running '{self.glossaries_bin}'")
-        self._invoke_makeglossaries(i_temp_folder  = output_tmp_dir,
-                                    i_docname      = LATEX_MAIN_DOC_NAME)
+        parts          = list(i_include_only)
+        output_tmp_dir = Path(i_output_dir).joinpath('tmp')
+        output_tmp_aux = output_tmp_dir.joinpath(f"{self.MAIN_DOC_NAME}.aux")
+        if not output_tmp_aux.exists():
+            raise Exception(f"No full compilation in '{i_output_dir}' (missing '{output_tmp_aux.name}'): a draft reuses its auxiliary files")
+        if not parts:
+            raise Exception("No part to compile")
 
-        self._i(f"[2/3] Running '{self.pdflatex_bin}'")
-        self._invoke_pdflatex(i_latex_folder = i_doc_root_dir,
-                              i_temp_folder  = output_tmp_dir,
-                              i_docname      = LATEX_MAIN_DOC_NAME)
+        # pdflatex writes the .aux file of each \include'd file next to the main one: their folders must exist
+        for part in parts:
+            output_tmp_dir.joinpath(part).parent.mkdir(parents = True, exist_ok = True)
 
-        self._i(f"[3/3] Running '{self.pdflatex_bin}'")
-        self._invoke_pdflatex(i_latex_folder = i_doc_root_dir,
-                              i_temp_folder  = output_tmp_dir,
-                              i_docname      = LATEX_MAIN_DOC_NAME)
+        driver = output_tmp_dir.joinpath(f"{self.MAIN_DOC_NAME}{self.DRAFT_SUFFIX}.tex")
+        driver.write_text(f"\\includeonly{{{','.join(parts)}}}\n\\input{{{self.MAIN_DOC_NAME}}}\n", encoding = 'utf8')
 
-        self._i(f"Copying '{output_tmp_file}' to '{output_file}'")
-        shutil.copy(output_tmp_file, output_file)
+        self._w(f"Running draft compilation of {len(parts)} parts for [{i_document.common.project!r}:{'TODO'}]")
+        with metrics.span("compile", compiler = type(self).__name__, draft = True) as total:
+            self._i(f"[1/1] Running '{self.pdflatex_bin}' ({', '.join(parts)})")
+            with metrics.span("pdflatex", pass_number = 1) as s:
+                self._invoke_pdflatex(i_latex_folder = Path(i_doc_root_dir),
+                                      i_temp_folder  = output_tmp_dir,
+                                      i_docname      = self.MAIN_DOC_NAME,
+                                      i_input_file   = driver.resolve())
+            self._i(f"[1/1] '{self.pdflatex_bin}' done in {s.duration:.2f} s")
+
+            output_file = Path(i_output_dir).joinpath(f"{self.MAIN_DOC_NAME}{self.DRAFT_SUFFIX}.pdf")
+            self._i(f"Copying '{self.MAIN_DOC_NAME}.pdf' to '{output_file}'")
+            shutil.copy(output_tmp_dir.joinpath(f"{self.MAIN_DOC_NAME}.pdf"), output_file)
+
+        self._i(f"Draft compilation done in {total.duration:.2f} s")
 
 
     def _invoke_pdflatex(self,
                          i_latex_folder : Path,
                          i_temp_folder  : Path,
-                         i_docname      : str):
-        assert isinstance(i_latex_folder, Path), f"type(i_latex_folder) is {type(i_latex_folder)}"
-        assert isinstance(i_temp_folder,  Path), f"type(i_temp_folder) is {type(i_temp_folder)}"
-        assert isinstance(i_docname,      str),  f"type(i_docname) is {type(i_docname)}"
+                         i_docname      : str,
+                         i_input_file   : Optional[Path] = None):
+        """
+        :param i_input_file: Document to compile under job name i_docname, instead of i_docname.tex (optional, i.e. a
+                             draft driver, see run_draft)
+        """
+        assert isinstance(i_latex_folder, Path),                f"type(i_latex_folder) is {type(i_latex_folder)}"
+        assert isinstance(i_temp_folder,  Path),                f"type(i_temp_folder) is {type(i_temp_folder)}"
+        assert isinstance(i_docname,      str),                 f"type(i_docname) is {type(i_docname)}"
+        assert isinstance(i_input_file,   (Path, type(None))),  f"type(i_input_file) is {type(i_input_file)}"
 
         # TODO improve
         pdflatex_args = [
@@ -120,9 +189,13 @@ class MiktexCompiler (Compiler):
                             '-halt-on-error',
                             '-interaction=nonstopmode',
                             f'-output-directory={i_temp_folder!s}',
-                            f'{i_docname}.tex',
                         ]
+        if i_input_file is not None:
+            pdflatex_args += [f'-jobname={i_docname}', str(i_input_file)]
+        else:
+            pdflatex_args += [f'{i_docname}.tex']
 
+        metrics.count("pdflatex_passes")
         self._d(f"Invoking '{self.pdflatex_bin}' in {i_latex_folder}")
         self._d(f"Args: {pdflatex_args!r}")
 
@@ -161,6 +234,7 @@ class MiktexCompiler (Compiler):
                             '-t', 'makeglossaries-lite.log',
                           ]
 
+        metrics.count("makeglossaries_passes")
         self._d(f"Invoking {self.glossaries_bin} in {i_temp_folder}")
         self._d(f"Args: {glossaries_args!r}")
 
@@ -0,0 +1,138 @@
+#! python3
+import  re
+import  textwrap
+from    typing                  import Any
+from    typing                  import Callable
+from    typing                  import Optional
+
+from    glossary                import Glossary
+
+
+class LatexText:
+    """
+        Structured form of the LaTeX text of a requirement, shared by all its consumers (generators, validators,
+        indexes), so that the text is scanned once per requirement instead of once per consumer.
+
+        Every part is computed on first access, then kept:
+            - body         : text without the XML indentation (stripped, dedented)
+            - paragraphs   : paragraphs of the body (separated by blank lines)
+            - tokens       : LaTeX-aware tokenization (commands, environments, math, braces, text...), see TOKEN_RE
+            - references   : UIDs of the referenced glossary entries (\\gls{...}, \\acrshort{...}, etc.)
+            - commands     : names of the commands used
+            - environments : names of the environments used (itemize, enumerate, equation...)
+            - has_math     : the text contains math (inline, display, or math environment)
+
+        Consumers can keep their own results derived from the text with cached() (i.e. search index terms).
+
+        Obtained from Requirement.parsed_text, which is invalidated when the text of the requirement is modified.
+    """
+    # Token kind, text, environment name (for 'begin' / 'end' / 'mathenv' tokens)
+    Token = tuple[str, str, Optional[str]]
+
+    # Alternatives tried in order at each position. '\%' is consumed by 'escaped', so any other '%' starts a comment
+    # (i.e. after a '\\' line break)
+    TOKEN_RE = re.compile(r"""
+          (?P<mathenv>\\begin\s*\{(?P<menv>(?:equation|align|gather|multline|eqnarray|displaymath)\*?)\}.*?\\end\s*\{(?P=menv)\})
+        | (?P<dmath>\$\$.*?\$\$|\\\[.*?\\\])
+        | (?P<imath>\$(?:\\.|[^$\\])+\$|\\\(.*?\\\))
+        | (?P<begin>\\begin\s*\{(?P<benv>[^{}]*)\})
+        | (?P<end>\\end\s*\{(?P<eenv>[^{}]*)\})
+        | (?P<newline>\\\\\*?(?:\[[^\]]*\])?)
+        | (?P<escaped>\\[%&_$\#{}\ ,;!])
+        | (?P<cmd>\\[A-Za-z@]+\*?)
+        | (?P<open>\{)
+        | (?P<close>\})
+        | (?P<lbrack>\[)
+        | (?P<rbrack>\])
+        | (?P<par>\n[ \t]*\n\s*)
+        | (?P<tilde>~)
+        | (?P<dash>---?)
+        | (?P<comment>%[^\n]*\n?)
+        | (?P<text>[^\\{}\[\]$~\n%-]+|[\n$\\-])
+    """, re.VERBOSE | re.DOTALL)
+
+    MATH_TOKENS = frozenset(("mathenv", "dmath", "imath"))
+
+    _PARAGRAPH_RE = re.compile(r"\n[ \t]*\n\s*")
+
+    def __init__(self,
+                 i_source : Optional[str]):
+        """
+        :param i_source: LaTeX text, as stored in the document (Requirement.text)
+        """
+        assert isinstance(i_source, (str, type(None))), f"type(i_source) is {type(i_source)}"
+
+        self.source        = i_source or ""
+        self._body         = None
+        self._tokens       = None
+        self._references   = None
+        self._derived      = {}
+
+    @property
+    def body(self) -> str:
+        """
+        :return: Text without the XML indentation: stripped, the lines after the first one dedented, and without
+                 trailing spaces
+        """
+        if self._body is None:
+            lines = self.source.strip().splitlines()
+            if len(lines) > 1:
+                lines = lines[:1] + textwrap.dedent("\n".join(lines[1:])).splitlines()
+            self._body = "\n".join(line.rstrip() for line in lines)
+        return self._body
+
+    @property
+    def paragraphs(self) -> list[str]:
+        return [p for p in self._PARAGRAPH_RE.split(self.body) if p]
+
+    @property
+    def tokens(self) -> list[Token]:
+        """
+        :return: Tokens of the stripped text, in order (their texts put together give the stripped text back)
+        """
+        if self._tokens is None:
+            self._tokens = [(m.lastgroup, m.group(0), m.group("benv") or m.group("eenv") or m.group("menv"))
+                            for m in self.TOKEN_RE.finditer(self.source.strip())]
+        return self._tokens
+
+    @property
+    def references(self) -> list[str]:
+        """
+        :return: UIDs of the referenced glossary entries, in order of appearance (see Glossary.find_references)
+        """
+        if self._references is None:
+            self._references = list(Glossary.find_references(self.source))
+        return self._references
+
+    @property
+    def commands(self) -> set[str]:
+        return {text[1:].rstrip("*") for kind, text, _ in self.tokens if kind == "cmd"}
+
+    @property
+    def environments(self) -> set[str]:
+        return {env for kind, _, env in self.tokens if kind in ("begin", "mathenv")}
+
+    @property
+    def has_math(self) -> bool:
+        return any(kind in self.MATH_TOKENS for kind, _, _ in self.tokens)
+
+    def cached(self,
+               i_key     : str,
+               i_compute : Callable[[str], Any]) -> Any:
+        """
+        :param i_key    : Name of the derived result (unique per consumer, i.e. "search_terms")
+        :param i_compute: Function computing the result from the source text
+        :return         : Result of i_compute for the text, computed on first call
+        """
+        if i_key not in self._derived:
+            self._derived[i_key] = i_compute(self.source)
+        return self._derived[i_key]
+
+    def __bool__(self):
+        return bool(self.source.strip())
+
+    def __str__(self):
+        return self.body
+
+    def __repr__(self):
+        return f"<LaTeX text: {len(self.source)} characters, {len(self.references)} glossary references>"
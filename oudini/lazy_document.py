@@ -0,0 +1,219 @@
+#! python3
+import  os
+import  utils.metrics           as metrics
+import  xml.etree.ElementTree   as ETree
+from    collections.abc         import MutableMapping
+from    pathlib                 import Path
+from    typing                  import BinaryIO
+from    typing                  import Callable
+from    typing                  import Iterable
+from    typing                  import Iterator
+from    typing                  import Optional
+from    typing                  import Union
+
+from    document                import Document
+from    requirement             import Requirement
+from    requirement_offsets     import RequirementOffsetIndex
+from    requirements_set        import RequirementsSet
+from    common_section          import CommonSection
+
+
+class LazyRequirementMap (MutableMapping):
+    """
+        Requirement ID -> Requirement mapping (document order), whose requirements are parsed on first access.
+        Iterating over the keys does not parse anything; iterating over the values parses every requirement.
+    """
+
+    def __init__(self,
+                 i_loader : Callable[[int], Requirement],
+                 i_ids    : Iterable[int]):
+        """
+        :param i_loader: Function parsing the requirement of a given ID
+        :param i_ids   : IDs of the requirements, in document order
+        """
+        self._loader = i_loader
+        self._items  = dict.fromkeys(i_ids) # ID -> Requirement, None if not parsed yet
+
+    def __getitem__(self, i_id : int) -> Requirement:
+        req = self._items[i_id]
+        if req is None:
+            req = self._items[i_id] = self._loader(i_id)
+        return req
+
+    def __setitem__(self, i_id : int, i_req : Requirement):
+        self._items[i_id] = i_req
+
+    def __delitem__(self, i_id : int):
+        del self._items[i_id]
+
+    def __contains__(self, i_id) -> bool:
+        return i_id in self._items
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._items)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def loaded(self) -> list[Requirement]:
+        """
+        :return: Requirements parsed so far (or added), in document order
+        """
+        return [r for r in self._items.values() if r is not None]
+
+
+class LazyRequirementsSet (RequirementsSet):
+    """
+        Requirements set built from an offset index: the section tree and the ID indexes are known without parsing any
+        requirement, and each requirement is parsed when it is first accessed (see LazyRequirementMap).
+
+        The secondary indexes (validation strategy, link sources, links) need every requirement: they are only built,
+        by parsing the whole set, on the first query that uses them.
+    """
+
+    def __init__(self,
+                 i_common    : CommonSection,
+                 i_index     : RequirementOffsetIndex,
+                 i_loader    : Callable[[int], Requirement],
+                 i_req_class : Optional[Requirement] = Requirement):
+        assert isinstance(i_index, RequirementOffsetIndex), f"type(i_index) is {type(i_index)}"
+        RequirementsSet.__init__(self,
+                                 i_common    = i_common,
+                                 i_req_class = i_req_class)
+
+        self.reqs        = LazyRequirementMap(i_loader = i_loader,
+                                              i_ids    = i_index.offsets)
+        self._sorted_ids = sorted(i_index.offsets)
+        self._indexed    = False
+
+        # Section tree, from the layout of the requirements section
+        stack = [self.sections]
+        for item in i_index.layout:
+            if   item is None:
+                stack.pop()
+            elif isinstance(item, str):
+                stack.append(stack[-1].add_section(item))
+            else:
+                stack[-1].items.append(item)
+                self._section_of[item] = stack[-1]
+
+    def _ensure_indexed(self) -> None:
+        if not self._indexed:
+            self._d(f"Parsing the {len(self.reqs) - len(self.reqs.loaded())} remaining requirements for the secondary indexes")
+            self._indexed = True
+            self.reindex()
+
+    def query(self, *args, **kwargs) -> list[Requirement]:
+        self._ensure_indexed()
+        return RequirementsSet.query(self, *args, **kwargs)
+
+    def link_sources(self) -> list[str]:
+        self._ensure_indexed()
+        return RequirementsSet.link_sources(self)
+
+    def modified(self) -> list[Requirement]:
+        # Requirements that were never parsed can not have been modified
+        return self._check_ids([r for r in self.reqs.loaded() if r.dirty])
+
+
+class LazyDocument (Document):
+    """
+        Document whose requirements are only read and parsed from the file when they are accessed.
+
+        The file is indexed once (see RequirementOffsetIndex.for_file: the index is persisted next to the file, and
+        scanned again when the content hash changes). Opening the document then only parses the common section, the
+        links section and the glossary; accessing a requirement reads and parses its own bytes. Tools looking up a few
+        requirements of a large document pay for what they touch.
+
+        Everything else behaves as a Document (full iteration, queries, generation and saving parse what they need).
+        The file must not change while the document is in use.
+    """
+
+    @classmethod
+    def open(cls,
+             i_filename      : Union[str, Path],
+             i_persist_index : bool = True) -> 'LazyDocument':
+        """
+        :param i_filename     : Oudini XML file
+        :param i_persist_index: If True (default), the offset index is persisted next to the file
+        :return               : Lazy document
+        """
+        assert isinstance(i_filename, (str, Path)), f"type(i_filename) is {type(i_filename)}"
+
+        filename = Path(i_filename)
+        stat     = os.stat(filename)
+        index    = RequirementOffsetIndex.for_file(filename, i_persist = i_persist_index)
+        if index.includes:
+            raise Exception(f"'{filename}' includes other files: use Document.from_file")
+
+        obj = cls()
+        obj._i(f"Opening '{filename}' ({len(index)} requirements)")
+
+        obj.filename     = filename
+        obj._source_stat = (stat.st_size, stat.st_mtime_ns)
+        obj._req_offsets = index
+        obj.root_name    = index.root
+
+        with open(filename, mode = 'rb') as file:
+            for tag, start, end in index.top_level:
+                if   tag == obj._common_section_class.TAG_STR:
+                    obj.common   = obj._common_section_class.from_xml_element(obj._read_element(file, start, end))
+                elif tag == obj._links_section_class.TAG_STR:
+                    obj.links    = obj._links_section_class.from_xml_element(obj._read_element(file, start, end))
+                elif tag == obj._glossary_class.TAG_STR:
+                    obj.glossary = obj._glossary_class.from_xml_element(obj._read_element(file, start, end))
+
+        assert obj.common is not None, f"Missing mandatory section <{obj._common_section_class.TAG_STR}>"
+        if index.reqs_end is None:
+            raise Exception(f"Missing mandatory section <{RequirementsSet.TAG_STR}>")
+
+        obj.reqs = LazyRequirementsSet(i_common = obj.common,
+                                       i_index  = index,
+                                       i_loader = obj._load_requirement)
+        return obj
+
+    def _read_element(self,
+                      i_file  : BinaryIO,
+                      i_start : int,
+                      i_end   : int) -> ETree.Element:
+        """
+            Internal method.
+            Parse the element at byte range [i_start; i_end) of the file (tags and attributes normalized).
+        """
+        i_file.seek(i_start)
+        data = i_file.read(i_end - i_start)
+        metrics.count("bytes_read", len(data))
+
+        if self._req_offsets.encoding is not None:
+            data = f'<?xml version="1.0" encoding="{self._req_offsets.encoding}"?>'.encode('ascii') + data
+        elt = ETree.fromstring(data)
+        Document._normalize_tags(elt)
+        Document._normalize_attr(elt)
+        return elt
+
+    def _load_requirement(self,
+                          i_req_id : int) -> Requirement:
+        """
+            Internal method.
+            Read and parse requirement i_req_id from the file.
+        """
+        stat = os.stat(self.filename)
+        if self._source_stat != (stat.st_size, stat.st_mtime_ns):
+            raise Exception(f"'{self.filename}' changed since it was opened")
+
+        start, end = self._req_offsets.get(i_req_id)
+        with open(self.filename, mode = 'rb') as file:
+            req = self.reqs._req_class.from_xml_element(i_elt    = self._read_element(file, start, end),
+                                                        i_common = self.common)
+        if req.id != i_req_id:
+            raise Exception(f"Offset index of '{self.filename}' is out of date (found {req.id} instead of {i_req_id})")
+
+        metrics.count("requirements_parsed")
+        return req
+
+    @property
+    def num_loaded(self) -> int:
+        """
+        :return: Number of requirements parsed so far
+        """
+        return len(self.reqs.reqs.loaded())
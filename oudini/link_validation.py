@@ -0,0 +1,261 @@
+#! python3
+from    utils.logobj            import LogObj
+import  utils.metrics           as metrics
+from    pathlib                 import Path
+from    typing                  import Iterable
+from    typing                  import Optional
+from    typing                  import Union
+
+from    document                import Document
+from    requirement             import Requirement
+
+
+class LinkTable:
+    """
+        Links of a document, reduced to what the validation needs: the formatted IDs of its requirements, the
+        documents declared in its <links> section, and its (requirement, source, target) links. Also used by the
+        impact analysis (see impact_analysis.py), with the IDs of the requirements validated by test.
+
+        Plain data, so that it can be built in a worker process (see from_file) and sent back cheaply.
+    """
+
+    def __init__(self,
+                 i_name     : str,
+                 i_ids      : frozenset,
+                 i_declared : Optional[frozenset],
+                 i_links    : list[tuple[str, str, str]],
+                 i_tested   : frozenset = frozenset()):
+        """
+        :param i_name    : Name of the document, as used by the links (i.e. "SP-PIDS")
+        :param i_ids     : Formatted IDs of its requirements (i.e. "SP-PIDS-REQ-20000")
+        :param i_declared: Names of the documents declared in its <links> section (None if it has none)
+        :param i_links   : (formatted requirement ID, linked document, linked requirement formatted ID), by requirement
+        :param i_tested  : Formatted IDs of the requirements validated by test
+        """
+        self.name     = i_name
+        self.ids      = i_ids
+        self.declared = i_declared
+        self.links    = i_links
+        self.tested   = i_tested
+
+    @classmethod
+    def from_document(cls,
+                      i_document : Document) -> 'LinkTable':
+        assert isinstance(i_document, Document), f"type(i_document) is {type(i_document)}"
+
+        ids    = []
+        links  = []
+        tested = []
+        for req in i_document.reqs.reqs.values():
+            name = req.format_id()
+            ids.append(name)
+            links.extend((name, lnk.source, lnk.id) for lnk in req.links)
+            if req.validation_strategy is Requirement.ValidationStrategy.Test:
+                tested.append(name)
+
+        return cls(i_name     = str(i_document.common.title),
+                   i_ids      = frozenset(ids),
+                   i_declared = frozenset(i_document.links.documents) if i_document.links is not None else None,
+                   i_links    = links,
+                   i_tested   = frozenset(tested))
+
+    @classmethod
+    def from_file(cls,
+                  i_filename : Union[str, Path]) -> 'LinkTable':
+        return cls.from_document(Document.from_file(i_filename))
+
+    @classmethod
+    def from_files(cls,
+                   i_filenames : list[Union[str, Path]],
+                   i_workers   : Optional[int] = None) -> list['LinkTable']:
+        """
+        :param i_filenames: Documents (XML)
+        :param i_workers  : Number of worker processes (None: one per CPU, 1: parse in this process)
+        :return           : Link tables of the documents of i_filenames, parsed in parallel
+        """
+        assert isinstance(i_filenames, list),              f"type(i_filenames) is {type(i_filenames)}"
+        assert isinstance(i_workers,   (int, type(None))), f"type(i_workers) is {type(i_workers)}"
+
+        with metrics.span("load_links", documents = len(i_filenames)):
+            if i_workers == 1 or len(i_filenames) < 2:
+                return [cls.from_file(f) for f in i_filenames]
+
+            from concurrent.futures import ProcessPoolExecutor
+
+            with ProcessPoolExecutor(max_workers = i_workers) as pool:
+                return list(pool.map(cls.from_file, i_filenames))
+
+    def __repr__(self):
+        return f"<links of '{self.name}': {len(self.ids)} requirements, {len(self.links)} links>"
+
+
+class LinkIssue:
+    """
+        Problem found by the link validation.
+    """
+    DANGLING   = "dangling"   # Link to a requirement the linked document does not define
+    DUPLICATE  = "duplicate"  # Same link given twice by a requirement
+    UNDECLARED = "undeclared" # Link to a document not declared in the <links> section
+    UNRESOLVED = "unresolved" # Link to a document that is not loaded (links not checked; one issue per document)
+    UNCOVERED  = "uncovered"  # Requirement of a linked document satisfied by no loaded requirement
+
+    ERRORS   = (DANGLING, DUPLICATE, UNDECLARED)
+    WARNINGS = (UNRESOLVED, UNCOVERED)
+
+    def __init__(self,
+                 i_kind     : str,
+                 i_document : str,
+                 i_req      : Optional[str] = None,
+                 i_source   : Optional[str] = None,
+                 i_target   : Optional[str] = None):
+        self.kind     = i_kind
+        self.document = i_document # Document of the requirement (of the linked document for UNCOVERED)
+        self.req      = i_req      # Formatted requirement ID
+        self.source   = i_source   # Linked document
+        self.target   = i_target   # Linked requirement
+
+    @property
+    def is_error(self) -> bool:
+        return self.kind in self.ERRORS
+
+    def to_dict(self) -> dict:
+        return {k: v for k, v in vars(self).items() if v is not None}
+
+    def __repr__(self):
+        if self.kind == self.UNCOVERED:
+            return f"{self.document}: uncovered requirement {self.req}"
+        if self.kind == self.UNRESOLVED:
+            return f"{self.document}: unresolved links to '{self.source}' (document not loaded)"
+        return f"{self.document}: {self.kind} link {self.req} -> {self.source}:{self.target}"
+
+
+class LinkReport:
+    """
+        Result of a link validation (see LinkValidator.validate).
+    """
+
+    def __init__(self):
+        self.issues        = [] # LinkIssue, by document
+        self.num_documents = 0
+        self.num_links     = 0
+
+    def of_kind(self,
+                i_kind : str) -> list[LinkIssue]:
+        return [i for i in self.issues if i.kind == i_kind]
+
+    @property
+    def errors(self) -> list[LinkIssue]:
+        return [i for i in self.issues if i.is_error]
+
+    @property
+    def warnings(self) -> list[LinkIssue]:
+        return [i for i in self.issues if not i.is_error]
+
+    def __bool__(self):
+        return bool(self.issues)
+
+    def __repr__(self):
+        counts = ", ".join(f"{len(self.of_kind(k))} {k}" for k in LinkIssue.ERRORS + LinkIssue.WARNINGS)
+        return f"<{self.num_links} links in {self.num_documents} documents: {counts}>"
+
+
+class LinkValidator (LogObj):
+    """
+        Validation of the <satisfies> links across a set of documents:
+            - Dangling links (the linked requirement does not exist), duplicate links, links to undeclared documents
+            - Requirements of the loaded linked documents that no loaded requirement satisfies (uncovered)
+
+        Each document is reduced to a LinkTable (hash sets of IDs), then its links are checked in a single pass: the
+        validation is linear in the number of links. Parsing dominates by far; from_files parses the documents in
+        parallel, in worker processes.
+    """
+
+    def __init__(self):
+        LogObj.__init__(self)
+
+        self.tables = {} # Document name -> LinkTable
+
+    def add(self,
+            i_table : LinkTable) -> None:
+        assert isinstance(i_table, LinkTable), f"type(i_table) is {type(i_table)}"
+
+        if i_table.name in self.tables:
+            raise Exception(f"Document '{i_table.name}' loaded twice")
+        self.tables[i_table.name] = i_table
+
+    def add_document(self,
+                     i_document : Document) -> None:
+        self.add(LinkTable.from_document(i_document))
+
+    @classmethod
+    def from_documents(cls,
+                       i_documents : Iterable[Document]) -> 'LinkValidator':
+        obj = cls()
+        for doc in i_documents:
+            obj.add_document(doc)
+        return obj
+
+    @classmethod
+    def from_files(cls,
+                   i_filenames : list[Union[str, Path]],
+                   i_workers   : Optional[int] = None) -> 'LinkValidator':
+        """
+        :param i_filenames: Documents (XML)
+        :param i_workers  : Number of worker processes (None: one per CPU, 1: parse in this process)
+        :return           : Validator of the links of the documents of i_filenames
+        """
+        assert isinstance(i_filenames, list),              f"type(i_filenames) is {type(i_filenames)}"
+        assert isinstance(i_workers,   (int, type(None))), f"type(i_workers) is {type(i_workers)}"
+
+        obj = cls()
+        for table in LinkTable.from_files(i_filenames, i_workers):
+            obj.add(table)
+        return obj
+
+    def validate(self) -> LinkReport:
+        """
+        :return: Issues of the links of all the documents
+        """
+        report  = LinkReport()
+        covered = {} # Linked document -> set of the linked requirements
+
+        with metrics.span("validate_links"):
+            for name, table in self.tables.items():
+                declared   = table.declared or ()
+                seen       = set()
+                unresolved = {}
+                issues     = report.issues
+
+                for link in table.links:
+                    req, source, target = link
+                    if link in seen:
+                        issues.append(LinkIssue(LinkIssue.DUPLICATE, name, req, source, target))
+                        continue
+                    seen.add(link)
+
+                    if source not in declared:
+                        issues.append(LinkIssue(LinkIssue.UNDECLARED, name, req, source, target))
+
+                    if (upstream := self.tables.get(source)) is None:
+                        unresolved[source] = unresolved.get(source, 0) + 1
+                    elif target not in upstream.ids:
+                        issues.append(LinkIssue(LinkIssue.DANGLING, name, req, source, target))
+                    else:
+                        covered.setdefault(source, set()).add(target)
+
+                for source in unresolved:
+                    issues.append(LinkIssue(LinkIssue.UNRESOLVED, name, i_source = source))
+
+                report.num_links += len(table.links)
+                self._d(f"Checked {len(table.links)} links of '{name}'")
+
+            # Coverage of the documents linked by at least one loaded document
+            linked = {src for t in self.tables.values() for src in (t.declared or ())} | covered.keys()
+            for name in sorted(linked & self.tables.keys()):
+                for req in sorted(self.tables[name].ids - covered.get(name, set())):
+                    report.issues.append(LinkIssue(LinkIssue.UNCOVERED, name, req))
+
+        report.num_documents = len(self.tables)
+        metrics.count("links_validated", report.num_links)
+        self._i(f"Validated {report!r}")
+        return report
@@ -0,0 +1,101 @@
+#! python3
+from    utils.logobj            import LogObj
+import  xml.etree.ElementTree   as ETree
+from    typing                  import Iterator
+from    typing                  import Optional
+
+
+class LinksSection (LogObj):
+    """
+        Class for manipulation of the links section of an Oudini document: the documents its requirements may link
+        to (<satisfies source="...">), by internal name, with the location of their source.
+
+            <links>
+                <document internal = "SP-PIDS" source = "path/to/PIDS" />
+            </links>
+    """
+    TAG_STR = "links"
+
+    class Declaration:
+        TAG_STR           = "document"
+        ATTR_INTERNAL_STR = "internal"
+        ATTR_SOURCE_STR   = "source"
+
+        def __init__(self,
+                     i_internal : str,
+                     i_source   : Optional[str] = None):
+            assert isinstance(i_internal, str),               f"type(i_internal) is {type(i_internal)}"
+            assert isinstance(i_source,   (str, type(None))), f"type(i_source) is {type(i_source)}"
+
+            self.internal = i_internal # Name of the document, as used by the links (i.e. "SP-PIDS")
+            self.source   = i_source   # Location of the document (i.e. "path/to/PIDS")
+
+        @classmethod
+        def from_xml_element(cls,
+                             i_elt : ETree.Element):
+            assert isinstance(i_elt, ETree.Element), f"type(i_elt) is {type(i_elt)}"
+            assert i_elt.tag == cls.TAG_STR,         f"i_elt.tag is {i_elt.tag}"
+
+            if not (internal := i_elt.get(cls.ATTR_INTERNAL_STR)):
+                raise Exception(f"Missing mandatory field <{cls.ATTR_INTERNAL_STR}> in <{cls.TAG_STR}>")
+
+            return cls(i_internal = internal,
+                       i_source   = i_elt.get(cls.ATTR_SOURCE_STR))
+
+        def to_xml(self) -> ETree.Element:
+            elt = ETree.Element(self.TAG_STR)
+            elt.attrib[self.ATTR_INTERNAL_STR] = self.internal
+            if self.source is not None:
+                elt.attrib[self.ATTR_SOURCE_STR] = self.source
+            return elt
+
+        def __repr__(self):
+            return f"'{self.internal}' ('{self.source}')"
+
+    def __init__(self):
+        LogObj.__init__(self)
+
+        self.documents = {} # Internal name -> Declaration, in declaration order
+
+    def add(self,
+            i_declaration : Declaration) -> None:
+        assert isinstance(i_declaration, LinksSection.Declaration), f"type(i_declaration) is {type(i_declaration)}"
+
+        if i_declaration.internal in self.documents:
+            raise Exception(f"Linked document '{i_declaration.internal}' declared twice in <{self.TAG_STR}>")
+        self.documents[i_declaration.internal] = i_declaration
+
+    def to_xml(self) -> ETree.Element:
+        root = ETree.Element(self.TAG_STR)
+        for d in self.documents.values():
+            root.append(d.to_xml())
+        return root
+
+    @classmethod
+    def from_xml_element(cls,
+                         i_elt : ETree.Element):
+        assert isinstance(i_elt, ETree.Element), f"type(i_elt) is {type(i_elt)}"
+        assert i_elt.tag == cls.TAG_STR,         f"i_elt.tag is {i_elt.tag}"
+
+        obj = cls()
+
+        for e in i_elt:
+            if      e.tag == cls.Declaration.TAG_STR:
+                obj.add(cls.Declaration.from_xml_element(e))
+                obj._d(f"Linked document (<{cls.Declaration.TAG_STR}>) : {obj.documents[e.get(cls.Declaration.ATTR_INTERNAL_STR)]!r}")
+            else:
+                obj._w(f"Ignoring unknown section <{e.tag}>")
+
+        return obj
+
+    def __contains__(self, i_internal : str) -> bool:
+        return i_internal in self.documents
+
+    def __iter__(self) -> Iterator[Declaration]:
+        return iter(self.documents.values())
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    def __repr__(self):
+        return f"<links to {', '.join(self.documents) or 'no document'}>"
@@ -8,6 +8,7 @@ from    enum                    import Enum
 from    typing                  import Optional, Union
 from    pathlib                 import Path
 from    common_section          import CommonSection
+from    latex_text              import LatexText
 
 
 class Requirement (LogObj):
@@ -19,6 +20,10 @@ class Requirement (LogObj):
 
     VALIDATION_TAG_STR = "validation"
 
+    # Modifying one of these attributes marks the requirement as modified (see 'dirty').
+    # Note: the ID of a requirement of a set is changed through RequirementsSet.rename
+    _TRACKED_ATTRS = frozenset(("id", "desc", "text", "validation_strategy", "links"))
+
     class LinkRef:
         TAG_STR         = "satisfies"
         ATTR_SOURCE_STR = "source"
@@ -72,6 +77,35 @@ class Requirement (LogObj):
         self.common              = i_common # By reference
         self.links               = []
 
+        # Set when the requirement was modified since it was loaded or saved.
+        # Note: in-place modifications of 'links' are not detected - call mark_dirty()
+        self.dirty               = True
+
+        # Structured form of the text (see parsed_text), dropped whenever the text is modified
+        self._parsed_text        = None
+
+    def __setattr__(self, i_name, i_value):
+        super().__setattr__(i_name, i_value)
+        if i_name in self._TRACKED_ATTRS:
+            super().__setattr__("dirty", True)
+            if i_name == "text":
+                super().__setattr__("_parsed_text", None)
+
+    @property
+    def parsed_text(self) -> LatexText:
+        """
+        :return: Structured form of the text (see LatexText), parsed on first access and kept until the text changes
+        """
+        if self._parsed_text is None:
+            self._parsed_text = LatexText(self.text)
+        return self._parsed_text
+
+    def mark_dirty(self) -> None:
+        """
+            Mark the requirement as modified (i.e. after an in-place modification of its links).
+        """
+        self.dirty = True
+
     def __bool__(self):
         return self.id is not None
 
@@ -130,6 +164,8 @@ class Requirement (LogObj):
             else:
                 obj._w(f"<{e.tag}> tag ignored")
                 pass # Ignored tag
+
+        obj.dirty = False
         return obj
 
     def get_snippet_filename(self,
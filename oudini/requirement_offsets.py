@@ -0,0 +1,322 @@
+#! python3
+from    utils.logobj            import LogObj
+import  utils.metrics           as metrics
+import  hashlib
+import  itertools
+import  json
+import  os
+import  xml.parsers.expat
+from    bisect                  import bisect_left
+from    pathlib                 import Path
+from    typing                  import Optional
+from    typing                  import Union
+from    requirement             import Requirement
+from    requirements_set        import RequirementsSet
+from    section                 import Section
+
+
+class RequirementOffsetIndex (LogObj):
+    """
+        Index of the position of each requirement (<req> element) in the raw bytes of an Oudini XML file, or of a
+        file included by one (<sec> root element, see RequirementsSet).
+
+        Each requirement ID is mapped to the byte range [start; end) of its element, from the '<' of the opening tag
+        to the '>' of the closing tag (both included). The position of the closing tags of the requirements section and
+        of each <sec> is also recorded, to know where to insert new requirements.
+
+        The structure of the requirements section (layout) and the byte ranges of the other sections of the document
+        are recorded too, so that a document can be loaded without parsing its requirements (see LazyDocument).
+        The index of a file can be persisted next to it (see for_file).
+    """
+    FORMAT_VERSION = 2
+    FILE_SUFFIX    = ".idx"
+
+    def __init__(self):
+        LogObj.__init__(self)
+
+        self.offsets      = {}   # Requirement ID -> [start, end], in document order
+        self.reqs_end     = None # Offset of the closing tag of the requirements section (of the root section for an
+                                 # included file)
+        self.section_ends = {}   # Section path (tuple of names, relative to the root section for an included file) ->
+                                 # offset of the closing tag of the section
+        self.root         = None # Tag of the root element
+        self.encoding     = None # Encoding of the XML declaration (None: UTF-8)
+        self.top_level    = []   # [tag, start, end] of the children of the root element, except the requirements
+        self.layout       = []   # Requirements section content, in document order: requirement IDs, section names
+                                 # (opening tag) and None (closing tag)
+        self.includes     = []   # Files included by the requirements section (<include href="...">)
+        self.digest       = None # SHA-256 of the indexed data (see for_file)
+
+    @classmethod
+    def scan(cls,
+             i_data : bytes) -> 'RequirementOffsetIndex':
+        """
+            Build the index by scanning raw XML data i_data (single pass, no tree is built).
+        :param i_data: Content of an Oudini XML file
+        :return      : Offset index
+        """
+        assert isinstance(i_data, (bytes, bytearray, memoryview)), f"type(i_data) is {type(i_data)}"
+
+        obj    = cls()
+        parser = xml.parsers.expat.ParserCreate()
+        starts = {}
+        depth  = [0]
+        path   = []
+
+        req_tag   = Requirement.TAG_STR
+        reqs_tag  = RequirementsSet.TAG_STR
+        id_attr   = Requirement.ATTR_ID_STR
+        sec_tag   = Section.TAG_STR
+        name_attr = Section.ATTR_NAME_STR
+        include_tag = RequirementsSet.INCLUDE_TAG_STR
+        href_attr   = RequirementsSet.ATTR_HREF_STR
+
+        def element_end(i_index : int) -> int:
+            # For empty elements (<req ... />), the index is already past the end of the element
+            return i_data.index(b'>', i_index) + 1 if i_data[i_index:i_index + 2] == b'</' else i_index
+
+        def xml_decl(i_version, i_encoding, i_standalone):
+            if i_encoding is not None and i_encoding.lower().replace("-", "") != "utf8":
+                obj.encoding = i_encoding
+
+        def start_element(i_name, i_attrs):
+            depth[0] += 1
+            name = i_name.lower()
+            if   depth[0] == 1:
+                obj.root = name
+            elif depth[0] == 2 and name != reqs_tag and obj.root != sec_tag:
+                starts[depth[0]] = (name, parser.CurrentByteIndex)
+            elif name == req_tag:
+                attrs = {k.lower(): v for k, v in i_attrs.items()}
+                if (id_str := attrs.get(id_attr)) is None:
+                    raise Exception(f"Missing mandatory field <{id_attr}> in <{req_tag}>")
+                starts[depth[0]] = (int(id_str), parser.CurrentByteIndex)
+            elif name == sec_tag:
+                path.append({k.lower(): v for k, v in i_attrs.items()}.get(name_attr))
+                if path[-1]: # Unnamed (or empty name) sections are transparent (see RequirementsSet._walk_xml_add_reqs)
+                    obj.layout.append(path[-1])
+            elif name == include_tag:
+                obj.includes.append({k.lower(): v for k, v in i_attrs.items()}.get(href_attr))
+
+        def end_element(i_name):
+            name = i_name.lower()
+            if   depth[0] == 1:
+                if name == sec_tag:
+                    obj.reqs_end = parser.CurrentByteIndex # Included file: its root section holds the requirements
+            elif depth[0] == 2 and name != reqs_tag and obj.root != sec_tag:
+                tag, start = starts.pop(depth[0])
+                obj.top_level.append([tag, start, element_end(parser.CurrentByteIndex)])
+            elif name == req_tag:
+                req_id, start = starts.pop(depth[0])
+                if req_id in obj.offsets:
+                    raise Exception(f"Duplicate requirement {req_id}")
+                obj.offsets[req_id] = [start, element_end(parser.CurrentByteIndex)]
+                obj.layout.append(req_id)
+            elif name == sec_tag:
+                if path[-1]:
+                    obj.section_ends[tuple(p for p in path if p)] = parser.CurrentByteIndex
+                    obj.layout.append(None)
+                path.pop()
+            elif name == reqs_tag:
+                obj.reqs_end = parser.CurrentByteIndex
+            depth[0] -= 1
+
+        parser.XmlDeclHandler      = xml_decl
+        parser.StartElementHandler = start_element
+        parser.EndElementHandler   = end_element
+        parser.Parse(bytes(i_data), True)
+
+        obj._d(f"Scanned {len(obj.offsets)} requirements")
+        return obj
+
+    def rebase(self,
+               i_patches : list[tuple[int, int, int]]) -> None:
+        """
+            Update the offsets after the file was patched.
+        :param i_patches: (start, end, new length) of each replaced range [start; end), sorted by start
+        """
+        if not i_patches:
+            return
+
+        starts = [p[0] for p in i_patches]
+        deltas = list(itertools.accumulate(p[2] - (p[1] - p[0]) for p in i_patches))
+
+        def moved(i_offset : int) -> int:
+            n = bisect_left(starts, i_offset)
+            return i_offset + (deltas[n - 1] if n else 0)
+
+        for r in self.offsets.values():
+            r[0] = moved(r[0])
+            r[1] = moved(r[1])
+        if self.reqs_end is not None:
+            self.reqs_end = moved(self.reqs_end)
+        for k, v in self.section_ends.items():
+            self.section_ends[k] = moved(v)
+        for t in self.top_level:
+            t[1] = moved(t[1])
+            t[2] = moved(t[2])
+
+    def section_paths(self) -> dict[int, tuple]:
+        """
+        :return: Requirement ID -> path of its section (see section_ends), from the layout
+        """
+        paths = {}
+        path  = []
+        for item in self.layout:
+            if   item is None:
+                path.pop()
+            elif isinstance(item, str):
+                path.append(item)
+            else:
+                paths[item] = tuple(path)
+        return paths
+
+    def update_layout(self,
+                      i_removed_ids : list[int],
+                      i_added       : list[tuple[tuple, int]]) -> None:
+        """
+            Update the layout after the file was patched.
+        :param i_removed_ids: Requirements removed from the file
+        :param i_added      : (section path, requirement ID) of the requirements appended to their section, in order
+        """
+        removed     = set(i_removed_ids)
+        self.layout = [item for item in self.layout if item is None or isinstance(item, str) or item not in removed]
+
+        added = {}
+        for path, req_id in i_added:
+            added.setdefault(path, []).append(req_id)
+
+        layout = []
+        path   = []
+        for item in self.layout:
+            if item is None:
+                layout += added.pop(tuple(path), [])
+                path.pop()
+            elif isinstance(item, str):
+                path.append(item)
+            layout.append(item)
+        self.layout = layout + added.pop((), [])
+
+    def to_dict(self) -> dict:
+        """
+        :return: JSON-serializable content of the index (see from_dict)
+        """
+        return {"version"      : self.FORMAT_VERSION,
+                "sha256"       : self.digest,
+                "root"         : self.root,
+                "encoding"     : self.encoding,
+                "top_level"    : self.top_level,
+                "offsets"      : [v for req_id, r in self.offsets.items() for v in (req_id, r[0], r[1])],
+                "reqs_end"     : self.reqs_end,
+                "section_ends" : [list(path) + [end] for path, end in self.section_ends.items()],
+                "layout"       : self.layout,
+                "includes"     : self.includes}
+
+    @classmethod
+    def from_dict(cls,
+                  i_dict : dict) -> 'RequirementOffsetIndex':
+        assert isinstance(i_dict, dict), f"type(i_dict) is {type(i_dict)}"
+        if i_dict.get("version") != cls.FORMAT_VERSION:
+            raise Exception(f"Unsupported offset index version {i_dict.get('version')!r}")
+
+        obj = cls()
+        flat = i_dict["offsets"]
+        obj.offsets      = {flat[n]: [flat[n + 1], flat[n + 2]] for n in range(0, len(flat), 3)}
+        obj.reqs_end     = i_dict["reqs_end"]
+        obj.section_ends = {tuple(s[:-1]): s[-1] for s in i_dict["section_ends"]}
+        obj.root         = i_dict["root"]
+        obj.encoding     = i_dict["encoding"]
+        obj.top_level    = i_dict["top_level"]
+        obj.layout       = i_dict["layout"]
+        obj.includes     = i_dict["includes"]
+        obj.digest       = i_dict["sha256"]
+        return obj
+
+    @classmethod
+    def index_filename(cls,
+                       i_filename : Union[str, Path]) -> Path:
+        """
+        :return: File the index of XML file i_filename is persisted into (i.e. 'SP-SRD-COMP1.xml.idx')
+        """
+        return Path(i_filename).with_name(Path(i_filename).name + cls.FILE_SUFFIX)
+
+    @classmethod
+    def for_file(cls,
+                 i_filename : Union[str, Path],
+                 i_persist  : bool = True) -> 'RequirementOffsetIndex':
+        """
+            Index of file i_filename, loaded from its index file (see index_filename) when still valid, and scanned
+            otherwise.
+
+            The index file is valid if the size and modification time of i_filename did not change (no data read), or
+            if they changed but the content hash did not (i.e. file touched by a checkout). Otherwise the file is
+            scanned again.
+
+        :param i_filename: Oudini XML file
+        :param i_persist : If True (default), (re)write the index file when the index is scanned or revalidated
+        :return          : Offset index
+        """
+        assert isinstance(i_filename, (str, Path)), f"type(i_filename) is {type(i_filename)}"
+        assert isinstance(i_persist,  bool),        f"type(i_persist) is {type(i_persist)}"
+
+        filename   = Path(i_filename)
+        index_file = cls.index_filename(filename)
+        stat       = os.stat(filename)
+
+        saved = None
+        try:
+            with open(index_file, mode = 'r') as file:
+                saved = json.load(file)
+            if saved.get("version") != cls.FORMAT_VERSION:
+                saved = None
+        except (OSError, ValueError):
+            pass
+
+        if saved is not None and (saved.get("size"), saved.get("mtime_ns")) == (stat.st_size, stat.st_mtime_ns):
+            metrics.count("offset_index_hits")
+            return cls.from_dict(saved)
+
+        with metrics.span("scan_offsets", file = filename.name):
+            with open(filename, mode = 'rb') as file:
+                data = file.read()
+            digest = hashlib.sha256(data).hexdigest()
+
+            if saved is not None and saved.get("sha256") == digest:
+                obj = cls.from_dict(saved)
+            else:
+                obj = cls.scan(data)
+                obj.digest = digest
+
+        if i_persist:
+            obj.save(index_file, stat)
+        return obj
+
+    def save(self,
+             i_index_file : Path,
+             i_stat       : os.stat_result) -> None:
+        """
+            Persist the index into i_index_file, for the indexed file in state i_stat (see for_file).
+            Failures (i.e. read-only folder) are only logged.
+        """
+        data = self.to_dict()
+        data["size"]     = i_stat.st_size
+        data["mtime_ns"] = i_stat.st_mtime_ns
+
+        tmp_file = i_index_file.with_name(i_index_file.name + ".tmp")
+        try:
+            with open(tmp_file, mode = 'w') as file:
+                json.dump(data, file, separators = (',', ':'))
+            os.replace(tmp_file, i_index_file)
+        except OSError as e:
+            self._w(f"Could not write offset index '{i_index_file}': {e}")
+
+    def get(self,
+            i_req_id : int) -> Optional[list[int]]:
+        return self.offsets.get(i_req_id)
+
+    def __contains__(self,
+                     i_req_id : int):
+        return i_req_id in self.offsets
+
+    def __len__(self):
+        return len(self.offsets)
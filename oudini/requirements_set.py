@@ -1,17 +1,51 @@
 #! python3
 from    utils.logobj            import LogObj
+from    utils.xml_stream_writer import XmlStreamWriter
 import  xml.etree.ElementTree   as ETree
+from    bisect                  import bisect_left
+from    bisect                  import bisect_right
+from    bisect                  import insort
 from    collections             import OrderedDict
+from    pathlib                 import Path
+from    typing                  import Callable
+from    typing                  import Iterable
 from    typing                  import Optional
 from    typing                  import Union
 from    requirement             import Requirement
+from    section                 import Section
 from    common_section          import CommonSection
 
 
 class RequirementsSet (LogObj):
+    """
+        Set of requirements of an Oudini document, indexed by requirement ID.
+
+        On top of the main 'reqs' dictionary, secondary indexes are maintained to answer queries without scanning
+        every requirement:
+            - By validation strategy
+            - By link source document
+            - By ID range (sorted ID list)
+            - By presence / absence of links
+            - By section (see 'sections', section_of and in_section)
+
+        Requirements must be added and removed through add() / remove() for the indexes to stay consistent.
+        If a requirement is modified in place (validation strategy, links...), call update() afterwards.
+
+        Removed requirements are tracked in 'removed_ids' (and modified ones through Requirement.dirty), so that a
+        document can be saved incrementally.
+
+        A section can be stored in a file of its own, included where the section stands (path relative to the
+        including file):
+            <include href = "sections/input-commands.xml" />
+        The included file has the <sec> element as root, and may include files too. Its section keeps the path of the
+        file (Section.include), so that the document can be saved back into the same files (see write_parts).
+    """
     TAG_STR = "requirements"
 
-    SECTION_TAG_STR = "sec"
+    SECTION_TAG_STR = Section.TAG_STR
+
+    INCLUDE_TAG_STR = "include"
+    ATTR_HREF_STR   = "href"
 
     def __init__(self,
                  i_common    : Optional[CommonSection] = None,
@@ -23,51 +57,482 @@ class RequirementsSet (LogObj):
         self.reqs       = OrderedDict()
         self.common     = i_common # By reference
 
+        # Secondary indexes (values are sets of requirement IDs)
+        self._sorted_ids      = []
+        self._by_validation   = {}
+        self._by_link_source  = {}
+        self._linked_ids      = set()
+
+        # IDs of the requirements removed since the set was loaded or saved
+        self.removed_ids      = set()
+
+        # Section tree (the root section stands for the <requirements> element)
+        self.sections         = Section()
+        self._section_of      = {} # Requirement ID -> Section
+
+        # Included files (see merge_part): path -> (size, mtime) when loaded
+        self.parts            = {}
+
     def to_xml(self) -> ETree.Element:
-        root = ETree.Element(self.TAG_STR)
-        for _, r in self.reqs.items():
-            root.append(r.to_xml())
+        root  = ETree.Element(self.TAG_STR)
+        stack = [(iter(self.sections.items), root)]
+        while stack:
+            item = next(stack[-1][0], None)
+            if item is None:
+                stack.pop()
+            elif isinstance(item, Section):
+                elt = item.to_xml_element()
+                stack[-1][1].append(elt)
+                stack.append((iter(item.items), elt))
+            else:
+                stack[-1][1].append(self.reqs[item].to_xml())
         return root
 
+    def write_xml(self,
+                  i_writer   : XmlStreamWriter,
+                  i_includes : bool = False) -> None:
+        """
+            Stream the XML of the requirements into i_writer (same output as to_xml).
+        :param i_includes: If True, the included sections are written as <include> elements (see write_parts)
+        """
+        i_writer.start(self.TAG_STR)
+        self._write_items(i_writer, self.sections, i_includes)
+
+    def _write_items(self,
+                     i_writer   : XmlStreamWriter,
+                     i_section  : Section,
+                     i_includes : bool) -> None:
+        """
+            Internal method.
+            Stream the content of section i_section, then close the current element.
+        """
+        stack = [iter(i_section.items)]
+        while stack:
+            item = next(stack[-1], None)
+            if item is None:
+                stack.pop()
+                i_writer.end()
+            elif isinstance(item, Section):
+                if i_includes and item.include is not None:
+                    i_writer.start(self.INCLUDE_TAG_STR, {self.ATTR_HREF_STR: item.include})
+                    i_writer.end()
+                    continue
+                elt = item.to_xml_element()
+                i_writer.start(elt.tag, elt.attrib)
+                stack.append(iter(item.items))
+            else:
+                i_writer.element(self.reqs[item].to_xml())
+
+    def part_files(self,
+                   i_folder : Union[str, Path]) -> list[tuple[Path, Section]]:
+        """
+        :param i_folder: Folder of the main file
+        :return        : Included sections, with the files they are stored into (relative to i_folder), in document order
+        """
+        parts = []
+        stack = [(self.sections, Path(i_folder))]
+        while stack:
+            section, folder = stack.pop()
+            for sub in reversed(section.children):
+                if sub.include is None:
+                    stack.append((sub, folder))
+                    continue
+
+                filename = folder.joinpath(sub.include)
+                parts.append((filename, sub))
+                stack.append((sub, filename.parent))
+        return parts
+
+    def write_parts(self,
+                    i_folder : Union[str, Path]) -> list[Path]:
+        """
+            Write the included sections into their own files, relative to folder i_folder (folder of the main file).
+        :return: Written files
+        """
+        written = []
+        for filename, section in self.part_files(i_folder):
+            filename.parent.mkdir(parents = True, exist_ok = True)
+            with XmlStreamWriter.open(filename) as writer:
+                elt = section.to_xml_element()
+                writer.start(elt.tag, elt.attrib)
+                self._write_items(writer, section, i_includes = True)
+            written.append(filename)
+        return written
+
     @classmethod
     def from_xml_element(cls,
-                         i_elt    : ETree.Element,
-                         i_common : CommonSection):
+                         i_elt         : ETree.Element,
+                         i_common      : CommonSection,
+                         i_part_loader : Optional[Callable[[str], 'RequirementsSet']] = None):
+        """
+        :param i_elt        : <requirements> element
+        :param i_common     : Common section of the document
+        :param i_part_loader: Function returning the requirements set of an included file (see merge_part), given
+                              the href of the <include> element. Required if the element includes files.
+        """
         assert isinstance(i_elt,    ETree.Element), f"type(i_elt) is {type(i_elt)}"
         assert isinstance(i_common, CommonSection), f"type(i_common) is {type(i_common)}"
         assert i_elt.tag == cls.TAG_STR, f"i_elt.tag is <{i_elt.tag}>"
 
         obj = cls(i_common = i_common)
 
-        # Recursively walk through sections to flatten out the requirements
-        # (depth should be reasonable)
-        obj._walk_xml_add_reqs(i_section = i_elt)
+        # Walk through the sections to build the section tree and collect the requirements
+        obj._walk_xml_add_reqs(i_section     = i_elt,
+                               i_part_loader = i_part_loader)
         obj._d(f"Created from XML ({len(obj.reqs)} reqs)")
 
         return obj
 
     def _walk_xml_add_reqs(self,
-                           i_section : ETree.Element):
+                           i_section     : ETree.Element,
+                           i_part_loader : Optional[Callable[[str], 'RequirementsSet']] = None):
         assert isinstance(i_section, ETree.Element), f"type(i_section) is {type(i_section)}"
 
-        # TODO save sections
-        for e in i_section:
-            if   e.tag == self._req_class.TAG_STR:
+        # Iterative depth-first walk (document order), whatever the nesting depth
+        stack = [(iter(i_section), self.sections)]
+        while stack:
+            e = next(stack[-1][0], None)
+            if e is None:
+                stack.pop()
+            elif e.tag == self._req_class.TAG_STR:
                 r = self._req_class.from_xml_element(i_elt      = e,
                                                      i_common   = self.common)
-                assert r.id not in self.reqs, f"Duplicate requirement {r.id}"
-                self.reqs[r.id] = r
-            elif e.tag == RequirementsSet.SECTION_TAG_STR:
-                self._walk_xml_add_reqs(i_section = e)
+                self.add(i_req     = r,
+                         i_section = stack[-1][1])
+            elif e.tag == Section.TAG_STR:
+                # Unnamed sections are transparent: their content belongs to the enclosing section
+                name = e.get(Section.ATTR_NAME_STR)
+                stack.append((iter(e), stack[-1][1].add_section(name) if name else stack[-1][1]))
+            elif e.tag == self.INCLUDE_TAG_STR:
+                if not (href := e.get(self.ATTR_HREF_STR)):
+                    raise Exception(f"Missing mandatory field <{self.ATTR_HREF_STR}> in <{self.INCLUDE_TAG_STR}>")
+                if i_part_loader is None:
+                    raise Exception(f"Can not include '{href}': no file to include from")
+                self.merge_part(i_part     = i_part_loader(href),
+                                i_section  = stack[-1][1],
+                                i_href     = href)
+
+    def merge_part(self,
+                   i_part    : 'RequirementsSet',
+                   i_section : Section,
+                   i_href    : str) -> None:
+        """
+            Move the content of the requirements set of an included file into this set: its (single) top-level
+            section is appended to section i_section, its requirements are added to the set.
+        :param i_part   : Requirements set of the included file (emptied)
+        :param i_section: Section of this set the file is included in
+        :param i_href   : Path of the included file, relative to the including file
+        """
+        assert isinstance(i_part,    RequirementsSet), f"type(i_part) is {type(i_part)}"
+        assert isinstance(i_section, Section),         f"type(i_section) is {type(i_section)}"
+
+        if len(i_part.sections.items) != 1 or not isinstance(i_part.sections.items[0], Section):
+            raise Exception(f"Included file '{i_href}' must contain a single <{Section.TAG_STR}> element")
+
+        for req_id in i_part.reqs:
+            if req_id in self.reqs:
+                raise Exception(f"Duplicate requirement {req_id} (in included file '{i_href}')")
+
+        section = i_part.sections.items[0]
+        section.parent  = i_section
+        section.include = i_href
+        i_section.items.append(section)
+
+        for req_id, req in i_part.reqs.items():
+            req.common = self.common
+            self.reqs[req_id] = req
+            self._section_of[req_id] = i_part._section_of[req_id]
+            self.removed_ids.discard(req_id)
+            self._index(req)
+        self._sorted_ids.extend(i_part._sorted_ids)
+        self._sorted_ids.sort()
+        self.parts.update(i_part.parts)
+
+        i_part.reqs = OrderedDict()
+        i_part.sections = Section()
+
+    def add(self,
+            i_req     : Requirement,
+            i_section : Optional[Section] = None) -> None:
+        """
+            Add requirement i_req to the set and to the secondary indexes.
+        :param i_req    : Requirement to add (its ID must not already be in the set)
+        :param i_section: Section to add the requirement into (at the end). Defaults to the root section.
+        """
+        assert isinstance(i_req,     Requirement),             f"type(i_req) is {type(i_req)}"
+        assert isinstance(i_section, (Section, type(None))),   f"type(i_section) is {type(i_section)}"
+
+        if i_req.id in self.reqs:
+            raise Exception(f"Duplicate requirement {i_req.id}")
+
+        section = i_section if i_section is not None else self.sections
+        section.items.append(i_req.id)
+        self._section_of[i_req.id] = section
+
+        self.reqs[i_req.id] = i_req
+        self.removed_ids.discard(i_req.id)
+        insort(self._sorted_ids, i_req.id)
+        self._index(i_req)
+
+    def remove(self,
+               i_key : Union[int, Requirement]) -> Requirement:
+        """
+            Remove a requirement from the set and from the secondary indexes.
+        :param i_key: Requirement, or ID of the requirement to remove
+        :return     : Removed requirement
+        """
+        assert isinstance(i_key, (Requirement, int)), f"type(i_key) is {type(i_key)}"
+
+        req_id = i_key.id if isinstance(i_key, Requirement) else i_key
+        req    = self.reqs.pop(req_id)
+
+        self._section_of.pop(req_id).items.remove(req_id)
+
+        del self._sorted_ids[bisect_left(self._sorted_ids, req_id)]
+        self._unindex(req)
+        self.removed_ids.add(req_id)
+
+        return req
+
+    def update(self,
+               i_req : Requirement) -> None:
+        """
+            Refresh the secondary indexes after i_req was modified in place (the requirement is marked as modified).
+        :param i_req: Requirement of the set that was modified
+        """
+        assert i_req in self, f"{i_req!s} is not in set"
+
+        i_req.mark_dirty()
+        self._unindex(i_req)
+        self._index(i_req)
+
+    def rename(self,
+               i_req : Requirement,
+               i_id  : int) -> None:
+        """
+            Change the ID of requirement i_req of the set (it keeps its place in its section). The requirement is
+            marked as modified, and its former ID as removed.
+            Note: assigning Requirement.id directly leaves the set inconsistent (see modified).
+        :param i_req: Requirement of the set
+        :param i_id : New ID (must not already be in the set)
+        """
+        assert i_req in self,        f"{i_req!s} is not in set"
+        assert isinstance(i_id, int), f"type(i_id) is {type(i_id)}"
+
+        if i_id in self.reqs:
+            raise Exception(f"Duplicate requirement {i_id}")
+
+        old_id  = i_req.id
+        section = self._section_of.pop(old_id)
+        section.items[section.items.index(old_id)] = i_id
+        self._section_of[i_id] = section
+
+        self._unindex(i_req)
+        del self.reqs[old_id]
+        del self._sorted_ids[bisect_left(self._sorted_ids, old_id)]
+        self.removed_ids.add(old_id)
+
+        i_req.id = i_id
+        self.reqs[i_id] = i_req
+        insort(self._sorted_ids, i_id)
+        self.removed_ids.discard(i_id)
+        self._index(i_req)
+
+    def modified(self) -> list[Requirement]:
+        """
+        :return: Requirements modified (or added) since the set was loaded or saved, in document order
+        """
+        return self._check_ids([r for r in self.reqs.values() if r.dirty])
+
+    def _check_ids(self,
+                   i_reqs : list[Requirement]) -> list[Requirement]:
+        """
+            Internal method.
+            Check that the requirements i_reqs are still stored under their ID (see rename).
+        :return: i_reqs
+        """
+        for r in i_reqs:
+            if self.reqs.get(r.id) is not r:
+                raise Exception(f"ID of requirement {r!s} modified in place: use RequirementsSet.rename")
+        return i_reqs
+
+    def section_of(self,
+                   i_key : Union[int, Requirement]) -> Section:
+        """
+        :param i_key: Requirement, or ID of the requirement
+        :return     : Section the requirement is directly in
+        """
+        return self._section_of[i_key.id if isinstance(i_key, Requirement) else i_key]
+
+    def in_section(self,
+                   i_section   : Union[str, list[str], Section],
+                   i_recursive : bool = True) -> list[Requirement]:
+        """
+        :param i_section  : Section, or path / full name of the section (see Section.find)
+        :param i_recursive: If True (default), include the requirements of the sub-sections
+        :return           : Requirements of the section, in document order
+        """
+        if not isinstance(i_section, Section):
+            if (sec := self.sections.find(i_section)) is None:
+                raise KeyError(f"Unknown section {i_section!r}")
+            i_section = sec
+
+        return [self.reqs[i] for i in i_section.iter_req_ids(i_recursive = i_recursive)]
+
+    def reindex(self) -> None:
+        """
+            Rebuild all secondary indexes from scratch (i.e. after direct manipulation of 'reqs').
+        """
+        self._sorted_ids     = sorted(self.reqs.keys())
+        self._by_validation  = {}
+        self._by_link_source = {}
+        self._linked_ids     = set()
+
+        for r in self.reqs.values():
+            self._index(r)
+
+    def _index(self,
+               i_req : Requirement) -> None:
+        self._by_validation.setdefault(i_req.validation_strategy, set()).add(i_req.id)
+
+        for lnk in i_req.links:
+            self._by_link_source.setdefault(lnk.source, set()).add(i_req.id)
+
+        if i_req.links:
+            self._linked_ids.add(i_req.id)
+
+    def _unindex(self,
+                 i_req : Requirement) -> None:
+        # The indexed values may be outdated (in-place modification): look for the ID everywhere
+        for index in (self._by_validation, self._by_link_source):
+            for key in [k for k, ids in index.items() if i_req.id in ids]:
+                index[key].discard(i_req.id)
+                if not index[key]:
+                    del index[key]
+
+        self._linked_ids.discard(i_req.id)
+
+    def by_validation_strategy(self,
+                               i_strategy : Optional[Requirement.ValidationStrategy]) -> list[Requirement]:
+        """
+        :param i_strategy: Validation strategy to look for (None for requirements without a validation strategy)
+        :return          : Requirements with validation strategy i_strategy, sorted by ID
+        """
+        return self.query(i_validation = i_strategy)
+
+    def by_link_source(self,
+                       i_source : str) -> list[Requirement]:
+        """
+        :param i_source: Name of the linked document (i.e. "SP-PIDS")
+        :return        : Requirements with at least one link to document i_source, sorted by ID
+        """
+        return self.query(i_link_source = i_source)
+
+    def link_sources(self) -> list[str]:
+        """
+        :return: Names of the documents linked by at least one requirement, sorted
+        """
+        return sorted(self._by_link_source)
+
+    def by_id_range(self,
+                    i_min : Optional[int] = None,
+                    i_max : Optional[int] = None) -> list[Requirement]:
+        """
+        :param i_min: Lower bound of the ID range (included, optional)
+        :param i_max: Upper bound of the ID range (included, optional)
+        :return     : Requirements whose ID is in range [i_min; i_max], sorted by ID
+        """
+        return self.query(i_id_min = i_min,
+                          i_id_max = i_max)
+
+    def with_links(self) -> list[Requirement]:
+        """
+        :return: Requirements with at least one link, sorted by ID
+        """
+        return self.query(i_has_links = True)
+
+    def without_links(self) -> list[Requirement]:
+        """
+        :return: Requirements without any link, sorted by ID
+        """
+        return self.query(i_has_links = False)
+
+    _ANY = object()
+
+    def query(self,
+              i_validation  : Optional[Requirement.ValidationStrategy] = _ANY,
+              i_link_source : Optional[str]                            = None,
+              i_id_min      : Optional[int]                            = None,
+              i_id_max      : Optional[int]                            = None,
+              i_has_links   : Optional[bool]                           = None) -> list[Requirement]:
+        """
+            Query the requirements through the secondary indexes. All given criteria must match.
+
+        :param i_validation : Validation strategy (None matches requirements without a validation strategy)
+        :param i_link_source: Name of a linked document
+        :param i_id_min     : Lower bound of the ID range (included)
+        :param i_id_max     : Upper bound of the ID range (included)
+        :param i_has_links  : If True (resp. False), only requirements with (resp. without) links
+        :return             : Matching requirements, sorted by ID
+        """
+        assert isinstance(i_validation,  (Requirement.ValidationStrategy, type(None))) or i_validation is self._ANY, \
+                                                                     f"type(i_validation) is {type(i_validation)}"
+        assert isinstance(i_link_source, (str, type(None))),         f"type(i_link_source) is {type(i_link_source)}"
+        assert isinstance(i_id_min,      (int, type(None))),         f"type(i_id_min) is {type(i_id_min)}"
+        assert isinstance(i_id_max,      (int, type(None))),         f"type(i_id_max) is {type(i_id_max)}"
+        assert isinstance(i_has_links,   (bool, type(None))),        f"type(i_has_links) is {type(i_has_links)}"
+
+        # Candidate sets from the hash indexes, smallest first
+        candidates = []
+        if i_validation is not self._ANY:
+            candidates.append(self._by_validation.get(i_validation, set()))
+        if i_link_source is not None:
+            candidates.append(self._by_link_source.get(i_link_source, set()))
+        if i_has_links is True:
+            candidates.append(self._linked_ids)
+
+        candidates.sort(key = len)
+
+        # ID range from the sorted index
+        lo = 0                     if i_id_min is None else bisect_left(self._sorted_ids,  i_id_min)
+        hi = len(self._sorted_ids) if i_id_max is None else bisect_right(self._sorted_ids, i_id_max)
+
+        if candidates and len(candidates[0]) < hi - lo:
+            ids = sorted(i for i in candidates[0]
+                         if (i_id_min is None or i >= i_id_min) and (i_id_max is None or i <= i_id_max))
+        else:
+            ids = self._sorted_ids[lo:hi]
+
+        return [self.reqs[i] for i in self._filter_ids(i_ids        = ids,
+                                                       i_sets       = candidates,
+                                                       i_has_links  = i_has_links)]
+
+    def _filter_ids(self,
+                    i_ids       : Iterable[int],
+                    i_sets      : list[set],
+                    i_has_links : Optional[bool]) -> Iterable[int]:
+        for i in i_ids:
+            if i_has_links is False and i in self._linked_ids:
+                continue
+            if all(i in s for s in i_sets):
+                yield i
 
     def __contains__(self,
-                     i_key : Union[str, Requirement]):
-        assert isinstance(i_key, (Requirement, str)), f"type(i_key) is {type(i_key)}"
+                     i_key : Union[int, str, Requirement]):
+        assert isinstance(i_key, (Requirement, int, str)), f"type(i_key) is {type(i_key)}"
 
         if (isinstance(i_key, Requirement)):
-            return i_key in self.reqs.values()
+            return self.reqs.get(i_key.id) is i_key
+        if (isinstance(i_key, str)):
+            return i_key.isdigit() and int(i_key) in self.reqs
         return i_key in self.reqs
 
+    def __len__(self):
+        return len(self.reqs)
+
+    def __iter__(self):
+        return iter(self.reqs.values())
+
     def __str__(self):
         raise NotImplementedError()
 
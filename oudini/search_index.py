@@ -0,0 +1,404 @@
+#! python3
+from    utils.logobj            import LogObj
+import  gzip
+import  hashlib
+import  json
+import  math
+import  re
+from    bisect                  import bisect_left
+from    pathlib                 import Path
+from    typing                  import Iterable
+from    typing                  import Optional
+from    typing                  import Union
+from    requirement             import Requirement
+from    document                import Document
+from    glossary                import Glossary
+
+
+class SearchIndex (LogObj):
+    """
+        Full-text inverted index over the short description and the text of requirements.
+
+        Requirement texts are tokenized in a LaTeX-aware way:
+            - Markup commands (\\textbf, \\item, \\begin{itemize}...) are ignored, but their text arguments are indexed
+            - Glossary references (\\gls{sw-comp1}, \\acrshort{srd}...) are kept as a single token ('sw-comp1', 'srd')
+            - Comments are ignored
+
+        Supported query syntax (all clauses must match):
+            - word              : plain term
+            - "some words"      : phrase (consecutive terms, in the same field)
+            - wor*              : prefix
+            - \\gls{sw-comp1}    : glossary reference (same as sw-comp1)
+
+        Documents are indexed incrementally: add_document only re-tokenizes the requirements whose description or text
+        changed since they were indexed (see digest). The index is kept up to date by the Workspace as documents are
+        parsed, and can be saved next to the XML file of the document it was built from (see for_document_file).
+    """
+    FILE_FORMAT_VERSION = 2
+    FILE_SUFFIX         = ".idx.json.gz"
+
+    # Fields are stored by position in the postings
+    FIELD_DESC   = 0
+    FIELD_TEXT   = 1
+    FIELD_WEIGHT = (2.0, 1.0)
+
+    _TOKEN_RE = re.compile(r"""
+          (?<!\\)%[^\n]*                                                    # Comment
+        | \\(?:begin|end)\s*\{[^}]*\}                                       # Environment delimiters
+        | \\(?P<gls>[A-Za-z]+)\*?\s*(?:\[[^\]]*\]\s*)?\{(?P<key>[^{}]*)\}   # Glossary reference candidate
+        | \\[A-Za-z@]+\*?                                                   # Other commands
+        | \\.                                                               # Escaped character
+        | (?P<word>\w+(?:-\w+)*)                                            # Word
+    """, re.VERBOSE)
+
+    _QUERY_RE = re.compile(r'"(?P<phrase>[^"]*)"|(?P<term>\S+)')
+
+    class Hit:
+        """
+            Search result: requirement reference and relevance score.
+        """
+        def __init__(self,
+                     i_document : str,
+                     i_req_id   : int,
+                     i_score    : float):
+            self.document = i_document
+            self.req_id   = i_req_id
+            self.score    = i_score
+
+        def __str__(self):
+            return f"{self.document}:{self.req_id}"
+
+        def __repr__(self):
+            return f"{self.document}:{self.req_id} ({self.score:.3f})"
+
+    def __init__(self):
+        LogObj.__init__(self)
+
+        # term -> { (document, req ID) -> [ [desc positions], [text positions] ] }
+        self._postings     = {}
+        # (document, req ID) -> set of terms (used for removal)
+        self._forward      = {}
+        # (document, req ID) -> digest of the indexed description and text (see digest)
+        self._digests      = {}
+        # document -> fingerprint of the source the entries were built from
+        self.fingerprints  = {}
+        self._sorted_terms = None
+
+    @classmethod
+    def tokenize(cls,
+                 i_text : Optional[str]) -> list[str]:
+        """
+            Split LaTeX text i_text into lowercase index terms.
+        :param i_text: Text to tokenize
+        :return      : List of terms, in order of appearance
+        """
+        if not i_text:
+            return []
+
+        tokens = []
+        for m in cls._TOKEN_RE.finditer(i_text):
+            if   (word := m.group("word")) is not None:
+                tokens.append(word.lower())
+            elif (cmd := m.group("gls")) is not None:
+                if cmd in Glossary.REFERENCE_COMMANDS:
+                    tokens.append(m.group("key").strip().lower())
+                else:
+                    # Not a glossary reference: index the argument as plain text
+                    tokens.extend(cls.tokenize(m.group("key")))
+        return tokens
+
+    def __len__(self):
+        return len(self._forward)
+
+    @staticmethod
+    def digest(i_req : Requirement) -> str:
+        """
+        :return: Digest of the indexed fields of requirement i_req, used to skip the unchanged requirements
+        """
+        return hashlib.blake2b(f"{i_req.desc}\0{i_req.text}".encode('utf8'), digest_size = 12).hexdigest()
+
+    def add_document(self,
+                     i_document    : Document,
+                     i_fingerprint : Optional[str] = None) -> int:
+        """
+            Index (or re-index) all requirements of i_document, incrementally: entries previously indexed for the
+            same document are kept for the unchanged requirements, replaced for the modified ones, and removed for the
+            requirements which are not in the document anymore.
+
+        :param i_document   : Document to index
+        :param i_fingerprint: Fingerprint of the document source (see fingerprint()), stored for invalidation
+        :return             : Number of (re-)indexed requirements
+        """
+        assert isinstance(i_document,    Document),          f"type(i_document) is {type(i_document)}"
+        assert isinstance(i_fingerprint, (str, type(None))), f"type(i_fingerprint) is {type(i_fingerprint)}"
+
+        doc_name = self.document_name(i_document)
+        reqs     = i_document.reqs.reqs
+
+        for key in [k for k in self._forward if k[0] == doc_name and k[1] not in reqs]:
+            self.remove_requirement(i_document = key[0],
+                                    i_req_id   = key[1])
+
+        indexed = 0
+        for req in reqs.values():
+            if self._digests.get((doc_name, req.id)) != self.digest(req):
+                self.add_requirement(i_document = doc_name,
+                                     i_req      = req)
+                indexed += 1
+
+        self.fingerprints[doc_name] = i_fingerprint
+        self._d(f"Indexed {indexed} of the {len(reqs)} requirements of '{doc_name}'")
+        return indexed
+
+    def remove_document(self,
+                        i_document : str) -> None:
+        """
+            Remove all entries of document i_document from the index.
+        """
+        assert isinstance(i_document, str), f"type(i_document) is {type(i_document)}"
+
+        for key in [k for k in self._forward if k[0] == i_document]:
+            self.remove_requirement(i_document = key[0],
+                                    i_req_id   = key[1])
+        self.fingerprints.pop(i_document, None)
+
+    def add_requirement(self,
+                        i_document : str,
+                        i_req      : Requirement) -> None:
+        """
+            Index (or re-index) requirement i_req of document i_document.
+        """
+        assert isinstance(i_document, str),         f"type(i_document) is {type(i_document)}"
+        assert isinstance(i_req,      Requirement), f"type(i_req) is {type(i_req)}"
+
+        key = (i_document, i_req.id)
+        self.remove_requirement(i_document = i_document,
+                                i_req_id   = i_req.id)
+
+        terms = set()
+        for field, field_terms in ((self.FIELD_DESC, self.tokenize(i_req.desc)),
+                                   (self.FIELD_TEXT, i_req.parsed_text.cached("search_terms", self.tokenize))):
+            for pos, term in enumerate(field_terms):
+                entry = self._postings.setdefault(term, {}).setdefault(key, [[], []])
+                entry[field].append(pos)
+                terms.add(term)
+
+        self._forward[key] = terms
+        self._digests[key] = self.digest(i_req)
+        self._sorted_terms = None
+
+    def remove_requirement(self,
+                           i_document : str,
+                           i_req_id   : int) -> None:
+        """
+            Remove requirement i_req_id of document i_document from the index (if present).
+        """
+        key = (i_document, i_req_id)
+        self._digests.pop(key, None)
+        for term in self._forward.pop(key, ()):
+            postings = self._postings[term]
+            del postings[key]
+            if not postings:
+                del self._postings[term]
+                self._sorted_terms = None
+
+    def search(self,
+               i_query : str,
+               i_limit : Optional[int] = None) -> list[Hit]:
+        """
+            Search the index.
+
+        :param i_query: Query string (see class documentation for the syntax)
+        :param i_limit: Maximum number of results (optional)
+        :return       : Hits, by decreasing relevance
+        """
+        assert isinstance(i_query, str),               f"type(i_query) is {type(i_query)}"
+        assert isinstance(i_limit, (int, type(None))), f"type(i_limit) is {type(i_limit)}"
+
+        clauses = []
+        for m in self._QUERY_RE.finditer(i_query):
+            if (phrase := m.group("phrase")) is not None:
+                terms = self.tokenize(phrase)
+                if terms:
+                    clauses.append(self._match_phrase(terms))
+            else:
+                term = m.group("term")
+                if term.endswith('*') and len(term) > 1:
+                    clauses.append(self._match_prefix(term[:-1].lower()))
+                else:
+                    terms = self.tokenize(term)
+                    if len(terms) == 1:
+                        clauses.append(self._match_term(terms[0]))
+                    elif terms:
+                        clauses.append(self._match_phrase(terms))
+
+        if not clauses:
+            return []
+
+        # Intersect clauses, smallest first
+        clauses.sort(key = len)
+        scores = dict(clauses[0])
+        for c in clauses[1:]:
+            scores = {k: s + c[k] for k, s in scores.items() if k in c}
+            if not scores:
+                break
+
+        hits = sorted(scores.items(), key = lambda kv: (-kv[1], kv[0]))
+        if i_limit is not None:
+            hits = hits[:i_limit]
+
+        return [self.Hit(i_document = k[0],
+                         i_req_id   = k[1],
+                         i_score    = s) for k, s in hits]
+
+    def _idf(self,
+             i_term : str) -> float:
+        return math.log(1.0 + len(self._forward) / (1 + len(self._postings.get(i_term, ()))))
+
+    @classmethod
+    def _field_score(cls,
+                     i_freqs : Iterable[int],
+                     i_idf   : float) -> float:
+        return sum(w * (1.0 + math.log(f)) * i_idf for w, f in zip(cls.FIELD_WEIGHT, i_freqs) if f)
+
+    def _match_term(self,
+                    i_term : str) -> dict:
+        idf = self._idf(i_term)
+        return {k: self._field_score((len(p) for p in fields), idf)
+                for k, fields in self._postings.get(i_term, {}).items()}
+
+    def _match_prefix(self,
+                      i_prefix : str) -> dict:
+        if self._sorted_terms is None:
+            self._sorted_terms = sorted(self._postings)
+
+        scores = {}
+        i = bisect_left(self._sorted_terms, i_prefix)
+        while i < len(self._sorted_terms) and self._sorted_terms[i].startswith(i_prefix):
+            for k, s in self._match_term(self._sorted_terms[i]).items():
+                scores[k] = scores.get(k, 0.0) + s
+            i += 1
+        return scores
+
+    def _match_phrase(self,
+                      i_terms : list[str]) -> dict:
+        postings = [self._postings.get(t) for t in i_terms]
+        if not all(postings):
+            return {}
+
+        idf    = sum(self._idf(t) for t in i_terms) / len(i_terms)
+        scores = {}
+        for key in set.intersection(*(set(p) for p in postings)):
+            freqs = []
+            for field in (self.FIELD_DESC, self.FIELD_TEXT):
+                starts = set(postings[0][key][field])
+                for offset, p in enumerate(postings[1:], start = 1):
+                    starts &= {pos - offset for pos in p[key][field]}
+                freqs.append(len(starts))
+            if any(freqs):
+                scores[key] = self._field_score(freqs, idf)
+        return scores
+
+    @staticmethod
+    def document_name(i_document : Document) -> str:
+        """
+        :return: Name under which document i_document is indexed
+        """
+        if i_document.common.title is not None:
+            return str(i_document.common.title)
+        return repr(i_document.common.project)
+
+    @staticmethod
+    def fingerprint(i_filename : Union[str, Path]) -> str:
+        """
+        :return: Fingerprint (hash) of file i_filename, used to detect outdated indexes
+        """
+        with open(i_filename, mode = 'rb') as file:
+            return hashlib.sha1(file.read()).hexdigest()
+
+    def save(self,
+             i_filename : Union[str, Path]) -> None:
+        """
+            Save the index into file i_filename (gzipped JSON).
+        """
+        assert isinstance(i_filename, (str, Path)), f"type(i_filename) is {type(i_filename)}"
+
+        data = {
+                    'version'     : self.FILE_FORMAT_VERSION,
+                    'fingerprints': self.fingerprints,
+                    'digests'     : [[k[0], k[1], d] for k, d in self._digests.items()],
+                    'postings'    : {t: [[k[0], k[1], f[0], f[1]] for k, f in p.items()]
+                                     for t, p in self._postings.items()},
+               }
+
+        self._d(f"Saving index ({len(self._postings)} terms) into '{i_filename}'")
+        with gzip.open(i_filename, mode = 'wt', encoding = 'utf8') as file:
+            json.dump(data, file, separators = (',', ':'))
+
+    @classmethod
+    def load(cls,
+             i_filename : Union[str, Path]) -> 'SearchIndex':
+        """
+            Load an index previously saved with save().
+        """
+        assert isinstance(i_filename, (str, Path)), f"type(i_filename) is {type(i_filename)}"
+
+        with gzip.open(i_filename, mode = 'rt', encoding = 'utf8') as file:
+            data = json.load(file)
+
+        if data.get('version') != cls.FILE_FORMAT_VERSION:
+            raise Exception(f"Unsupported index file version {data.get('version')!r} in '{i_filename}'")
+
+        obj = cls()
+        obj.fingerprints = data['fingerprints']
+        obj._digests     = {(doc, req_id): d for doc, req_id, d in data['digests']}
+        for term, entries in data['postings'].items():
+            postings = obj._postings[term] = {}
+            for doc, req_id, desc_pos, text_pos in entries:
+                key = (doc, req_id)
+                postings[key] = [desc_pos, text_pos]
+                obj._forward.setdefault(key, set()).add(term)
+
+        obj._d(f"Loaded index ({len(obj._postings)} terms) from '{i_filename}'")
+        return obj
+
+    @classmethod
+    def for_document_file(cls,
+                          i_xml_filename : Union[str, Path],
+                          i_document     : Document) -> 'SearchIndex':
+        """
+            Get the index of a document, stored next to its XML file.
+            The stored index is reused if it is up to date, otherwise it is updated (only the modified requirements are
+            indexed again, see add_document) and saved.
+
+        :param i_xml_filename: XML file the document was loaded from
+        :param i_document    : Document loaded from i_xml_filename
+        :return              : Index of the document
+        """
+        assert isinstance(i_xml_filename, (str, Path)), f"type(i_xml_filename) is {type(i_xml_filename)}"
+        assert isinstance(i_document,     Document),    f"type(i_document) is {type(i_document)}"
+
+        i_xml_filename = Path(i_xml_filename)
+        idx_filename   = i_xml_filename.with_name(i_xml_filename.name + cls.FILE_SUFFIX)
+        fingerprint    = cls.fingerprint(i_xml_filename)
+        doc_name       = cls.document_name(i_document)
+
+        obj = None
+        if idx_filename.exists():
+            try:
+                obj = cls.load(idx_filename)
+                if obj.fingerprints.get(doc_name) == fingerprint:
+                    return obj
+                obj._i(f"Index '{idx_filename.name}' is outdated, updating")
+            except Exception as e: # Unreadable, or saved by another version: the index is only a cache
+                cls()._w(f"Could not load index '{idx_filename.name}' ({e}), rebuilding")
+                obj = None
+
+        obj = obj or cls()
+        obj.add_document(i_document    = i_document,
+                         i_fingerprint = fingerprint)
+        obj.save(idx_filename)
+        return obj
+
+    def __repr__(self):
+        return f"{len(self._forward)} requirements, {len(self._postings)} terms"
@@ -0,0 +1,152 @@
+#! python3
+import  xml.etree.ElementTree   as ETree
+from    typing                  import Iterator
+from    typing                  import Optional
+from    typing                  import Union
+
+
+class Section:
+    """
+        Node of the section tree of a requirements set (<sec name="..."> elements).
+
+        Each section holds its content in document order: sub-sections and IDs of the requirements it directly
+        contains. The root section (no name) stands for the <requirements> element itself.
+        All traversals are iterative, so that the depth of the tree is not limited by the recursion limit.
+    """
+    TAG_STR       = "sec"
+    ATTR_NAME_STR = "name"
+
+    PATH_SEPARATOR = "/" # Between the names of a section path (full_name): not used in section names
+    FILE_SEPARATOR = "." # Between the names of a section path, in file names (file_name)
+
+    def __init__(self,
+                 i_name   : Optional[str]       = None,
+                 i_parent : Optional['Section'] = None):
+        assert isinstance(i_name,   (str, type(None))),     f"type(i_name) is {type(i_name)}"
+        assert isinstance(i_parent, (Section, type(None))), f"type(i_parent) is {type(i_parent)}"
+
+        self.name     = i_name
+        self.parent   = i_parent
+        self.items    = []  # Sub-sections and requirement IDs, in document order
+        self.include  = None # Path (relative to the including file) of the file the section is stored in, if any
+
+    @property
+    def children(self) -> list['Section']:
+        """
+        :return: Direct sub-sections
+        """
+        return [i for i in self.items if isinstance(i, Section)]
+
+    @property
+    def req_ids(self) -> list[int]:
+        """
+        :return: IDs of the requirements directly in the section
+        """
+        return [i for i in self.items if not isinstance(i, Section)]
+
+    @property
+    def path(self) -> list[str]:
+        """
+        :return: Names of the sections from the top-level section down to this one (empty for the root)
+        """
+        path = []
+        s = self
+        while s is not None and s.name is not None:
+            path.append(s.name)
+            s = s.parent
+        return path[::-1]
+
+    @property
+    def depth(self) -> int:
+        return len(self.path)
+
+    def full_name(self,
+                  i_separator : str = PATH_SEPARATOR) -> str:
+        """
+        :return: Unique name of the section, made of the names of the sections along its path
+                 (i.e. 'functional/input-commands')
+        """
+        return i_separator.join(self.path)
+
+    def file_name(self) -> str:
+        """
+        :return: Name of the section usable in a file name (i.e. 'functional.input-commands'), see
+                 Generator.get_section_snippet_filename
+        """
+        return self.full_name(self.FILE_SEPARATOR)
+
+    def add_section(self,
+                    i_name : str) -> 'Section':
+        """
+            Append a new sub-section.
+        :param i_name: Name of the sub-section
+        :return      : Created section
+        """
+        sec = Section(i_name   = i_name,
+                      i_parent = self)
+        self.items.append(sec)
+        return sec
+
+    def walk(self) -> Iterator['Section']:
+        """
+        :return: This section and all its sub-sections, depth-first, in document order
+        """
+        stack = [self]
+        while stack:
+            sec = stack.pop()
+            yield sec
+            stack.extend(reversed(sec.children))
+
+    def iter_req_ids(self,
+                     i_recursive : bool = True) -> Iterator[int]:
+        """
+        :param i_recursive: If True (default), include the requirements of the sub-sections
+        :return           : IDs of the requirements of the section, in document order
+        """
+        if not i_recursive:
+            yield from self.req_ids
+            return
+
+        stack = [iter(self.items)]
+        while stack:
+            item = next(stack[-1], None)
+            if item is None:
+                stack.pop()
+            elif isinstance(item, Section):
+                stack.append(iter(item.items))
+            else:
+                yield item
+
+    def find(self,
+             i_path : Union[str, list[str]]) -> Optional['Section']:
+        """
+            Find a sub-section by path.
+        :param i_path: List of section names, or full name (see full_name)
+        :return      : Section, or None if not found
+        """
+        if isinstance(i_path, str):
+            for sec in self.walk():
+                if sec is not self and sec.full_name() == i_path:
+                    return sec
+            return None
+
+        sec = self
+        for name in i_path:
+            sec = next((c for c in sec.children if c.name == name), None)
+            if sec is None:
+                return None
+        return sec
+
+    def to_xml_element(self) -> ETree.Element:
+        """
+        :return: Empty <sec> element for this section (content is added by the caller)
+        """
+        elt = ETree.Element(self.TAG_STR)
+        elt.attrib[self.ATTR_NAME_STR] = self.name
+        return elt
+
+    def __str__(self):
+        return self.full_name()
+
+    def __repr__(self):
+        return f"<sec '{self.full_name()}' ({len(self.items)} items)>"
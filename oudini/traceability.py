@@ -0,0 +1,256 @@
+#! python3
+from    utils.logobj            import LogObj
+import  csv
+import  itertools
+from    array                   import array
+from    enum                    import Enum
+from    pathlib                 import Path
+from    typing                  import IO
+from    typing                  import Iterable
+from    typing                  import Iterator
+from    typing                  import Optional
+from    typing                  import Union
+from    document                import Document
+
+
+class TraceabilityMatrix (LogObj):
+    """
+        Sparse traceability matrix between the requirements of a document (rows, downstream) and the requirements of
+        a linked document (columns, upstream) they satisfy, as declared by the <satisfies> links.
+
+        Only the links are stored, in compressed sparse row form (and its transpose, for the upstream view): two
+        arrays of indexes per orientation, so that the memory used is proportional to the number of links - not to
+        the number of rows times the number of columns.
+
+        Columns are the requirements of the upstream document when it is known (so that uncovered parents can be
+        found), followed by the referenced IDs it does not define. Otherwise, only the referenced IDs are known.
+    """
+
+    class Direction (Enum):
+        Upstream   = "to"   # Downstream requirement -> upstream requirements it satisfies
+        Downstream = "from" # Upstream requirement   -> downstream requirements satisfying it
+
+    class Coverage:
+        """
+            Coverage statistics of a traceability matrix (see TraceabilityMatrix.coverage).
+        """
+        def __init__(self):
+            self.num_reqs     = 0  # Number of downstream requirements
+            self.num_parents  = 0  # Number of upstream requirements (None if the upstream document is unknown)
+            self.num_links    = 0
+            self.orphans      = [] # Downstream requirements satisfying no upstream requirement
+            self.uncovered    = [] # Upstream requirements satisfied by no downstream requirement
+            self.unknown      = [] # Referenced upstream IDs not defined in the upstream document
+            self.one_to_many  = [] # Upstream requirements satisfied by several downstream requirements
+            self.many_to_one  = [] # Downstream requirements satisfying several upstream requirements
+
+        @property
+        def covered_ratio(self) -> Optional[float]:
+            """
+            :return: Ratio of upstream requirements covered (None if the upstream document is unknown)
+            """
+            if not self.num_parents:
+                return None
+            return 1 - len(self.uncovered) / self.num_parents
+
+        def __repr__(self):
+            s = f"{self.num_links} links, {len(self.orphans)}/{self.num_reqs} orphans"
+            if self.num_parents is not None:
+                s += f", {len(self.uncovered)}/{self.num_parents} uncovered"
+            if self.unknown:
+                s += f", {len(self.unknown)} unknown"
+            return s + f", {len(self.one_to_many)} one-to-many, {len(self.many_to_one)} many-to-one"
+
+    def __init__(self,
+                 i_source       : str,
+                 i_rows         : list[tuple[str, str]],
+                 i_cols         : list[tuple[str, str]],
+                 i_links        : Iterable[tuple[int, int]],
+                 i_num_declared : Optional[int] = None):
+        """
+            Constructor.
+        :param i_source      : Name of the upstream document (i.e. "SP-PIDS")
+        :param i_rows        : (ID, short description) of the downstream requirements
+        :param i_cols        : (ID, short description) of the upstream requirements
+        :param i_links       : (row index, column index) pairs
+        :param i_num_declared: Number of the first columns actually defined by the upstream document (None if the
+                               upstream document is unknown)
+        """
+        assert isinstance(i_source,       str),               f"type(i_source) is {type(i_source)}"
+        assert isinstance(i_rows,         list),              f"type(i_rows) is {type(i_rows)}"
+        assert isinstance(i_cols,         list),              f"type(i_cols) is {type(i_cols)}"
+        assert isinstance(i_num_declared, (int, type(None))), f"type(i_num_declared) is {type(i_num_declared)}"
+        LogObj.__init__(self)
+
+        self.source       = i_source
+        self.rows         = i_rows
+        self.cols         = i_cols
+        self.num_declared = i_num_declared
+
+        pairs = sorted(set(i_links))
+        self._row_ptr, self._col_idx = self._compress(pairs, len(i_rows))
+        self._col_ptr, self._row_idx = self._compress(sorted((c, r) for r, c in pairs), len(i_cols))
+
+        self._d(f"Created traceability matrix to '{i_source}' ({len(i_rows)}x{len(i_cols)}, {self.num_links} links)")
+
+    @staticmethod
+    def _compress(i_pairs : list[tuple[int, int]],
+                  i_size  : int) -> tuple[array, array]:
+        """
+            Internal method.
+            Build the (pointers, indexes) arrays of sorted (major, minor) pairs: the minor indexes of major index i are
+            indexes[pointers[i]:pointers[i + 1]].
+        """
+        counts = [0] * i_size
+        for major, _ in i_pairs:
+            counts[major] += 1
+
+        pointers = array('l', itertools.accumulate(counts, initial = 0))
+        indexes  = array('l', (minor for _, minor in i_pairs))
+        return pointers, indexes
+
+    @classmethod
+    def from_document(cls,
+                      i_document : Document,
+                      i_source   : str,
+                      i_upstream : Optional[Document] = None) -> 'TraceabilityMatrix':
+        """
+            Build the traceability matrix of the links of i_document to document i_source.
+
+        :param i_document: Downstream document
+        :param i_source  : Name of the upstream document, as used in the <satisfies source="..."> links
+        :param i_upstream: Upstream document (optional), to know its requirements (and the uncovered ones)
+        :return          : Traceability matrix
+        """
+        assert isinstance(i_document, Document),                 f"type(i_document) is {type(i_document)}"
+        assert isinstance(i_source,   str),                      f"type(i_source) is {type(i_source)}"
+        assert isinstance(i_upstream, (Document, type(None))),   f"type(i_upstream) is {type(i_upstream)}"
+
+        reqs   = i_document.reqs.query()
+        rows   = [(r.format_id(), r.desc) for r in reqs]
+        row_of = {r.id: n for n, r in enumerate(reqs)}
+        linked = i_document.reqs.by_link_source(i_source)
+
+        if i_upstream is not None:
+            cols         = [(r.format_id(), r.desc) for r in i_upstream.reqs.query()]
+            num_declared = len(cols)
+        else:
+            # Only the referenced IDs are known: sort them for a stable column order
+            cols         = [(i, "") for i in sorted({lnk.id for r in linked for lnk in r.links if lnk.source == i_source})]
+            num_declared = None
+        col_of = {c[0]: n for n, c in enumerate(cols)}
+
+        links = []
+        for r in linked:
+            for lnk in r.links:
+                if lnk.source != i_source:
+                    continue
+                if (col := col_of.get(lnk.id)) is None:
+                    # Link to an ID the upstream document does not define
+                    col = col_of[lnk.id] = len(cols)
+                    cols.append((lnk.id, ""))
+                links.append((row_of[r.id], col))
+
+        return cls(i_source       = i_source,
+                   i_rows         = rows,
+                   i_cols         = cols,
+                   i_links        = links,
+                   i_num_declared = num_declared)
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        return len(self.rows), len(self.cols)
+
+    @property
+    def num_links(self) -> int:
+        return len(self._col_idx)
+
+    def parents(self,
+                i_row : int) -> array:
+        """
+        :param i_row: Index of a downstream requirement
+        :return     : Indexes of the upstream requirements it satisfies
+        """
+        return self._col_idx[self._row_ptr[i_row]:self._row_ptr[i_row + 1]]
+
+    def children(self,
+                 i_col : int) -> array:
+        """
+        :param i_col: Index of an upstream requirement
+        :return     : Indexes of the downstream requirements satisfying it
+        """
+        return self._row_idx[self._col_ptr[i_col]:self._col_ptr[i_col + 1]]
+
+    def iter_entries(self,
+                     i_direction : Direction = Direction.Upstream) -> Iterator[tuple[tuple[str, str], list[tuple[str, str]]]]:
+        """
+        :param i_direction: Upstream: one entry per downstream requirement, with the upstream requirements it
+                            satisfies. Downstream: one entry per upstream requirement, with the downstream
+                            requirements satisfying it.
+        :return           : Iterator over (requirement, linked requirements) pairs, requirements being (ID, description)
+        """
+        if i_direction == self.Direction.Upstream:
+            for n, row in enumerate(self.rows):
+                yield row, [self.cols[c] for c in self.parents(n)]
+        else:
+            for n, col in enumerate(self.cols):
+                yield col, [self.rows[r] for r in self.children(n)]
+
+    def coverage(self) -> Coverage:
+        """
+        :return: Coverage statistics (orphans, uncovered parents, one-to-many links...)
+        """
+        cov = self.Coverage()
+        cov.num_reqs    = len(self.rows)
+        cov.num_parents = self.num_declared
+        cov.num_links   = self.num_links
+
+        for n, row in enumerate(self.rows):
+            degree = self._row_ptr[n + 1] - self._row_ptr[n]
+            if degree == 0:
+                cov.orphans.append(row[0])
+            elif degree > 1:
+                cov.many_to_one.append(row[0])
+
+        for n, col in enumerate(self.cols):
+            degree = self._col_ptr[n + 1] - self._col_ptr[n]
+            if self.num_declared is not None and n >= self.num_declared:
+                cov.unknown.append(col[0])
+            if degree == 0:
+                cov.uncovered.append(col[0])
+            elif degree > 1:
+                cov.one_to_many.append(col[0])
+
+        return cov
+
+    def write_csv(self,
+                  i_file      : Union[str, Path, IO],
+                  i_direction : Direction = Direction.Upstream) -> None:
+        """
+            Write the matrix as CSV, one line per link (requirements without any link get a line with an empty
+            second column).
+
+        :param i_file     : File name, or text file object
+        :param i_direction: Orientation of the matrix (see iter_entries)
+        """
+        assert isinstance(i_direction, TraceabilityMatrix.Direction), f"type(i_direction) is {type(i_direction)}"
+
+        if isinstance(i_file, (str, Path)):
+            with open(i_file, mode = 'w', newline = '', encoding = 'utf8') as file:
+                return self.write_csv(file, i_direction)
+
+        if i_direction == self.Direction.Upstream:
+            header = ["requirement", "description", self.source, f"{self.source} description"]
+        else:
+            header = [self.source, f"{self.source} description", "requirement", "description"]
+
+        writer = csv.writer(i_file)
+        writer.writerow(header)
+        for (req_id, desc), linked in self.iter_entries(i_direction):
+            if not linked:
+                writer.writerow([req_id, desc, "", ""])
+            for lnk_id, lnk_desc in linked:
+                writer.writerow([req_id, desc, lnk_id, lnk_desc])
+
+    def __repr__(self):
+        return f"<traceability matrix to '{self.source}' ({len(self.rows)}x{len(self.cols)}, {self.num_links} links)>"
@@ -0,0 +1,107 @@
+#! python3
+
+# Developed by GigAnon for the Oudini project. All rights reserved.
+# https://github.com/GigAnon/oudini
+#
+# Distributed under MIT (Expat) License, see LICENSE.
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+from    collections import deque
+from    typing      import Any, Iterator
+
+
+class AhoCorasick:
+    """
+        Aho-Corasick automaton, to find all occurrences of a set of patterns in a text in a single pass.
+
+        Usage:
+            ac = AhoCorasick()
+            ac.add("foo", value_foo)
+            ac.add("bar", value_bar)
+            for start, end, value in ac.finditer(text):
+                ...
+
+        The automaton is (re)built lazily on the first search following an add().
+    """
+
+    def __init__(self):
+        self._goto  = [{}]   # State -> { character -> state }
+        self._fail  = [0]    # State -> failure state
+        self._own   = [()]   # State -> ((pattern length, value), ...) of the patterns ending on this state
+        self._out   = [()]   # Same as _own, including the outputs of the failure states
+        self._built = True
+
+    def add(self,
+            i_pattern : str,
+            i_value   : Any = None) -> None:
+        """
+            Add pattern i_pattern to the automaton.
+        :param i_pattern: Pattern to look for (must not be empty)
+        :param i_value  : Value returned along with the matches of i_pattern (defaults to the pattern itself)
+        """
+        assert isinstance(i_pattern, str) and i_pattern, f"i_pattern is {i_pattern!r}"
+
+        state = 0
+        for c in i_pattern:
+            nxt = self._goto[state].get(c)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][c] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._own.append(())
+            state = nxt
+
+        self._own[state] = self._own[state] + ((len(i_pattern), i_pattern if i_value is None else i_value),)
+        self._built = False
+
+    def __len__(self):
+        return sum(len(o) for o in self._own)
+
+    def _build(self) -> None:
+        # Breadth-first computation of the failure links
+        self._out = list(self._own)
+
+        queue = deque()
+        for nxt in self._goto[0].values():
+            self._fail[nxt] = 0
+            queue.append(nxt)
+
+        while queue:
+            state = queue.popleft()
+            for c, nxt in self._goto[state].items():
+                queue.append(nxt)
+
+                f = self._fail[state]
+                while f and c not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[nxt] = self._goto[f].get(c, 0)
+
+                # Own outputs first (longest), then the ones of the failure state (shorter suffixes)
+                self._out[nxt] = self._own[nxt] + self._out[self._fail[nxt]]
+
+        self._built = True
+
+    def finditer(self,
+                 i_text : str) -> Iterator[tuple[int, int, Any]]:
+        """
+            Find all (possibly overlapping) occurrences of the patterns in i_text.
+        :param i_text: Text to search
+        :return      : Iterator over (start, end, value) tuples, by increasing end position
+        """
+        if not self._built:
+            self._build()
+
+        goto  = self._goto
+        fail  = self._fail
+        out   = self._out
+        state = 0
+
+        for i, c in enumerate(i_text):
+            while state and c not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(c, 0)
+
+            for length, value in out[state]:
+                yield i + 1 - length, i + 1, value
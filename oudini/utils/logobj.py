@@ -11,8 +11,6 @@ import  copy
 import  threading
 from    enum        import Enum
 import  logging
-import  inspect
-import  traceback
 import  sys
 import  abc
 from    typing      import Optional, Union
@@ -77,6 +75,7 @@ def _multiline_log(logger,
 
 def enable_exception_logging():
     def handler(exctype, value, tb):
+        import traceback # Only needed when an exception escapes: not imported at startup
         if issubclass(exctype, KeyboardInterrupt):
             # Do not override sys.excepthook for keyboard interrupts
             sys.__excepthook__(exctype, value, tb)
@@ -213,11 +212,12 @@ class LogObj:
                 # This way, the logger name will be prefixed by the name of the module being used, and not whatever module
                 # this file ends up in.
                 # TODO : recursively inspect stack to find the first __init__, to improve behaviour on multiple inheritance?
-                callsite = inspect.stack()[1]
-                if "__init__" in callsite.function:
-                    module = inspect.getmodule(callsite[0])
-                    caller_name = module.__name__
-            except (IndexError):
+                # Note: only the caller frame is looked at - inspect.stack() would build (and read the source lines of)
+                # the whole call stack for every object created
+                callsite = sys._getframe(1)
+                if "__init__" in callsite.f_code.co_name:
+                    caller_name = callsite.f_globals.get("__name__")
+            except (ValueError):
                 pass
 
             # If all else file, use the current __name__
@@ -0,0 +1,267 @@
+#! python3
+
+# Developed by GigAnon for the Oudini project. All rights reserved.
+# https://github.com/GigAnon/oudini
+#
+# Distributed under MIT (Expat) License, see LICENSE.
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+import  contextlib
+import  contextvars
+import  json
+import  logging
+import  time
+from    pathlib     import Path
+from    typing      import Callable, Iterator, Optional, Union
+
+
+class Span:
+    """
+        Timed stage. Spans nest: 'path' is the names of the enclosing spans and of this one (i.e. "generate/glossary").
+    """
+    def __init__(self,
+                 i_name   : str,
+                 i_parent : Optional['Span'] = None,
+                 i_attrs  : Optional[dict]   = None):
+        self.name     = i_name
+        self.path     = f"{i_parent.path}/{i_name}" if i_parent is not None else i_name
+        self.attrs    = i_attrs or {}
+        self.counters = {}   # Counters incremented while the span was the innermost one
+        self.start    = None # time.perf_counter() values
+        self.end      = None
+        self.error    = None # Exception type name, if the span exited on an exception
+
+    @property
+    def duration(self) -> Optional[float]:
+        """
+        :return: Duration of the span in seconds (None while it is running)
+        """
+        if self.end is None:
+            return None
+        return self.end - self.start
+
+    def to_dict(self,
+                i_origin : float = 0.0) -> dict:
+        d = {"name"     : self.name,
+             "path"     : self.path,
+             "start"    : self.start - i_origin,
+             "duration" : self.duration}
+        if self.attrs:
+            d["attrs"] = dict(self.attrs)
+        if self.counters:
+            d["counters"] = dict(self.counters)
+        if self.error:
+            d["error"] = self.error
+        return d
+
+    def __repr__(self):
+        s = f"[{self.path}]"
+        if self.duration is not None:
+            s += f" {self.duration * 1000:.1f} ms"
+        if self.counters:
+            s += " (" + ", ".join(f"{k}={v}" for k, v in self.counters.items()) + ")"
+        if self.error:
+            s += f" failed ({self.error})"
+        return s
+
+
+class Sink:
+    """
+        Base class of the metrics sinks (see Metrics.add_sink). All methods do nothing by default.
+    """
+    def on_span(self,
+                i_span : Span) -> None:
+        """
+            Called when a span ends.
+        """
+        pass
+
+    def on_count(self,
+                 i_name  : str,
+                 i_value : Union[int, float],
+                 i_total : Union[int, float]) -> None:
+        """
+            Called when a counter is incremented (by i_value, to i_total).
+        """
+        pass
+
+    def close(self,
+              i_metrics : 'Metrics') -> None:
+        """
+            Called when the collection ends (see Metrics.stop).
+        """
+        pass
+
+
+class LogSink (Sink):
+    """
+        Log a line for each finished span.
+    """
+    def __init__(self,
+                 i_logger : Optional[logging.Logger] = None,
+                 i_level  : int = logging.INFO):
+        self.logger = i_logger or logging.getLogger("metrics")
+        self.level  = i_level
+
+    def on_span(self, i_span : Span) -> None:
+        self.logger.log(self.level, repr(i_span))
+
+
+class CallbackSink (Sink):
+    """
+        Forward the spans (and optionally the counters) to user callbacks.
+    """
+    def __init__(self,
+                 i_on_span  : Optional[Callable[[Span], None]] = None,
+                 i_on_count : Optional[Callable[[str, Union[int, float], Union[int, float]], None]] = None):
+        self._on_span  = i_on_span
+        self._on_count = i_on_count
+
+    def on_span(self, i_span : Span) -> None:
+        if self._on_span is not None:
+            self._on_span(i_span)
+
+    def on_count(self, i_name, i_value, i_total) -> None:
+        if self._on_count is not None:
+            self._on_count(i_name, i_value, i_total)
+
+
+class JsonSink (Sink):
+    """
+        Write the report of the collection (see Metrics.report) as JSON when it ends.
+    """
+    def __init__(self,
+                 i_filename : Union[str, Path]):
+        self.filename = Path(i_filename)
+
+    def close(self, i_metrics : 'Metrics') -> None:
+        with open(self.filename, mode = 'w') as file:
+            json.dump(i_metrics.report(), file, indent = 4)
+
+
+_current_metrics = contextvars.ContextVar("oudini_metrics",      default = None)
+_current_span    = contextvars.ContextVar("oudini_metrics_span", default = None)
+
+
+class Metrics:
+    """
+        Collector of timing spans and counters.
+
+        The instrumented code calls the module-level span() and count() functions, which report to the active
+        collector - if any. Without an active collector, spans are still timed (so that the caller can log their
+        duration) but nothing is recorded.
+
+        Usage:
+            with Metrics(i_sinks = [LogSink(), JsonSink("build-metrics.json")]) as m:
+                doc = Document.from_xml(...)
+                generator.generate_and_compile(...)
+            print(m.totals())
+    """
+    def __init__(self,
+                 i_sinks : Optional[list[Sink]] = None):
+        self.sinks    = list(i_sinks or [])
+        self.spans    = [] # Finished spans, in order of completion
+        self.counters = {}
+        self.origin   = time.perf_counter()
+        self._token   = None
+
+    def add_sink(self,
+                 i_sink : Sink) -> None:
+        assert isinstance(i_sink, Sink), f"type(i_sink) is {type(i_sink)}"
+        self.sinks.append(i_sink)
+
+    def start(self) -> 'Metrics':
+        """
+            Make this collector the active one (in the current context).
+        """
+        assert self._token is None, "Metrics collection already started"
+        self._token = _current_metrics.set(self)
+        return self
+
+    def stop(self) -> None:
+        """
+            End the collection: the previously active collector is restored, and the sinks are given the final results.
+        """
+        _current_metrics.reset(self._token)
+        self._token = None
+        for s in self.sinks:
+            s.close(self)
+
+    def __enter__(self) -> 'Metrics':
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def _on_span(self,
+                 i_span : Span) -> None:
+        self.spans.append(i_span)
+        for s in self.sinks:
+            s.on_span(i_span)
+
+    def _on_count(self,
+                  i_name  : str,
+                  i_value : Union[int, float]) -> None:
+        total = self.counters[i_name] = self.counters.get(i_name, 0) + i_value
+        for s in self.sinks:
+            s.on_count(i_name, i_value, total)
+
+    def totals(self) -> dict[str, float]:
+        """
+        :return: Total duration (in seconds) of the spans, by path
+        """
+        totals = {}
+        for s in self.spans:
+            totals[s.path] = totals.get(s.path, 0.0) + s.duration
+        return totals
+
+    def report(self) -> dict:
+        """
+        :return: Spans (sorted by start time), total durations by span path, and counters
+        """
+        return {"spans"    : [s.to_dict(self.origin) for s in sorted(self.spans, key = lambda s: s.start)],
+                "totals"   : self.totals(),
+                "counters" : dict(self.counters)}
+
+
+def current() -> Optional[Metrics]:
+    """
+    :return: Active collector (None if metrics are not being collected)
+    """
+    return _current_metrics.get()
+
+
+@contextlib.contextmanager
+def span(i_name : str,
+         **i_attrs) -> Iterator[Span]:
+    """
+        Time the enclosed block as span i_name (nested into the enclosing span, if any).
+    :param i_name : Name of the stage
+    :param i_attrs: Attributes of the span (i.e. pass number)
+    """
+    parent = _current_span.get()
+    s      = Span(i_name, parent, i_attrs)
+    token  = _current_span.set(s)
+    s.start = time.perf_counter()
+    try:
+        yield s
+    except BaseException as e:
+        s.error = type(e).__name__
+        raise
+    finally:
+        s.end = time.perf_counter()
+        _current_span.reset(token)
+        if (m := _current_metrics.get()) is not None:
+            m._on_span(s)
+
+
+def count(i_name  : str,
+          i_value : Union[int, float] = 1) -> None:
+    """
+        Increment counter i_name by i_value (in the active collector, and in the innermost span).
+    """
+    if (s := _current_span.get()) is not None:
+        s.counters[i_name] = s.counters.get(i_name, 0) + i_value
+    if (m := _current_metrics.get()) is not None:
+        m._on_count(i_name, i_value)
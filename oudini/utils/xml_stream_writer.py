@@ -0,0 +1,254 @@
+#! python3
+
+# Developed by GigAnon for the Oudini project. All rights reserved.
+# https://github.com/GigAnon/oudini
+#
+# Distributed under MIT (Expat) License, see LICENSE.
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+import  contextlib
+import  io
+import  xml.etree.ElementTree   as ETree
+from    pathlib                 import Path
+from    typing                  import IO, Iterator, Optional, Union
+
+
+class XmlStreamWriter:
+    """
+        Streaming XML serializer.
+
+        Elements are written as they are given, with the indentation computed inline, so that a large document never
+        has to be built (or indented) as a whole in memory. The output is byte-identical to:
+            ETree.indent(root, space = i_space)
+            ETree.ElementTree(root).write(file, encoding = ..., xml_declaration = ...)
+
+        Usage:
+            with XmlStreamWriter.open(file, i_encoding = "UTF-8") as w:
+                w.start("root")
+                w.element(some_element)     # Complete (small) sub-tree
+                w.start("container")
+                ...
+                w.end()
+                w.end()
+    """
+
+    class _Open:
+        def __init__(self,
+                     i_tag  : str,
+                     i_text : Optional[str]):
+            self.tag          = i_tag
+            self.text         = i_text
+            self.has_children = False
+
+    def __init__(self,
+                 i_write : callable,
+                 i_space       : str = ' '*4,
+                 i_base_indent : str = ''):
+        """
+            Constructor.
+        :param i_write      : Function writing a string into the output
+        :param i_space      : Indentation for one level
+        :param i_base_indent: Indentation of the top-level element (i.e. to write a fragment of a larger file)
+        """
+        assert isinstance(i_space,       str), f"type(i_space) is {type(i_space)}"
+        assert isinstance(i_base_indent, str), f"type(i_base_indent) is {type(i_base_indent)}"
+
+        self._write  = i_write
+        self._space  = i_space
+        self._stack  = []
+        self._indent = ["\n" + i_base_indent]
+
+    @classmethod
+    @contextlib.contextmanager
+    def open(cls,
+             i_file            : Union[str, Path, IO],
+             i_encoding        : str  = "UTF-8",
+             i_xml_declaration : bool = True,
+             i_space           : str  = ' '*4) -> Iterator['XmlStreamWriter']:
+        """
+            Create a writer into i_file.
+
+        :param i_file           : File name, binary file object or text file object
+        :param i_encoding       : Output encoding ("unicode" for text file objects)
+        :param i_xml_declaration: If True, an XML declaration is written first
+        :param i_space          : Indentation for one level
+        """
+        assert isinstance(i_file,     (str, Path, io.IOBase)) or hasattr(i_file, "write"), f"type(i_file) is {type(i_file)}"
+        assert isinstance(i_encoding, str),                                                f"type(i_encoding) is {type(i_encoding)}"
+
+        with contextlib.ExitStack() as stack:
+            if i_encoding.lower() == "unicode":
+                # Text output
+                if isinstance(i_file, (str, Path)):
+                    file = stack.enter_context(open(i_file, mode = 'w', encoding = 'utf-8',
+                                                    errors = 'xmlcharrefreplace'))
+                else:
+                    file = i_file
+            else:
+                if isinstance(i_file, (str, Path)):
+                    file = stack.enter_context(open(i_file, mode = 'w', encoding = i_encoding,
+                                                    errors = 'xmlcharrefreplace'))
+                elif isinstance(i_file, io.TextIOBase):
+                    file = i_file
+                else:
+                    file = io.TextIOWrapper(i_file, encoding = i_encoding, errors = 'xmlcharrefreplace', newline = '\n')
+                    stack.callback(file.detach)
+                    stack.callback(file.flush)
+
+            obj = cls(i_write = file.write,
+                      i_space = i_space)
+
+            if i_xml_declaration:
+                if i_encoding.lower() == "unicode":
+                    declared_encoding = getattr(file, "encoding", None) or "utf-8"
+                else:
+                    declared_encoding = i_encoding
+                file.write(f"<?xml version='1.0' encoding='{declared_encoding}'?>\n")
+
+            yield obj
+
+            if obj._stack:
+                raise Exception(f"Unclosed element <{obj._stack[-1].tag}>")
+
+    @staticmethod
+    def escape_cdata(i_text : str) -> str:
+        if "&" in i_text:
+            i_text = i_text.replace("&", "&amp;")
+        if "<" in i_text:
+            i_text = i_text.replace("<", "&lt;")
+        if ">" in i_text:
+            i_text = i_text.replace(">", "&gt;")
+        return i_text
+
+    @classmethod
+    def escape_attrib(cls,
+                      i_text : str) -> str:
+        i_text = cls.escape_cdata(i_text)
+        if "\"" in i_text:
+            i_text = i_text.replace("\"", "&quot;")
+        if "\r" in i_text:
+            i_text = i_text.replace("\r", "&#13;")
+        if "\n" in i_text:
+            i_text = i_text.replace("\n", "&#10;")
+        if "\t" in i_text:
+            i_text = i_text.replace("\t", "&#09;")
+        return i_text
+
+    def _indentation(self,
+                     i_level : int) -> str:
+        while len(self._indent) <= i_level:
+            self._indent.append(self._indent[-1] + self._space)
+        return self._indent[i_level]
+
+    @staticmethod
+    def _is_blank(i_text : Optional[str]) -> bool:
+        return not i_text or not i_text.strip()
+
+    def _start_tag(self,
+                   i_tag    : str,
+                   i_attrib : dict) -> str:
+        s = f"<{i_tag}"
+        for k, v in i_attrib.items():
+            s += f" {k}=\"{self.escape_attrib(v)}\""
+        return s
+
+    def _open_child(self) -> None:
+        """
+            Prepare the output for a new child of the current element.
+        """
+        if not self._stack:
+            return
+
+        parent = self._stack[-1]
+        if not parent.has_children:
+            parent.has_children = True
+            text = parent.text if not self._is_blank(parent.text) else self._indentation(len(self._stack))
+            self._write(">" + self.escape_cdata(text))
+        else:
+            self._write(self._indentation(len(self._stack)))
+
+    def start(self,
+              i_tag    : str,
+              i_attrib : Optional[dict] = None,
+              i_text   : Optional[str]  = None) -> None:
+        """
+            Open element <i_tag>. Its children are then given with start() / element(), until end() is called.
+        :param i_tag   : Tag of the element
+        :param i_attrib: Attributes of the element
+        :param i_text  : Text of the element (only kept if not blank, or if the element has no child)
+        """
+        assert isinstance(i_tag, str), f"type(i_tag) is {type(i_tag)}"
+
+        self._open_child()
+        self._write(self._start_tag(i_tag, i_attrib or {}))
+        self._stack.append(self._Open(i_tag, i_text))
+
+    def end(self) -> None:
+        """
+            Close the last opened element.
+        """
+        elt = self._stack.pop()
+
+        if elt.has_children:
+            self._write(self._indentation(len(self._stack)) + f"</{elt.tag}>")
+        elif elt.text:
+            self._write(">" + self.escape_cdata(elt.text) + f"</{elt.tag}>")
+        else:
+            self._write(" />")
+
+    @classmethod
+    def fragment(cls,
+                 i_elt         : ETree.Element,
+                 i_space       : str = ' '*4,
+                 i_base_indent : str = '') -> str:
+        """
+            Serialize i_elt alone, as if it was indented with i_base_indent in a larger file.
+            The first line is not indented, and no newline is added at the end.
+        """
+        chunks = []
+        obj = cls(i_write       = chunks.append,
+                  i_space       = i_space,
+                  i_base_indent = i_base_indent)
+        obj.element(i_elt)
+        return "".join(chunks)
+
+    def element(self,
+                i_elt : ETree.Element) -> None:
+        """
+            Write a complete element (and its sub-elements) as a child of the current element.
+            Note: the tail of i_elt is ignored (it is replaced by the indentation).
+        """
+        assert isinstance(i_elt, ETree.Element), f"type(i_elt) is {type(i_elt)}"
+
+        self._open_child()
+        self._write_subtree(i_elt, len(self._stack))
+
+    def _write_subtree(self,
+                       i_elt   : ETree.Element,
+                       i_level : int) -> None:
+        if i_elt.tag is ETree.Comment:
+            self._write(f"<!--{i_elt.text}-->")
+            return
+
+        self._write(self._start_tag(i_elt.tag, i_elt.attrib))
+
+        if len(i_elt):
+            text = i_elt.text if not self._is_blank(i_elt.text) else self._indentation(i_level + 1)
+            self._write(">" + self.escape_cdata(text))
+
+            last = len(i_elt) - 1
+            for n, child in enumerate(i_elt):
+                self._write_subtree(child, i_level + 1)
+
+                if not self._is_blank(child.tail):
+                    tail = child.tail
+                else:
+                    tail = self._indentation(i_level + 1 if n < last else i_level)
+                self._write(self.escape_cdata(tail))
+
+            self._write(f"</{i_elt.tag}>")
+        elif i_elt.text:
+            self._write(">" + self.escape_cdata(i_elt.text) + f"</{i_elt.tag}>")
+        else:
+            self._write(" />")
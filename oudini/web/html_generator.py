@@ -0,0 +1,508 @@
+#! python3
+import  html
+
+from    generator           import Generator
+from    requirement         import Requirement
+from    common_section      import CommonSection
+from    glossary            import Glossary
+from    glossary_linker     import GlossaryLinker
+from    section             import Section
+from    traceability        import TraceabilityMatrix
+from    document            import Document
+from    bundle              import Bundle
+from    web.latex_to_html   import LatexToHtml
+
+from    pathlib             import Path
+from    typing              import Optional
+from    typing              import Union
+
+
+class HtmlGenerator (Generator):
+    """
+        HTML document generator: a static, navigable site (one page per requirement, section, traceability matrix, the
+        glossary and the document information, plus an index) for a fast preview without any LaTeX compilation.
+        The LaTeX of the requirement texts is converted to HTML (see LatexToHtml); math is rendered by MathJax.
+
+        Requirement, section and matrix snippets are HTML fragments; each written file is a complete page.
+    """
+
+    DEFAULT_REQ_FILE_FORMAT       = "{name}.html"
+    DEFAULT_CONSTANTS_FILE_FORMAT = "document.html"
+    DEFAULT_GLOSSARY_FILE_FORMAT  = "glossary.html"
+    DEFAULT_SECTION_FILE_FORMAT   = "sec-{name}.html"
+    DEFAULT_MATRIX_FILE_FORMAT    = "matrix_{direction}_{source}.html"
+    DEFAULT_INDEX_FILE_FORMAT     = "index.html"
+
+    MATHJAX_URL = "https://cdn.jsdelivr.net/npm/mathjax@3/es5/tex-chtml.js"
+
+    GLOSSARY_ANCHOR_FORMAT = "gls-{uid}"
+
+    HTML_STYLE = """
+body        { font-family: sans-serif; margin: 0; color: #222; }
+nav         { background: #2b4c7e; padding: 0.5em 1em; }
+nav a       { color: white; margin-right: 1.5em; text-decoration: none; }
+main        { max-width: 60em; margin: 1em auto; padding: 0 1em; }
+article     { border: 1px solid #ccc; border-radius: 4px; margin: 1em 0; padding: 0 1em 0.5em 1em; }
+table       { border-collapse: collapse; margin: 1em 0; }
+th, td      { border: 1px solid #ccc; padding: 0.2em 0.5em; text-align: left; vertical-align: top; }
+.validation { color: blue; font-weight: bold; }
+.links      { color: #555; font-size: 90%; }
+.undefined  { color: #c00; border-bottom: 1px dotted #c00; }
+code.latex  { color: #a50; }
+"""
+
+    HTML_PAGE_TEMPLATE =\
+"""<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<style>{style}</style>{mathjax}
+</head>
+<body>
+<nav><a href="{index}">Index</a><a href="{constants}">Document</a><a href="{glossary}">Glossary</a></nav>
+<main>
+{body}
+</main>
+</body>
+</html>
+"""
+    HTML_MATHJAX_TEMPLATE =\
+"""
+<script id="MathJax-script" async src="{url}"></script>"""
+
+    HTML_REQ_TEMPLATE =\
+"""<article class="requirement" id="{anchor}">
+<h3>{display_name} &mdash; {short_descr}</h3>{validation_strategy}
+<div class="text">{text}</div>{links}
+</article>
+"""
+    HTML_VALIDATION_STRATEGY_TEMPLATE =\
+"""
+<div class="validation">[{text}]</div>"""
+
+    HTML_LINKS_TEMPLATE =\
+"""
+<div class="links">Satisfies: {links}</div>"""
+
+    HTML_SECTION_TEMPLATE =\
+"""<section>
+<h2>{name}</h2>
+<p>{num_req} requirements</p>
+{requirements}</section>
+"""
+
+    HTML_MATRIX_TEMPLATE =\
+"""<h2>{caption}</h2>
+<table>
+<tr><th>{first}</th><th>Description</th><th>{second}</th></tr>
+{rows}</table>
+<table>
+{coverage}</table>
+"""
+    HTML_MATRIX_ROW_TEMPLATE =\
+"""<tr><td>{req_id}</td><td>{desc}</td><td>{linked}</td></tr>
+"""
+
+    HTML_CONSTANTS_TEMPLATE =\
+"""<h1>{project}</h1>
+<h2>{title}</h2>
+<table>
+{people}</table>
+"""
+
+    HTML_GLOSSARY_TEMPLATE =\
+"""<h1>Glossary</h1>
+<dl>
+{definitions}</dl>
+<h1>Acronyms</h1>
+<dl>
+{acronyms}</dl>
+"""
+    HTML_GLOSSARY_ENTRY_TEMPLATE =\
+"""<dt id="{anchor}">{name}</dt><dd>{description}</dd>
+"""
+
+    HTML_INDEX_TEMPLATE =\
+"""<h1>{project}</h1>
+<h2>{title}</h2>
+{toc}{matrices}"""
+
+    def __init__(self,
+                 i_project_root_dir      : Union[str,
+                                                 Path] = Path(),
+                 i_prune_glossary        : bool = False,
+                 i_link_glossary         : Optional[GlossaryLinker.Mode] = None,
+                 i_section_snippets      : bool = False,
+                 i_requirement_snippets  : bool = True,
+                 i_traceability_matrices : bool = False,
+                 i_mathjax_url           : Optional[str] = MATHJAX_URL):
+        """
+            Constructor.
+        :param i_project_root_dir     : Root of the project
+        :param i_prune_glossary       : If set to True, only the glossary entries referenced in the requirements are
+                                        generated
+        :param i_link_glossary        : If set, glossary terms found in the requirement texts are automatically linked
+        :param i_section_snippets     : If set to True, one page is generated per section
+        :param i_requirement_snippets : If set to False, no individual requirement page is written
+        :param i_traceability_matrices: If set to True, traceability matrix pages are generated for each linked document
+        :param i_mathjax_url          : URL of the MathJax script, included in the pages containing math (if None, math
+                                        is left as TeX code)
+        """
+        assert isinstance(i_mathjax_url, (str, type(None))), f"type(i_mathjax_url) is {type(i_mathjax_url)}"
+
+        super().__init__(i_project_root_dir      = i_project_root_dir,
+                         i_compiler              = None,
+                         i_prune_glossary        = i_prune_glossary,
+                         i_link_glossary         = i_link_glossary,
+                         i_section_snippets      = i_section_snippets,
+                         i_requirement_snippets  = i_requirement_snippets,
+                         i_traceability_matrices = i_traceability_matrices)
+
+        self.mathjax_url = i_mathjax_url
+        self.converter   = LatexToHtml(i_glossary_link = self._glossary_link,
+                                       i_ref_link      = self._ref_link)
+
+        # State of the document being generated (see _begin_render)
+        self._glossary = None
+        self._targets  = {} # Requirement label (display ID) -> page (and anchor)
+
+        self._i("Created HTML generator")
+
+    def _begin_render(self,
+                      i_document : Document) -> None:
+        """
+            The glossary and the requirement pages of i_document are known beforehand, so that the references can be
+            resolved.
+        """
+        super()._begin_render(i_document)
+
+        self._glossary = i_document.glossary
+        self._targets  = {}
+        for req in i_document.reqs.reqs.values():
+            if self.requirement_snippets:
+                target = self.get_requirement_snippet_filename(i_req = req).name
+            elif self.section_snippets and (section := i_document.reqs.section_of(req)).name is not None:
+                target = self.get_section_snippet_filename(i_section = section).name + f"#{req.format_id()}"
+            else:
+                continue
+            self._targets[req.format_id()] = target
+
+    def _end_render(self) -> Bundle:
+        self._glossary = None
+        self._targets  = {}
+        return super()._end_render()
+
+    def get_requirement_snippet_filename(self,
+                                         i_req         : Requirement,
+                                         i_root_folder : Union[str, Path] = Path()) -> Path:
+        """
+        :return: Name of the page of requirement i_req (i.e. 'SRD-REQ-01000.html' - the file format of the document
+                 is meant for the LaTeX snippets)
+        """
+        return Path(i_root_folder).joinpath(self.DEFAULT_REQ_FILE_FORMAT.format(id   = i_req.id,
+                                                                                name = i_req.format_id()))
+
+    def _glossary_link(self,
+                       i_command : str,
+                       i_uid     : str) -> str:
+        """
+        :return: HTML of a reference to glossary entry i_uid (command i_command, i.e. 'acrlong')
+        """
+        if self._glossary is None or i_uid not in self._glossary:
+            return f'<span class="gls undefined">{html.escape(i_uid)}</span>'
+
+        entry = self._glossary[i_uid]
+        if isinstance(entry, Glossary.Acronym):
+            short = entry.shorthand or entry.uid
+            if   i_command.lower().startswith("acrlong"):
+                name = entry.description
+            elif i_command.lower().startswith("acrfull"):
+                name = f"{entry.description} ({short})"
+            else:
+                name = short
+        else:
+            name = entry.uid
+        if i_command[:1].isupper():
+            name = name[:1].upper() + name[1:]
+
+        return (f'<a class="gls" href="{self.DEFAULT_GLOSSARY_FILE_FORMAT}#{self.GLOSSARY_ANCHOR_FORMAT.format(uid = i_uid)}" '
+                f'title="{html.escape(entry.description)}">{html.escape(name)}</a>')
+
+    def _ref_link(self,
+                  i_label : str,
+                  i_text  : Optional[str]) -> str:
+        """
+        :return: HTML of a reference to requirement i_label (display ID), with link text i_text (HTML, the label if None)
+        """
+        text = i_text if i_text is not None else html.escape(i_label)
+        if (target := self._targets.get(i_label)) is None:
+            return f'<span class="ref undefined">{text}</span>'
+        return f'<a class="ref" href="{html.escape(target)}">{text}</a>'
+
+    def _page(self,
+              i_title : str,
+              i_body  : str) -> str:
+        """
+        :return: Complete HTML page (navigation bar, style, and MathJax if needed) around HTML fragment i_body
+        """
+        mathjax = ""
+        if self.mathjax_url is not None and 'class="math"' in i_body:
+            mathjax = HtmlGenerator.HTML_MATHJAX_TEMPLATE.format(url = html.escape(self.mathjax_url))
+
+        return HtmlGenerator.HTML_PAGE_TEMPLATE.format(title     = html.escape(i_title),
+                                                       style     = HtmlGenerator.HTML_STYLE,
+                                                       mathjax   = mathjax,
+                                                       index     = self.DEFAULT_INDEX_FILE_FORMAT,
+                                                       constants = self.DEFAULT_CONSTANTS_FILE_FORMAT,
+                                                       glossary  = self.DEFAULT_GLOSSARY_FILE_FORMAT,
+                                                       body      = i_body)
+
+    def _generate_requirement(self,
+                              i_req      : Requirement,
+                              i_filename : Optional[Union[str,
+                                                          Path]] = None) -> str:
+        """
+            Generate the HTML of requirement i_req and optionally write its page into file i_filename.
+
+        :param i_req     : Oudini requirement to convert to HTML
+        :param i_filename: Filename where to write the page (optional)
+        :return          : Generated HTML fragment
+        """
+        assert isinstance(i_req,        Requirement),             f"type(i_req) is {type(i_req)}"
+        assert isinstance(i_filename,   (str, Path, type(None))), f"type(i_filename) is {type(i_filename)}"
+
+        if i_req.validation_strategy is not None:
+            validation_strategy = HtmlGenerator.HTML_VALIDATION_STRATEGY_TEMPLATE.format(text = html.escape(i_req.validation_strategy.name))
+        else:
+            validation_strategy = ""
+
+        if i_req.links:
+            links = HtmlGenerator.HTML_LINKS_TEMPLATE.format(links = ", ".join(f"{html.escape(lnk.id)} ({html.escape(lnk.source)})"
+                                                                               for lnk in i_req.links))
+        else:
+            links = ""
+
+        text = HtmlGenerator.HTML_REQ_TEMPLATE.format(anchor              = html.escape(i_req.format_id()),
+                                                      display_name        = html.escape(i_req.format_id()),
+                                                      short_descr         = html.escape(i_req.desc),
+                                                      validation_strategy = validation_strategy,
+                                                      text                = self.converter.convert(i_req.parsed_text),
+                                                      links               = links)
+
+        if i_filename is not None:
+            self._d(f"Writing [{i_req.format_id()}] into '{Path(i_filename).name}'")
+            self._write_snippet(i_filename, self._page(i_title = f"{i_req.format_id()} - {i_req.desc}",
+                                                       i_body  = text))
+
+        return text
+
+    def _generate_section(self,
+                          i_section  : Section,
+                          i_snippets : list[str],
+                          i_filename : Optional[Union[str,
+                                                      Path]] = None) -> str:
+        """
+            Generate the HTML of section i_section (all its requirements) and optionally write its page into file
+            i_filename.
+
+        :param i_section : Section to process
+        :param i_snippets: HTML fragments of the requirements of the section, in document order
+        :param i_filename: Filename where to write the page (optional)
+        :return          : Generated HTML fragment
+        """
+        assert isinstance(i_section,    Section),                 f"type(i_section) is {type(i_section)}"
+        assert isinstance(i_filename,   (str, Path, type(None))), f"type(i_filename) is {type(i_filename)}"
+
+        text = HtmlGenerator.HTML_SECTION_TEMPLATE.format(name         = html.escape(i_section.full_name(" / ")),
+                                                          num_req      = len(i_snippets),
+                                                          requirements = "".join(i_snippets))
+
+        if i_filename is not None:
+            self._d(f"Writing section '{i_section!s}' into '{Path(i_filename).name}'")
+            self._write_snippet(i_filename, self._page(i_title = i_section.full_name(" / "),
+                                                       i_body  = text))
+
+        return text
+
+    def _generate_matrix(self,
+                         i_matrix    : TraceabilityMatrix,
+                         i_direction : TraceabilityMatrix.Direction,
+                         i_coverage  : TraceabilityMatrix.Coverage,
+                         i_filename  : Optional[Union[str,
+                                                      Path]] = None) -> str:
+        """
+            Generate the HTML table of traceability matrix i_matrix, followed by its coverage statistics, and optionally
+            write its page into file i_filename. The requirements of the generated document link to their page.
+
+        :param i_matrix   : Traceability matrix to convert to HTML
+        :param i_direction: Upstream or downstream view of the matrix
+        :param i_coverage : Coverage statistics of the matrix
+        :param i_filename : Filename where to write the page (optional)
+        :return           : Generated HTML fragment
+        """
+        assert isinstance(i_matrix,     TraceabilityMatrix),           f"type(i_matrix) is {type(i_matrix)}"
+        assert isinstance(i_direction,  TraceabilityMatrix.Direction), f"type(i_direction) is {type(i_direction)}"
+        assert isinstance(i_filename,   (str, Path, type(None))),      f"type(i_filename) is {type(i_filename)}"
+
+        def own(i_req_id : str) -> str:
+            return self._ref_link(i_req_id, None)
+
+        def other(i_req_id : str) -> str:
+            return html.escape(i_req_id)
+
+        source = html.escape(i_matrix.source)
+        if i_direction == TraceabilityMatrix.Direction.Upstream:
+            first,   second  = "Requirement", source
+            fmt_req, fmt_lnk = own, other
+            caption          = f"Traceability matrix to {source}"
+        else:
+            first,   second  = source, "Requirement"
+            fmt_req, fmt_lnk = other, own
+            caption          = f"Traceability matrix from {source}"
+
+        rows = "".join(HtmlGenerator.HTML_MATRIX_ROW_TEMPLATE.format(req_id = fmt_req(req_id),
+                                                                     desc   = html.escape(desc),
+                                                                     linked = "<br>".join(fmt_lnk(i) for i, _ in linked) or "&ndash;")
+                       for (req_id, desc), linked in i_matrix.iter_entries(i_direction))
+
+        # Coverage statistics
+        stats = [("Requirements", i_coverage.num_reqs)]
+        if i_coverage.num_parents is not None:
+            stats.append((f"{source} items", i_coverage.num_parents))
+        stats.append((f"Links to {source}",                             i_coverage.num_links))
+        stats.append((f"Requirements not linked to {source}",           len(i_coverage.orphans)))
+        if i_coverage.num_parents is not None:
+            stats.append((f"{source} items not covered",                len(i_coverage.uncovered)))
+            stats.append((f"Links to undefined {source} items",         len(i_coverage.unknown)))
+        stats.append((f"Requirements linked to several {source} items", len(i_coverage.many_to_one)))
+        stats.append((f"{source} items linked to several requirements", len(i_coverage.one_to_many)))
+
+        text = HtmlGenerator.HTML_MATRIX_TEMPLATE.format(caption  = caption,
+                                                         first    = first,
+                                                         second   = second,
+                                                         rows     = rows,
+                                                         coverage = "".join(f"<tr><td>{k}</td><td>{v}</td></tr>\n" for k, v in stats))
+
+        if i_filename is not None:
+            self._d(f"Writing traceability matrix {i_direction.value} '{i_matrix.source}' into '{Path(i_filename).name}'")
+            self._write_snippet(i_filename, self._page(i_title = caption,
+                                                       i_body  = text))
+
+        return text
+
+    def _generate_constants(self,
+                            i_common   : CommonSection,
+                            i_filename : Optional[Union[str,
+                                                        Path]] = None) -> str:
+        """
+            Generate the document information page (project, title, people) from the common section.
+
+        :param i_common  : 'Common' section of the requirement database
+        :param i_filename: Filename where to write the page (optional)
+        :return          : Generated HTML fragment
+        """
+        assert isinstance(i_common,     CommonSection),           f"type(i_common) is {type(i_common)}"
+        assert isinstance(i_filename,   (str, Path, type(None))), f"type(i_filename) is {type(i_filename)}"
+
+        people = ""
+        if i_common.people is not None:
+            people = "".join(f"<tr><td>{html.escape(p.role)}</td><td>{html.escape(p.name)}</td></tr>\n"
+                             for p in i_common.people.list)
+
+        text = HtmlGenerator.HTML_CONSTANTS_TEMPLATE.format(project = html.escape(repr(i_common.project) if i_common.project else "UNDEFINED PROJECT"),
+                                                            title   = html.escape(repr(i_common.title)   if i_common.title   else "UNDEFINED DOCUMENT"),
+                                                            people  = people)
+
+        if i_filename is not None:
+            self._d(f"Writing document information into '{Path(i_filename).name}'")
+            self._write_snippet(i_filename, self._page(i_title = "Document",
+                                                       i_body  = text))
+
+        return text
+
+    def _generate_glossary(self,
+                           i_glossary : Glossary,
+                           i_filename : Optional[Union[str,
+                                                       Path]] = None) -> str:
+        assert isinstance(i_glossary,   Glossary),                f"type(i_glossary) is {type(i_glossary)}"
+        assert isinstance(i_filename,   (str, Path, type(None))), f"type(i_filename) is {type(i_filename)}"
+
+        acronyms    = ""
+        definitions = ""
+        for a in i_glossary.definitions.values():
+            assert isinstance(a, Glossary.Definition), f"type(a) is {type(a)}"
+
+            anchor = html.escape(self.GLOSSARY_ANCHOR_FORMAT.format(uid = a.uid))
+            if isinstance(a, Glossary.Acronym):
+                acronyms += HtmlGenerator.HTML_GLOSSARY_ENTRY_TEMPLATE.format(anchor      = anchor,
+                                                                              name        = html.escape(a.shorthand or a.uid),
+                                                                              description = html.escape(a.description))
+            else:
+                definitions += HtmlGenerator.HTML_GLOSSARY_ENTRY_TEMPLATE.format(anchor      = anchor,
+                                                                                 name        = html.escape(a.uid),
+                                                                                 description = html.escape(a.description))
+
+        text = HtmlGenerator.HTML_GLOSSARY_TEMPLATE.format(definitions = definitions,
+                                                           acronyms    = acronyms)
+
+        if i_filename is not None:
+            self._d(f"Writing glossary into '{Path(i_filename).name}'")
+            self._write_snippet(i_filename, self._page(i_title = "Glossary",
+                                                       i_body  = text))
+
+        return text
+
+    def _generate_index(self,
+                        i_document : Document,
+                        i_reqs     : list[Requirement],
+                        i_filename : Optional[Union[str,
+                                                    Path]] = None) -> str:
+        """
+            Generate the index page: table of contents (section tree and requirements), and traceability matrices.
+
+        :param i_document: Oudini document
+        :param i_reqs    : Requirements as generated, in document order
+        :param i_filename: Filename where to write the page (optional)
+        :return          : Generated HTML fragment
+        """
+        assert isinstance(i_document,   Document),                f"type(i_document) is {type(i_document)}"
+        assert isinstance(i_filename,   (str, Path, type(None))), f"type(i_filename) is {type(i_filename)}"
+
+        reqs = {req.id: req for req in i_reqs}
+
+        # Table of contents: nested lists, built iteratively (the section tree depth is not limited)
+        toc   = ["<ul>\n"]
+        stack = [iter(i_document.reqs.sections.items)]
+        while stack:
+            item = next(stack[-1], None)
+            if item is None:
+                stack.pop()
+                toc.append("</ul>\n" if not stack else "</ul></li>\n")
+            elif isinstance(item, Section):
+                name = html.escape(item.name)
+                if self.section_snippets:
+                    name = f'<a href="{html.escape(self.get_section_snippet_filename(i_section = item).name)}">{name}</a>'
+                toc.append(f"<li>{name}\n<ul>\n")
+                stack.append(iter(item.items))
+            elif (req := reqs.get(item)) is not None:
+                toc.append(f"<li>{self._ref_link(req.format_id(), None)} {html.escape(req.desc)}</li>\n")
+
+        matrices = ""
+        if self.traceability:
+            matrices = "<h2>Traceability</h2>\n<ul>\n" + "".join(
+                f'<li><a href="{html.escape(self.get_matrix_snippet_filename(i_source = source, i_direction = direction).name)}">'
+                f"{'To' if direction == TraceabilityMatrix.Direction.Upstream else 'From'} {html.escape(source)}</a></li>\n"
+                for source in self.traceability for direction in TraceabilityMatrix.Direction) + "</ul>\n"
+
+        text = HtmlGenerator.HTML_INDEX_TEMPLATE.format(project  = html.escape(repr(i_document.common.project) if i_document.common.project else ""),
+                                                        title    = html.escape(repr(i_document.common.title)   if i_document.common.title   else ""),
+                                                        toc      = "".join(toc),
+                                                        matrices = matrices)
+
+        if i_filename is not None:
+            self._d(f"Writing index into '{Path(i_filename).name}'")
+            self._write_snippet(i_filename, self._page(i_title = "Index",
+                                                       i_body  = text))
+
+        return text
@@ -0,0 +1,236 @@
+#! python3
+import  html
+from    typing          import Callable
+from    typing          import Optional
+from    typing          import Union
+
+from    glossary        import Glossary
+from    latex_text      import LatexText
+
+
+class LatexToHtml:
+    """
+        Converter of the LaTeX subset used in requirement texts into HTML.
+
+        - Text formatting (\\textbf, \\textit, \\emph, \\texttt...), line breaks, dashes and escaped characters
+        - itemize / enumerate / description lists
+        - Glossary references (\\gls{...}, \\acrshort{...}, etc.): links to the glossary page
+        - Cross-references (\\req{...}, \\ref{...}, \\hyperref[...]{...}): links to the referenced requirement
+        - Inline and display math are kept as TeX, between MathJax delimiters (\\( \\) and \\[ \\])
+
+        Unknown commands are rendered as is (i.e. '\\blindtext'), with their arguments converted.
+        The conversion is a single pass over the tokens of the text (see LatexText.tokens, shared with the other
+        consumers of the text): no TeX is involved.
+    """
+    INLINE_TAGS = {"textbf"    : "strong",
+                   "textit"    : "em",
+                   "textsl"    : "em",
+                   "emph"      : "em",
+                   "texttt"    : "code",
+                   "underline" : "u",
+                   "textsc"    : "small",
+                   "textsuperscript" : "sup",
+                   "textsubscript"   : "sub"}
+
+    LIST_ENVIRONMENTS = {"itemize"     : "ul",
+                         "enumerate"   : "ol",
+                         "description" : "dl"}
+
+    REF_COMMANDS    = frozenset(("req", "ref", "autoref", "cref", "Cref", "nameref"))
+    IGNORED_COMMANDS = frozenset(("xspace", "noindent", "centering", "raggedright", "raggedleft", "small", "footnotesize",
+                                  "normalsize", "large", "Large", "hfill", "vfill", "medskip", "bigskip", "smallskip",
+                                  "par", "relax", "protect", "label"))
+    SYMBOLS          = {"ldots"          : "&hellip;",
+                        "dots"           : "&hellip;",
+                        "textbackslash"  : "\\",
+                        "LaTeX"          : "LaTeX",
+                        "TeX"            : "TeX",
+                        "newline"        : "<br>",
+                        "linebreak"      : "<br>",
+                        "textasciitilde" : "~",
+                        "textdegree"     : "&deg;",
+                        "copyright"      : "&copy;"}
+
+    _ITEM = "\x00item\x00" # Placeholder for \item, replaced when the enclosing list is closed
+
+    def __init__(self,
+                 i_glossary_link : Callable[[str, str], str],
+                 i_ref_link      : Callable[[str, Optional[str]], str]):
+        """
+            Constructor.
+        :param i_glossary_link: Returns the HTML of a glossary reference, from the command and the entry UID
+        :param i_ref_link     : Returns the HTML of a cross-reference, from the label and the link text (if any)
+        """
+        self.glossary_link = i_glossary_link
+        self.ref_link      = i_ref_link
+
+    def convert(self,
+                i_text : Union[str, LatexText, None]) -> str:
+        """
+        :param i_text: LaTeX text, or its parsed form (i.e. Requirement.parsed_text: tokenized once)
+        :return      : HTML code
+        """
+        if not i_text:
+            return ""
+        self._tokens = (i_text if isinstance(i_text, LatexText) else LatexText(i_text)).tokens
+        self._pos    = 0
+        try:
+            return self._parse()
+        finally:
+            self._tokens = None
+
+    def _next(self) -> Optional[LatexText.Token]:
+        if self._pos >= len(self._tokens):
+            return None
+        tok = self._tokens[self._pos]
+        self._pos += 1
+        return tok
+
+    def _peek(self) -> Optional[str]:
+        if self._pos >= len(self._tokens):
+            return None
+        return self._tokens[self._pos][0]
+
+    def _skip_spaces(self) -> None:
+        while self._peek() == "text" and not self._tokens[self._pos][1].strip():
+            self._pos += 1
+
+    def _raw_optional(self) -> Optional[str]:
+        """
+        :return: Raw text of the optional argument [...] following the current command (None if there isn't any)
+        """
+        if self._peek() != "lbrack":
+            return None
+        self._pos += 1
+        raw = []
+        while (tok := self._next()) is not None and tok[0] != "rbrack":
+            raw.append(tok[1])
+        return "".join(raw)
+
+    def _raw_argument(self) -> str:
+        """
+        :return: Raw text of the mandatory argument {...} following the current command
+        """
+        self._skip_spaces()
+        if self._peek() != "open":
+            tok = self._next()
+            return tok[1] if tok is not None else ""
+        self._pos += 1
+        raw   = []
+        depth = 0
+        while (tok := self._next()) is not None:
+            if tok[0] == "close":
+                if depth == 0:
+                    break
+                depth -= 1
+            elif tok[0] == "open":
+                depth += 1
+            raw.append(tok[1])
+        return "".join(raw)
+
+    def _argument(self) -> str:
+        """
+        :return: HTML of the mandatory argument {...} following the current command
+        """
+        self._skip_spaces()
+        if self._peek() != "open":
+            return self._parse(i_single = True)
+        self._pos += 1
+        return self._parse(i_until = "close")
+
+    def _parse(self,
+               i_until  : Optional[str] = None,
+               i_env    : Optional[str] = None,
+               i_single : bool = False) -> str:
+        out = []
+        while (tok := self._next()) is not None:
+            kind, s, env = tok
+
+            if   kind == i_until and kind == "close":
+                break
+            elif kind == "end" and i_until == "end" and env == i_env:
+                break
+            elif kind == "text":
+                out.append(html.escape(s, quote = False))
+            elif kind == "escaped":
+                out.append(html.escape(s[1:].strip(), quote = False) or " ")
+            elif kind == "newline":
+                out.append("<br>\n")
+            elif kind == "par":
+                out.append("<br><br>\n")
+            elif kind == "tilde":
+                out.append("&nbsp;")
+            elif kind == "dash":
+                out.append("&mdash;" if len(s) == 3 else "&ndash;")
+            elif kind == "comment":
+                pass
+            elif kind == "imath":
+                body = s[1:-1] if s.startswith("$") else s[2:-2]
+                out.append(f'<span class="math">\\({html.escape(body, quote = False)}\\)</span>')
+            elif kind == "dmath":
+                body = s[2:-2]
+                out.append(f'<div class="math">\\[{html.escape(body, quote = False)}\\]</div>')
+            elif kind == "mathenv":
+                out.append(f'<div class="math">{html.escape(s, quote = False)}</div>')
+            elif kind == "open":
+                out.append(self._parse(i_until = "close"))
+            elif kind in ("close", "lbrack", "rbrack", "end"):
+                out.append(html.escape(s, quote = False)) # Unbalanced: kept as is
+            elif kind == "begin":
+                out.append(self._environment(env))
+            elif kind == "cmd":
+                out.append(self._command(s[1:].rstrip("*")))
+
+            if i_single:
+                break # Argument without braces (i.e. '\textbf x'): one token
+        return "".join(out)
+
+    def _environment(self,
+                     i_env : str) -> str:
+        body = self._parse(i_until = "end", i_env = i_env)
+
+        if (tag := self.LIST_ENVIRONMENTS.get(i_env)) is not None:
+            items = body.split(self._ITEM)[1:] # Anything before the first \item is dropped (whitespace)
+            if tag == "dl":
+                return "<dl>" + "".join(f"{i}</dd>" if "<dd>" in i else f"<dd>{i}</dd>" for i in items) + "</dl>\n"
+            return f"<{tag}>" + "".join(f"<li>{i.strip()}</li>" for i in items) + f"</{tag}>\n"
+
+        return f'<div class="env-{html.escape(i_env)}">{body}</div>'
+
+    def _command(self,
+                 i_name : str) -> str:
+        if i_name == "item":
+            label = self._raw_optional()
+            if label is not None:
+                return f"{self._ITEM}<dt>{html.escape(label, quote = False)}</dt><dd>"
+            return self._ITEM
+
+        if (tag := self.INLINE_TAGS.get(i_name)) is not None:
+            return f"<{tag}>{self._argument()}</{tag}>"
+
+        if i_name in Glossary.REFERENCE_COMMANDS:
+            self._raw_optional()
+            return self.glossary_link(i_name, self._raw_argument().strip())
+
+        if i_name in self.REF_COMMANDS:
+            return self.ref_link(self._raw_argument().strip(), None)
+
+        if i_name == "hyperref":
+            label = self._raw_optional()
+            text  = self._argument()
+            return self.ref_link(label.strip(), text) if label is not None else text
+
+        if i_name in ("href", "url"):
+            url  = self._raw_argument().strip()
+            text = self._argument() if i_name == "href" else html.escape(url, quote = False)
+            return f'<a href="{html.escape(url)}">{text}</a>'
+
+        if i_name in self.IGNORED_COMMANDS:
+            if i_name == "label":
+                self._raw_argument()
+            return ""
+
+        if (symbol := self.SYMBOLS.get(i_name)) is not None:
+            return symbol
+
+        return f'<code class="latex">\\{html.escape(i_name, quote = False)}</code>'
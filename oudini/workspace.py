@@ -0,0 +1,125 @@
+#! python3
+import  threading
+import  utils.metrics           as metrics
+from    pathlib                 import Path
+from    typing                  import Callable
+from    typing                  import Union
+
+from    utils.logobj            import LogObj
+from    document                import Document
+from    search_index            import SearchIndex
+
+
+class Workspace (LogObj):
+    """
+        Documents kept in memory between requests (see daemon.py), by resolved file name.
+
+        A document is parsed on first access, and parsed again when its source file or one of the files it includes
+        changed (size or modification time, checked on each access): a cached document is never stale. refresh()
+        re-parses the changed documents ahead of the next access (i.e. from a watcher thread), so that the request
+        following an edit does not pay for the parsing.
+
+        The documents are full-text indexed as they are parsed, one index per file (see get_indexed): when a document is
+        parsed again, only its modified requirements are indexed again.
+
+        Access is serialized by a lock; the returned documents must not be modified.
+    """
+
+    def __init__(self,
+                 i_loader : Callable[[Path], Document] = Document.from_file):
+        """
+        :param i_loader: Document parsing function (file name -> Document)
+        """
+        LogObj.__init__(self)
+
+        self.loader    = i_loader
+        self.documents = {} # Resolved file name -> Document
+        self.loads     = 0  # Number of parsed files
+        self.hits      = 0  # Number of accesses served from memory
+        self.indexes   = {} # Resolved file name -> SearchIndex of the document
+        self._lock     = threading.RLock()
+
+    def _load(self,
+              i_filename : Path) -> Document:
+        self._i(f"Parsing '{i_filename}'")
+        doc = self.loader(i_filename)
+        self.documents[i_filename] = doc
+        with metrics.span("search_index"):
+            self.indexes.setdefault(i_filename, SearchIndex()).add_document(doc)
+        self.loads += 1
+        metrics.count("workspace_loads")
+        return doc
+
+    def get(self,
+            i_filename : Union[str, Path]) -> Document:
+        """
+        :return: Document of file i_filename, parsed again if the file changed since it was last parsed
+        """
+        assert isinstance(i_filename, (str, Path)), f"type(i_filename) is {type(i_filename)}"
+        filename = Path(i_filename).resolve()
+
+        with self._lock:
+            doc = self.documents.get(filename)
+            if doc is not None and not doc.sources_changed():
+                self.hits += 1
+                metrics.count("workspace_hits")
+                return doc
+            return self._load(filename)
+
+    def get_indexed(self,
+                    i_filename : Union[str, Path]) -> tuple[Document, SearchIndex]:
+        """
+        :return: Document of file i_filename (see get), and its full-text index
+        """
+        with self._lock:
+            doc = self.get(i_filename)
+            return doc, self.indexes[Path(i_filename).resolve()]
+
+    def refresh(self) -> list[Path]:
+        """
+            Parse again the documents whose file changed, and forget the documents whose file was deleted.
+        :return: Names of the re-parsed files
+        """
+        reloaded = []
+        with self._lock:
+            for filename, doc in list(self.documents.items()):
+                if not filename.exists():
+                    self._i(f"'{filename}' was deleted")
+                    self._remove(filename)
+                    continue
+
+                if doc.sources_changed():
+                    try:
+                        self._load(filename)
+                        reloaded.append(filename)
+                    except Exception as e:
+                        # Probably saved mid-edit: reported on next access
+                        self._w(f"Could not parse '{filename}': {e}")
+                        self._remove(filename)
+        return reloaded
+
+    def _remove(self,
+                i_filename : Path) -> None:
+        self.documents.pop(i_filename, None)
+        self.indexes.pop(i_filename, None)
+
+    def forget(self,
+               i_filename : Union[str, Path]) -> None:
+        with self._lock:
+            self._remove(Path(i_filename).resolve())
+
+    def status(self) -> dict:
+        """
+        :return: Cached documents (file name -> number of requirements) and access counters
+        """
+        with self._lock:
+            return {"documents" : {str(f): len(d.reqs) for f, d in self.documents.items()},
+                    "loads"     : self.loads,
+                    "hits"      : self.hits,
+                    "indexed"   : sum(len(i) for i in self.indexes.values())}
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    def __repr__(self):
+        return f"<workspace of {len(self.documents)} documents ({self.loads} parsed, {self.hits} reused)>"
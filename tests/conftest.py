@@ -0,0 +1,6 @@
+#! python3
+import  sys
+from    pathlib                 import Path
+
+# Note: if OuDini is installed as a package, sys.path doesn't need to be modified
+sys.path.append(str(Path(__file__).parent.parent.joinpath('oudini')))
@@ -0,0 +1,196 @@
+#! python3
+"""
+    Incremental save (Document.save): only the <req> elements of the modified, added and removed requirements are
+    rewritten, the other bytes of the files are left untouched.
+"""
+import  copy
+import  pytest
+from    pathlib                 import Path
+
+from    document                import Document
+
+
+DOCUMENT = """<?xml version="1.0" encoding="{encoding}"?>
+<!-- Kept as is by incremental saves -->
+<document>
+    <general>
+        <project internal="TST" pretty="Test project" />
+        <title internal="TST-SRD" pretty="Test SRD" />
+        <version internal="A" />
+        <reqDisplayFormat>TST-REQ-{{id:05d}}</reqDisplayFormat>
+    </general>
+    <requirements>
+        <sec name="a">
+            <!-- Section a -->
+            <req id="00001" shortdesc="First">
+                <text>First text</text>
+            </req>
+            <req id = "00002"   shortdesc = "Second">
+                <text>
+                    Second text
+                </text>
+            </req>
+        </sec>
+{part}
+    </requirements>
+</document>
+"""
+
+SECTION_B = """        <sec name="b">
+            <req id="00003" shortdesc="Third">
+                <text>Third text</text>
+            </req>
+        </sec>"""
+
+PART_B = """<?xml version="1.0" encoding="UTF-8"?>
+<!-- Section b, in a file of its own -->
+<sec name="b">
+    <req id="00003" shortdesc="Third">
+        <text>Third text</text>
+    </req>
+</sec>
+"""
+
+REQ_1 = """<req id="00001" shortdesc="First">
+                <text>First text</text>
+            </req>"""
+
+
+def _write(i_folder   : Path,
+           i_encoding : str  = "UTF-8",
+           i_split    : bool = False) -> Path:
+    """
+    :return: Main file of a test document, with section 'b' in an included file if i_split
+    """
+    filename = i_folder.joinpath("doc.xml")
+    if i_split:
+        i_folder.joinpath("parts").mkdir()
+        i_folder.joinpath("parts", "b.xml").write_text(PART_B, encoding = "utf-8")
+        part = '        <include href="parts/b.xml" />'
+    else:
+        part = SECTION_B
+    filename.write_bytes(DOCUMENT.format(encoding = i_encoding, part = part).encode(i_encoding))
+    return filename
+
+
+def test_modified_requirement_is_patched(tmp_path):
+    filename = _write(tmp_path)
+    before   = filename.read_text()
+
+    doc = Document.from_file(filename)
+    doc.reqs.reqs[1].text = "Changed text"
+    assert doc.save()
+
+    after = filename.read_text()
+    head, tail = before.split(REQ_1)
+    assert after.startswith(head) and after.endswith(tail)
+    assert Document.from_file(filename).reqs.reqs[1].text == "Changed text"
+
+
+def test_unmodified_document_is_untouched(tmp_path):
+    filename = _write(tmp_path)
+    before   = filename.read_bytes()
+
+    doc = Document.from_file(filename)
+    assert doc.save()
+    assert filename.read_bytes() == before
+
+
+def test_added_removed_and_moved_requirements(tmp_path):
+    filename = _write(tmp_path)
+    doc      = Document.from_file(filename)
+    reqs     = doc.reqs
+
+    new    = copy.copy(reqs.reqs[3])
+    new.id = 4
+    reqs.add(i_req     = new,
+             i_section = reqs.section_of(3))
+    reqs.remove(2)
+    moved = reqs.remove(1)
+    reqs.add(i_req     = moved,
+             i_section = reqs.section_of(3))
+    moved.mark_dirty()
+    assert doc.save()
+
+    text = filename.read_text()
+    assert "<!-- Section a -->" in text and '<version internal="A" />' in text
+    reqs = Document.from_file(filename).reqs
+    assert sorted(reqs.reqs) == [1, 3, 4]
+    assert list(reqs.sections.find("b").iter_req_ids()) == [3, 4, 1]
+    assert reqs.section_of(1).full_name() == "b"
+
+    # The offsets are kept up to date: a second save patches the right elements
+    doc.reqs.reqs[4].text = "Fourth text"
+    assert doc.save()
+    assert Document.from_file(filename).reqs.reqs[4].text == "Fourth text"
+
+
+def test_patches_use_the_file_encoding(tmp_path):
+    filename = _write(tmp_path, i_encoding = "ISO-8859-1")
+
+    doc = Document.from_file(filename)
+    doc.reqs.reqs[1].text = "Données reçues, œuvre"
+    assert doc.save()
+
+    assert filename.read_bytes().startswith(b'<?xml version="1.0" encoding="ISO-8859-1"?>')
+    assert Document.from_file(filename).reqs.reqs[1].text == "Données reçues, œuvre"
+
+
+def test_split_document_only_patches_the_modified_file(tmp_path):
+    filename = _write(tmp_path, i_split = True)
+    main     = filename.read_bytes()
+
+    doc = Document.from_file(filename)
+    doc.reqs.reqs[3].text = "Changed text"
+    assert doc.save()
+
+    assert filename.read_bytes() == main
+    part = tmp_path.joinpath("parts", "b.xml").read_text()
+    assert part.startswith(PART_B.split("<req")[0])
+    assert Document.from_file(filename).reqs.reqs[3].text == "Changed text"
+
+
+def test_rename(tmp_path):
+    filename = _write(tmp_path)
+    doc      = Document.from_file(filename)
+
+    doc.reqs.rename(doc.reqs.reqs[2], 77)
+    assert doc.reqs.section_of(77).full_name() == "a"
+    assert doc.save()
+
+    reqs = Document.from_file(filename).reqs
+    assert sorted(reqs.reqs) == [1, 3, 77]
+    assert reqs.section_of(77).full_name() == "a"
+
+    with pytest.raises(Exception):
+        doc.reqs.rename(doc.reqs.reqs[1], 3)
+
+
+def test_id_modified_in_place_is_rejected(tmp_path):
+    filename = _write(tmp_path)
+    before   = filename.read_bytes()
+    doc      = Document.from_file(filename)
+
+    doc.reqs.reqs[2].id = 77
+    with pytest.raises(Exception, match = "RequirementsSet.rename"):
+        doc.save()
+    assert filename.read_bytes() == before
+
+
+
+def test_empty_section_name_is_transparent(tmp_path):
+    filename = _write(tmp_path)
+    filename.write_text(filename.read_text().replace('<sec name="b">', '<sec name=""><sec name="b">')
+                                            .replace("</sec>\n    </requirements>", "</sec></sec>\n    </requirements>"))
+
+    doc = Document.from_file(filename)
+    assert doc.reqs.section_of(3).full_name() == "b"
+    new    = copy.copy(doc.reqs.reqs[3])
+    new.id = 4
+    doc.reqs.add(i_req     = new,
+                 i_section = doc.reqs.section_of(3))
+    assert doc.save()
+
+    assert "<text>Third text</text>\n            </req>\n" in filename.read_text()
+    reqs = Document.from_file(filename).reqs
+    assert list(reqs.sections.find("b").iter_req_ids()) == [3, 4]
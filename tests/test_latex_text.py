@@ -0,0 +1,26 @@
+#! python3
+"""
+    Tokenization of the text of the requirements (LatexText).
+"""
+import  random
+
+from    latex_text              import LatexText
+from    web.latex_to_html       import LatexToHtml
+
+
+def test_tokens_give_the_text_back():
+    rnd    = random.Random(0)
+    pieces = ["\\", "%", "{", "}", "[", "]", "$", "~", "-", "\n", " ", "a", "b", "\\\\", "\\%", "\\begin{x}", "\\end{x}"]
+    for _ in range(5000):
+        text = "".join(rnd.choice(pieces) for _ in range(rnd.randint(1, 20)))
+        assert "".join(t[1] for t in LatexText(text).tokens) == text.strip(), repr(text)
+
+
+def test_comment_after_line_break():
+    tokens = LatexText("first\\\\%comment\nsecond \\% kept").tokens
+    assert ("comment", "%comment\n", None) in tokens
+    assert ("escaped", "\\%", None) in tokens
+
+    html = LatexToHtml(i_glossary_link = lambda c, u: u,
+                       i_ref_link      = lambda l, t: l).convert("first\\\\%comment\nsecond")
+    assert "comment" not in html